@@ -39,6 +39,10 @@ class Settings(BaseSettings):
     yolo_confidence: float = 0.25
     yolo_iou: float = 0.45
     yolo_device: str = "cpu"
+    yolo_imgsz: int = 640
+    inference_backend: str = "torch"  # "torch", "onnx" (ONNX Runtime), "openvino" or "onnx-int8"
+    calibration_frames_dir: Path = base_dir / "calibration_frames"  # Sample frames for INT8 calibration
+    calibration_max_frames: int = 200
 
     # Detection Settings
     target_class: str = "rickshaw"
@@ -47,6 +51,11 @@ class Settings(BaseSettings):
     entry_line_start: Tuple[float, float] = (0.0, 50.0)  # Full width from left edge
     entry_line_end: Tuple[float, float] = (100.0, 50.0)  # Full width to right edge
 
+    # Region of Interest (inference only runs on a crop around the counting line)
+    roi_mode: str = "full"  # "full", "band" (around the counting line) or "polygon"
+    roi_band_margin: float = 15.0  # Band half-size around the line (percentage of frame)
+    roi_polygon: List[Tuple[float, float]] = []  # Polygon vertices (percentages) for "polygon" mode
+
     # Counting Settings
     crossing_threshold: int = 5
     min_detection_confidence: float = 0.3
@@ -55,9 +64,62 @@ class Settings(BaseSettings):
     # Video Processing Optimization
     enable_live_preview: bool = False
     preview_update_interval: int = 5  # Update preview every N frames (0 = disabled)
-    frame_skip: int = 30
-    detection_scale_factor: float = 0.75
-    use_fast_codec: bool = False
+    frame_skip: int = 10  # Max stride when adaptive frame skipping is enabled
+    adaptive_frame_skip: bool = False
+    adaptive_near_line_margin: float = 20.0  # Analyse every frame while objects are this close to the line (%)
+    inference_batch_size: int = 8  # Frames per batched forward pass
+    inference_workers: int = 2  # Threads running image/video requests off the event loop
+    image_decode_workers: int = 4  # Threads decoding/encoding images inside a batch request
+    max_batch_images: int = 1000  # Max images per /detect/images request (zip entries included)
+    detection_scale_factor: float = 1.0  # Model input = yolo_imgsz * factor (0.75 -> 480): faster, less accurate
+    use_fast_codec: bool = False  # ultrafast x264 preset (bigger files, faster encoding)
+    video_writer: str = "auto"  # "auto" (ffmpeg when installed), "ffmpeg" or "opencv" (mp4v)
+    ffmpeg_path: str = "ffmpeg"
+    ffmpeg_preset: str = "veryfast"  # x264 preset for annotated videos
+    ffmpeg_crf: int = 23  # x264 quality (lower = better quality, bigger files)
+    # Drawing + encoding cost counts-only runs report as saved until a rendered video has been timed
+    # (measured: ~20 with x264 veryfast, ~6 with the OpenCV mp4v writer)
+    render_cost_ms_per_megapixel: float = 20.0
+    enable_video_pipeline: bool = False  # Overlap decode, inference and annotate/encode on separate threads
+    video_pipeline_queue_size: int = 4  # Batches buffered between pipeline stages
+
+    # Chunked Video Processing (long uploads split across worker processes)
+    enable_chunked_video: bool = False
+    video_chunk_workers: int = 0  # Worker processes (0 = cpu_count)
+    video_chunk_min_frames: int = 1800  # Minimum frames per chunk; shorter videos stay sequential
+    video_chunk_overlap: int = 30  # Frames tracked before each chunk so boundary crossings keep their track
+
+    # Detection Store (detections + source video kept, so a video is never re-inferred to re-render it)
+    # Each store keeps the source upload, so it costs about the upload's size on disk (plus ~26 bytes per detection)
+    enable_detection_store: bool = False
+    detection_store_dir: Path = base_dir / "cache" / "detections"
+    detection_store_max_bytes: int = 20 * 1024 * 1024 * 1024  # Oldest stores are pruned past this (0 = no limit)
+    detection_store_max_age_hours: float = 72.0  # Stores older than this are pruned (0 = keep forever)
+
+    # Async Video Job Queue (persisted in SQLite, resumed on restart)
+    video_job_workers: int = 1  # Videos processed concurrently by /detect/video/async
+    video_job_queue_size: int = 10  # Waiting jobs before uploads are rejected with 429
+    video_job_retry_after: int = 30  # Retry-After seconds sent with 429 responses
+
+    # Cross-job Inference Scheduler (micro-batches frames from all cameras and video jobs)
+    enable_inference_scheduler: bool = False
+    scheduler_max_batch_size: int = 8
+    scheduler_max_wait_ms: float = 10.0
+
+    # Detector Worker Pool (separate processes, frames passed through shared memory)
+    detector_workers: int = 0  # 0 = run inference inside the API process
+    detector_worker_threads: int = 0  # Torch threads per worker (0 = cpu_count / workers)
+    shm_slots_per_worker: int = 8
+    shm_max_frame_bytes: int = 1920 * 1080 * 3  # Larger frames fall back to pickling
+    detector_request_timeout: float = 120.0  # Max wait for a shared-memory slot or a worker's answer
+    detector_max_restarts: int = 3  # Crashed workers are respawned; retired after this many failed restarts
+
+    # Image Detection Cache (keyed by upload content + model settings)
+    enable_image_cache: bool = True
+    image_cache_max_bytes: int = 64 * 1024 * 1024  # Annotated images kept in memory
+    image_cache_dir: Path = base_dir / "cache" / "images"  # Evicted entries spill here
+    image_cache_max_disk_entries: int = 10000
+    inline_image_quality: int = 85  # JPEG/WebP quality for ?inline= image responses
 
     # CCTV / RTSP Settings
     max_concurrent_streams: int = 4
@@ -65,6 +127,13 @@ class Settings(BaseSettings):
     stream_reconnect_delay: int = 5
     stream_fps_limit: int = 15
 
+    # Motion Gate (skip CCTV inference while nothing in the scene moves)
+    enable_motion_gate: bool = False
+    motion_threshold: float = 0.002  # Fraction of changed pixels that counts as motion
+    motion_pixel_threshold: int = 25  # Grey-level difference that counts a pixel as changed
+    motion_hold_frames: int = 15  # Keep detecting for N frames after motion stops
+    motion_learning_rate: float = 0.05  # Background adaptation speed
+
     # Logging Settings
     log_level: str = "INFO"
     log_format: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
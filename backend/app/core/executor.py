@@ -0,0 +1,61 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from app.core.config import settings, logger
+
+
+# Bounded pool for CPU-bound request work (decode, inference, drawing, encoding) so the event loop stays free
+_inference_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# Separate pool for fan-out inside a request (decoding, encoding); never submits back to the inference pool
+_decode_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_inference_executor() -> ThreadPoolExecutor:
+    global _inference_executor
+
+    if _inference_executor is None:
+        with _executor_lock:
+            if _inference_executor is None:
+                _inference_executor = ThreadPoolExecutor(
+                    max_workers=max(1, settings.inference_workers),
+                    thread_name_prefix="inference"
+                )
+                logger.info(f"Inference executor started: {settings.inference_workers} workers")
+
+    return _inference_executor
+
+
+def get_decode_executor() -> ThreadPoolExecutor:
+    global _decode_executor
+
+    if _decode_executor is None:
+        with _executor_lock:
+            if _decode_executor is None:
+                _decode_executor = ThreadPoolExecutor(
+                    max_workers=max(1, settings.image_decode_workers),
+                    thread_name_prefix="decode"
+                )
+
+    return _decode_executor
+
+
+async def run_in_inference_executor(func: Callable[..., Any], *args, **kwargs) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_inference_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_inference_executor():
+    global _inference_executor, _decode_executor
+
+    with _executor_lock:
+        if _inference_executor is not None:
+            _inference_executor.shutdown(wait=False, cancel_futures=True)
+            _inference_executor = None
+            logger.info("Inference executor stopped")
+        if _decode_executor is not None:
+            _decode_executor.shutdown(wait=False, cancel_futures=True)
+            _decode_executor = None
@@ -1,14 +1,20 @@
 from app.core.config import settings, ensure_directories, logger
 from app.db.database import init_database
 from app.model.detector import YOLODetector
+from app.services.inference_scheduler import InferenceScheduler
+from app.services.detector_pool import DetectorPool
+from app.core.executor import get_inference_executor, shutdown_inference_executor
+from app.services.video_job_queue import get_video_job_queue
+from app.services.detection_store import prune_detection_store
 
 
 # Global detector instance
-detector_instance: YOLODetector | None = None
+detector_instance: YOLODetector | DetectorPool | None = None
+inference_scheduler: InferenceScheduler | None = None
 
 
 def startup_event():
-    global detector_instance
+    global detector_instance, inference_scheduler
 
     logger.info(f"Starting {settings.app_name} v{settings.version}")
     
@@ -19,6 +25,10 @@ def startup_event():
     init_database()
     logger.info("Database initialized successfully")
     
+    # Stores are only pruned when written; catch up on what expired while the server was down
+    if settings.enable_detection_store:
+        prune_detection_store()
+    
     # Load YOLO model (ONCE at startup)
     if not settings.model_path.exists():
         error_msg = f"YOLO model not found at {settings.model_path}"
@@ -27,14 +37,47 @@ def startup_event():
             f"{error_msg}. Please ensure best.pt is in the app/model/ directory."
         )
     
-    detector_instance = YOLODetector(
-        model_path=str(settings.model_path),
-        confidence=settings.yolo_confidence,
-        iou=settings.yolo_iou,
-        device=settings.yolo_device
-    )
+    if settings.detector_workers > 0:
+        # Each worker process loads the model once; the API process only holds a client facade
+        detector_instance = DetectorPool(
+            num_workers=settings.detector_workers,
+            model_path=str(settings.model_path),
+            confidence=settings.yolo_confidence,
+            iou=settings.yolo_iou,
+            device=settings.yolo_device,
+            backend=settings.inference_backend,
+            imgsz=settings.yolo_imgsz,
+            slots_per_worker=settings.shm_slots_per_worker,
+            max_frame_bytes=settings.shm_max_frame_bytes,
+            worker_threads=settings.detector_worker_threads,
+            request_timeout=settings.detector_request_timeout,
+            max_restarts=settings.detector_max_restarts
+        )
+    else:
+        detector_instance = YOLODetector(
+            model_path=str(settings.model_path),
+            confidence=settings.yolo_confidence,
+            iou=settings.yolo_iou,
+            device=settings.yolo_device,
+            backend=settings.inference_backend,
+            imgsz=settings.yolo_imgsz
+        )
+    
+    logger.info(f"YOLO model loaded successfully (backend={settings.inference_backend})")
     
-    logger.info("YOLO model loaded successfully")
+    # Route all callers through one micro-batching queue
+    if settings.enable_inference_scheduler:
+        inference_scheduler = InferenceScheduler(
+            detector_instance,
+            max_batch_size=settings.scheduler_max_batch_size,
+            max_wait_ms=settings.scheduler_max_wait_ms
+        )
+    
+    # Bounded pool that keeps CPU-bound request work off the event loop
+    get_inference_executor()
+    
+    # Async video workers; picks up jobs left queued or interrupted by the last shutdown
+    get_video_job_queue().restore()
     
     # Log entry-exit line configuration
     logger.info(f"Entry-exit lines configured: {settings.entry_line_start} → {settings.entry_line_end}")
@@ -43,15 +86,26 @@ def startup_event():
 
 
 def shutdown_event():
-    global detector_instance
+    global detector_instance, inference_scheduler
     logger.info("Shutting down application")
+    get_video_job_queue().shutdown()
+    shutdown_inference_executor()
+    if inference_scheduler is not None:
+        inference_scheduler.shutdown()
+        inference_scheduler = None
+    if isinstance(detector_instance, DetectorPool):
+        detector_instance.shutdown()
     detector_instance = None
     logger.info("Application shutdown complete")
 
 
-def get_detector() -> YOLODetector:
+def get_detector() -> YOLODetector | DetectorPool | InferenceScheduler:
     if detector_instance is None:
         error_msg = "Detector not initialized. Ensure startup_event() has been called."
         logger.error(error_msg)
         raise RuntimeError(error_msg)
+    
+    # The scheduler and pool expose the same detect/detect_batch interface as YOLODetector
+    if inference_scheduler is not None:
+        return inference_scheduler
     return detector_instance
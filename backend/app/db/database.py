@@ -1,6 +1,6 @@
 import sqlite3
 from contextlib import contextmanager
-from typing import Generator, Optional
+from typing import Generator, Optional, List, Tuple
 from datetime import datetime
 from app.core.config import settings, logger
 
@@ -65,6 +65,23 @@ def init_database():
         )
     """)
     
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS video_jobs (
+            job_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL DEFAULT 'queued',
+            input_path TEXT NOT NULL,
+            output_filename TEXT NOT NULL,
+            enable_counting INTEGER DEFAULT 1,
+            camera_id TEXT DEFAULT 'default',
+            output_mode TEXT DEFAULT 'video',
+            result TEXT,
+            error_message TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            completed_at TIMESTAMP
+        )
+    """)
+    
     cursor.execute("""
         CREATE INDEX IF NOT EXISTS idx_rickshaw_logs_timestamp 
         ON rickshaw_logs(timestamp)
@@ -85,6 +102,16 @@ def init_database():
         ON analytics_summary(date)
     """)
     
+    # Columns added after the video_jobs table was first created
+    video_job_columns = {row[1] for row in cursor.execute("PRAGMA table_info(video_jobs)")}
+    if "output_mode" not in video_job_columns:
+        cursor.execute("ALTER TABLE video_jobs ADD COLUMN output_mode TEXT DEFAULT 'video'")
+    
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_video_jobs_status 
+        ON video_jobs(status)
+    """)
+    
     conn.commit()
     conn.close()
     
@@ -118,6 +145,20 @@ def insert_detection(file_type: str, file_name: str, rickshaw_count: int) -> int
         return record_id
 
 
+def insert_detections_batch(records: List[Tuple[str, str, int]]) -> int:
+    # records: (file_type, file_name, rickshaw_count); one transaction for the whole batch
+    if not records:
+        return 0
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT INTO detections (file_type, file_name, rickshaw_count) VALUES (?, ?, ?)",
+            records
+        )
+        logger.info(f"Inserted {len(records)} detection records in one batch")
+        return len(records)
+
+
 def get_all_detections(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
@@ -283,3 +324,59 @@ def get_total_counts(camera_id: str = "default") -> dict:
             "total_exit": row['total_exit'] or 0,
             "net_count": (row['total_entry'] or 0) - (row['total_exit'] or 0)
         }
+
+
+def insert_video_job(
+    job_id: str,
+    input_path: str,
+    output_filename: str,
+    enable_counting: bool = True,
+    camera_id: str = "default",
+    output_mode: str = "video"
+):
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """INSERT INTO video_jobs (job_id, status, input_path, output_filename, enable_counting, camera_id, output_mode)
+               VALUES (?, 'queued', ?, ?, ?, ?, ?)""",
+            (job_id, input_path, output_filename, int(enable_counting), camera_id, output_mode)
+        )
+
+
+def update_video_job(
+    job_id: str,
+    status: str,
+    result: Optional[str] = None,
+    error_message: Optional[str] = None
+):
+    # started_at is set on the first transition to processing, completed_at on any terminal status
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """UPDATE video_jobs SET
+                   status = ?,
+                   result = COALESCE(?, result),
+                   error_message = COALESCE(?, error_message),
+                   started_at = CASE WHEN ? = 'processing' THEN CURRENT_TIMESTAMP ELSE started_at END,
+                   completed_at = CASE WHEN ? IN ('completed', 'failed', 'stopped') THEN CURRENT_TIMESTAMP ELSE completed_at END
+               WHERE job_id = ?""",
+            (status, result, error_message, status, status, job_id)
+        )
+
+
+def get_video_job(job_id: str) -> Optional[dict]:
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM video_jobs WHERE job_id = ?", (job_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+
+def get_unfinished_video_jobs() -> list[dict]:
+    # Jobs that were queued or interrupted mid-processing, oldest first
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT * FROM video_jobs WHERE status IN ('queued', 'processing') ORDER BY created_at, rowid"
+        )
+        return [dict(row) for row in cursor.fetchall()]
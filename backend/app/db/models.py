@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 
 class DetectionRecord(BaseModel):
@@ -34,9 +34,37 @@ class ImageDetectionResponse(BaseModel):
     file_name: str = Field(..., description="Name of the output file")
     rickshaw_count: int = Field(..., ge=0, description="Number of rickshaws detected")
     output_url: str = Field(..., description="URL to access the processed image")
+    cached: bool = Field(default=False, description="Result served from the detection cache")
     message: str = "Image processed successfully"
 
 
+class BatchImageResult(BaseModel):
+    source_file: str = Field(..., description="Uploaded file name (or zip entry name)")
+    success: bool = True
+    file_name: Optional[str] = Field(None, description="Name of the output file")
+    rickshaw_count: int = Field(default=0, ge=0, description="Number of rickshaws detected")
+    output_url: Optional[str] = Field(None, description="URL to access the processed image")
+    cached: bool = Field(default=False, description="Result served from the detection cache")
+    error: Optional[str] = Field(None, description="Why this file could not be processed")
+
+
+class BatchImageDetectionResponse(BaseModel):
+    success: bool = True
+    total_files: int = Field(..., ge=0, description="Number of images received (zip entries included)")
+    processed: int = Field(..., ge=0, description="Number of images processed successfully")
+    failed: int = Field(..., ge=0, description="Number of images that could not be processed")
+    total_rickshaws: int = Field(..., ge=0, description="Sum of rickshaw counts over all images")
+    results: List[BatchImageResult]
+    message: str = "Images processed successfully"
+
+
+class VideoCountEvent(BaseModel):
+    frame_number: int = Field(..., description="Frame in which the line was crossed")
+    event_type: str = Field(..., description="Event type: 'entry' or 'exit'")
+    rickshaw_id: str = Field(..., description="Tracking ID of rickshaw")
+    confidence: float = Field(..., ge=0, le=1, description="Detection confidence")
+
+
 class VideoDetectionResponse(BaseModel):
     success: bool = True
     file_name: str = Field(..., description="Name of the output file")
@@ -44,10 +72,45 @@ class VideoDetectionResponse(BaseModel):
     total_entry: int = Field(default=0, description="Total entry count")
     total_exit: int = Field(default=0, description="Total exit count")
     net_count: int = Field(default=0, description="Net count (entry - exit)")
-    output_url: str = Field(..., description="URL to access the processed video")
+    output_url: Optional[str] = Field(
+        None, description="URL to access the processed video (the untouched upload for output=overlay, none for output=none)"
+    )
+    output: str = Field(default="video", description="Output mode: 'video', 'none' or 'overlay'")
+    metadata_url: Optional[str] = Field(None, description="Per-frame detections/tracks as NDJSON (output=overlay only)")
+    events: Optional[List[VideoCountEvent]] = Field(None, description="Entry/exit events (output=none and overlay)")
+    render_time_saved_seconds: Optional[float] = Field(
+        None, description="Estimated drawing + encoding time skipped (output=none and overlay)"
+    )
     message: str = "Video processed successfully"
 
 
+class CountingLine(BaseModel):
+    line_start: Tuple[float, float] = Field(..., description="Line start (x, y)")
+    line_end: Tuple[float, float] = Field(..., description="Line end (x, y)")
+
+
+class RecountRequest(BaseModel):
+    lines: List[CountingLine] = Field(..., min_length=1, max_length=100, description="Candidate counting lines")
+    use_percentage: bool = Field(True, description="Coordinates are percentages of the frame size (like entry_line_start)")
+
+
+class LineCountResult(BaseModel):
+    line_start: Tuple[float, float]
+    line_end: Tuple[float, float]
+    total_entry: int = Field(..., ge=0, description="Entry count for this line")
+    total_exit: int = Field(..., ge=0, description="Exit count for this line")
+    net_count: int = Field(..., description="Net count (entry - exit)")
+
+
+class RecountResponse(BaseModel):
+    success: bool = True
+    file_name: str = Field(..., description="Processed video the trajectories belong to")
+    tracks: int = Field(..., ge=0, description="Number of stored tracks")
+    results: List[LineCountResult]
+    elapsed_ms: float = Field(..., ge=0, description="Replay time for all lines")
+    message: str = "Counts recomputed from stored trajectories"
+
+
 class CCTVStreamRequest(BaseModel):
     camera_id: str = Field(..., description="Unique camera identifier")
     rtsp_url: str = Field(..., description="RTSP stream URL")
@@ -4,6 +4,8 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
 from app.core.config import settings, logger
 from app.core.startup import startup_event, shutdown_event
+from app.core import startup
+from app.services.detection_cache import get_detection_cache
 from app.routes import detect_image, detect_video, history, analytics, detect_cctv, logs, export, stream_video, stream_cctv
 
 
@@ -102,11 +104,20 @@ async def root():
 # Health check endpoint
 @app.get("/health", tags=["Health"])
 async def health_check():
-    return {
+    health = {
         "status": "healthy",
         "service": settings.app_name,
         "version": settings.version
     }
+    
+    if startup.inference_scheduler is not None:
+        health["inference_scheduler"] = startup.inference_scheduler.get_stats()
+    
+    detection_cache = get_detection_cache()
+    if detection_cache is not None:
+        health["image_cache"] = detection_cache.get_stats()
+    
+    return health
 
 
 # Global exception handler
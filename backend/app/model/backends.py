@@ -0,0 +1,70 @@
+from pathlib import Path
+from ultralytics import YOLO
+from app.core.config import settings, logger
+
+
+# Supported inference backends
+BACKEND_TORCH = "torch"
+BACKEND_ONNX = "onnx"
+BACKEND_OPENVINO = "openvino"
+BACKEND_ONNX_INT8 = "onnx-int8"
+SUPPORTED_BACKENDS = (BACKEND_TORCH, BACKEND_ONNX, BACKEND_OPENVINO, BACKEND_ONNX_INT8)
+
+
+def get_artifact_path(model_path: Path, backend: str) -> Path:
+    # Exported artifacts are cached next to the source weights
+    if backend == BACKEND_ONNX:
+        return model_path.with_suffix(".onnx")
+    if backend == BACKEND_OPENVINO:
+        return model_path.parent / f"{model_path.stem}_openvino_model"
+    if backend == BACKEND_ONNX_INT8:
+        return model_path.with_suffix(".int8.onnx")
+    return model_path
+
+
+def _is_stale(artifact_path: Path, model_path: Path) -> bool:
+    if not artifact_path.exists():
+        return True
+    return artifact_path.stat().st_mtime < model_path.stat().st_mtime
+
+
+def resolve_model_artifact(model_path: str, backend: str = BACKEND_TORCH, imgsz: int = 640) -> str:
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(
+            f"Unsupported inference backend: {backend}. "
+            f"Supported backends: {', '.join(SUPPORTED_BACKENDS)}"
+        )
+
+    model_path = Path(model_path)
+    if backend == BACKEND_TORCH:
+        return str(model_path)
+
+    artifact_path = get_artifact_path(model_path, backend)
+    if not _is_stale(artifact_path, model_path):
+        logger.info(f"Using cached {backend} model: {artifact_path}")
+        return str(artifact_path)
+
+    if backend == BACKEND_ONNX_INT8:
+        # INT8 needs sample frames for calibration, so it can only be built when they are available
+        from app.model.quantize import quantize_model
+
+        if not settings.calibration_frames_dir.is_dir():
+            raise FileNotFoundError(
+                f"INT8 model not found at {artifact_path} and no calibration frames in "
+                f"{settings.calibration_frames_dir}. Run: python -m app.model.quantize calibrate --frames <dir>"
+            )
+        return str(quantize_model(str(model_path), settings.calibration_frames_dir, imgsz,
+                                  settings.calibration_max_frames))
+
+    logger.info(f"Exporting {model_path} to {backend} (imgsz={imgsz}), this only happens once")
+
+    # Dynamic axes keep batched and resized inference working on the exported graph
+    exported_path = YOLO(str(model_path)).export(
+        format=backend,
+        imgsz=imgsz,
+        dynamic=True,
+        simplify=backend == BACKEND_ONNX
+    )
+
+    logger.info(f"Exported {backend} model cached at {exported_path}")
+    return str(exported_path)
@@ -1,6 +1,9 @@
 from ultralytics import YOLO
+import threading
 import numpy as np
-from typing import List, Tuple
+from typing import List, Optional
+from app.core.config import settings, logger
+from app.model.backends import resolve_model_artifact, BACKEND_TORCH
 
 
 class DetectionResult:
@@ -12,62 +15,115 @@ class DetectionResult:
     
     def __len__(self):
         return self.count
+    
+    @classmethod
+    def empty(cls) -> "DetectionResult":
+        return cls(
+            np.empty((0, 4), dtype=np.float32),
+            np.empty(0, dtype=np.float32),
+            np.empty(0, dtype=int)
+        )
+    
+    def rescaled(
+        self,
+        scale_x: float = 1.0,
+        scale_y: float = 1.0,
+        offset_x: float = 0.0,
+        offset_y: float = 0.0
+    ) -> "DetectionResult":
+        # Map boxes from a resized/cropped detection input back to original frame coordinates
+        if self.count == 0 or (scale_x == 1.0 and scale_y == 1.0 and offset_x == 0 and offset_y == 0):
+            return self
+        
+        boxes = self.boxes / np.array([scale_x, scale_y, scale_x, scale_y], dtype=np.float32)
+        boxes += np.array([offset_x, offset_y, offset_x, offset_y], dtype=np.float32)
+        return DetectionResult(boxes, self.confidences, self.class_ids)
+    
+    def filtered(self, mask: np.ndarray) -> "DetectionResult":
+        return DetectionResult(self.boxes[mask], self.confidences[mask], self.class_ids[mask])
 
 
 class YOLODetector:
-    def __init__(self, model_path: str, confidence: float = 0.25, iou: float = 0.45, device: str = "cpu"):
+    def __init__(
+        self,
+        model_path: str,
+        confidence: float = 0.25,
+        iou: float = 0.45,
+        device: str = "cpu",
+        backend: str = BACKEND_TORCH,
+        imgsz: int = 640
+    ):
         self.model_path = model_path
         self.confidence = confidence
         self.iou = iou
         self.device = device
+        self.backend = backend
+        self.imgsz = imgsz
+        
+        # Ultralytics predictors are not thread-safe; executor, CCTV and job threads share this model
+        self._predict_lock = threading.Lock()
         
-        self.model = YOLO(model_path)
-        self.model.to(device)
+        # Exported backends (ONNX Runtime / OpenVINO) are loaded through the same YOLO wrapper
+        self.model = YOLO(resolve_model_artifact(model_path, backend, imgsz), task="detect")
+        if backend == BACKEND_TORCH:
+            self.model.to(device)
         self.class_names = self.model.names
+        self.target_class_ids = self._resolve_target_class_ids(settings.target_class)
     
-    def detect(self, image: np.ndarray) -> DetectionResult:
-        # Run inference
-        results = self.model.predict(
-            image,
-            conf=self.confidence,
-            iou=self.iou,
-            verbose=False,
-            device=self.device
-        )
+    def _resolve_target_class_ids(self, target_class: str) -> Optional[np.ndarray]:
+        target_ids = [
+            class_id for class_id, name in self.class_names.items()
+            if name.lower() == target_class.lower()
+        ]
+        
+        # Single-class models may use a different label, so only filter when the class exists
+        if not target_ids:
+            logger.warning(f"Target class '{target_class}' not found in model classes "
+                           f"{list(self.class_names.values())}; keeping all classes")
+            return None
+        
+        return np.array(target_ids, dtype=int)
+    
+    def detect(self, image: np.ndarray, imgsz: Optional[int] = None) -> DetectionResult:
+        return self.detect_batch([image], imgsz)[0]
+    
+    def detect_batch(self, images: List[np.ndarray], imgsz: Optional[int] = None) -> List[DetectionResult]:
+        if not images:
+            return []
         
-        # Extract results from the first (and only) image
-        result = results[0]
+        # Run inference on all images in a single forward pass
+        with self._predict_lock:
+            results = self.model.predict(
+                images,
+                imgsz=imgsz or self.imgsz,
+                conf=self.confidence,
+                iou=self.iou,
+                verbose=False,
+                device=self.device
+            )
         
-        # Extract bounding boxes, confidences, and class IDs
-        boxes = []
-        confidences = []
-        class_ids = []
+        return [self._to_detection_result(result) for result in results]
+    
+    def _to_detection_result(self, result) -> DetectionResult:
+        if result.boxes is None or len(result.boxes) == 0:
+            return DetectionResult.empty()
         
-        if result.boxes is not None and len(result.boxes) > 0:
-            for box in result.boxes:
-                # Get box coordinates (x1, y1, x2, y2)
-                xyxy = box.xyxy[0].cpu().numpy()
-                boxes.append(xyxy)
-                
-                # Get confidence
-                conf = box.conf[0].cpu().numpy()
-                confidences.append(float(conf))
-                
-                # Get class ID
-                cls = int(box.cls[0].cpu().numpy())
-                class_ids.append(cls)
+        # Convert the whole boxes tensor to numpy in one go: (x1, y1, x2, y2, ..., conf, cls)
+        data = result.boxes.data.cpu().numpy()
+        boxes = data[:, :4]
+        confidences = data[:, -2]
+        class_ids = data[:, -1].astype(int)
         
-        # Convert to numpy arrays
-        boxes = np.array(boxes) if boxes else np.array([]).reshape(0, 4)
-        confidences = np.array(confidences) if confidences else np.array([])
-        class_ids = np.array(class_ids, dtype=int) if class_ids else np.array([], dtype=int)
+        # Apply confidence and target class filters as a single vectorized mask
+        keep = confidences >= settings.min_detection_confidence
+        if self.target_class_ids is not None:
+            keep &= np.isin(class_ids, self.target_class_ids)
         
-        return DetectionResult(boxes, confidences, class_ids)
+        return DetectionResult(boxes, confidences, class_ids).filtered(keep)
     
     def get_class_name(self, class_id: int) -> str:
         return self.class_names.get(class_id, "unknown")
     
     def count_rickshaws(self, detection_result: DetectionResult) -> int:
-        # Count all detections (assuming model is trained only for rickshaws)
-        # If your model has multiple classes, you can filter by class name here
+        # Detections are already filtered to settings.target_class in _to_detection_result
         return len(detection_result)
@@ -0,0 +1,214 @@
+import argparse
+import json
+import time
+import cv2
+import numpy as np
+from pathlib import Path
+from typing import List, Optional
+from app.core.config import settings, logger
+from app.model.backends import (
+    resolve_model_artifact, get_artifact_path, BACKEND_ONNX, BACKEND_ONNX_INT8
+)
+
+
+def list_calibration_frames(frames_dir: Path, max_frames: Optional[int] = None) -> List[Path]:
+    frames_dir = Path(frames_dir)
+    if not frames_dir.is_dir():
+        raise FileNotFoundError(f"Calibration frames directory not found: {frames_dir}")
+
+    frame_paths = sorted(
+        path for path in frames_dir.iterdir()
+        if path.suffix.lower() in settings.allowed_image_extensions
+    )
+    if not frame_paths:
+        raise ValueError(f"No sample frames found in {frames_dir}")
+
+    return frame_paths[:max_frames] if max_frames else frame_paths
+
+
+def letterbox_tensor(image: np.ndarray, imgsz: int) -> np.ndarray:
+    # Same preprocessing as ultralytics: letterbox to a square, BGR -> RGB, HWC -> NCHW, 0-1 range
+    height, width = image.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    resized_w, resized_h = int(round(width * scale)), int(round(height * scale))
+    resized = cv2.resize(image, (resized_w, resized_h), interpolation=cv2.INTER_LINEAR)
+
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top = (imgsz - resized_h) // 2
+    left = (imgsz - resized_w) // 2
+    canvas[top:top + resized_h, left:left + resized_w] = resized
+
+    tensor = canvas[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+    return np.ascontiguousarray(tensor[np.newaxis])
+
+
+def _load_calibration_reader_class():
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class FrameCalibrationReader(CalibrationDataReader):
+        def __init__(self, input_name: str, frame_paths: List[Path], imgsz: int):
+            self.input_name = input_name
+            self.frame_paths = iter(frame_paths)
+            self.imgsz = imgsz
+
+        def get_next(self) -> Optional[dict]:
+            for frame_path in self.frame_paths:
+                image = cv2.imread(str(frame_path))
+                if image is None:
+                    logger.warning(f"Skipping unreadable calibration frame: {frame_path}")
+                    continue
+                return {self.input_name: letterbox_tensor(image, self.imgsz)}
+            return None
+
+    return FrameCalibrationReader
+
+
+def quantize_model(
+    model_path: str,
+    frames_dir: Path,
+    imgsz: int = 640,
+    max_frames: Optional[int] = None
+) -> Path:
+    import onnx
+    import onnxruntime
+    from onnxruntime.quantization import quantize_static, QuantFormat, QuantType
+
+    frame_paths = list_calibration_frames(frames_dir, max_frames)
+    fp32_path = Path(resolve_model_artifact(model_path, BACKEND_ONNX, imgsz))
+    int8_path = get_artifact_path(Path(model_path), BACKEND_ONNX_INT8)
+
+    session = onnxruntime.InferenceSession(str(fp32_path), providers=["CPUExecutionProvider"])
+    input_name = session.get_inputs()[0].name
+    del session
+
+    logger.info(f"Calibrating INT8 model on {len(frame_paths)} frames from {frames_dir}")
+    reader = _load_calibration_reader_class()(input_name, frame_paths, imgsz)
+
+    start_time = time.time()
+    quantize_static(
+        str(fp32_path),
+        str(int8_path),
+        reader,
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True
+    )
+
+    # ultralytics reads class names, stride and imgsz from the ONNX metadata
+    fp32_model = onnx.load(str(fp32_path))
+    int8_model = onnx.load(str(int8_path))
+    existing_keys = {prop.key for prop in int8_model.metadata_props}
+    for prop in fp32_model.metadata_props:
+        if prop.key not in existing_keys:
+            int8_model.metadata_props.add(key=prop.key, value=prop.value)
+    onnx.save(int8_model, str(int8_path))
+
+    logger.info(f"INT8 model saved to {int8_path} in {time.time() - start_time:.1f}s")
+    return int8_path
+
+
+def _run_detector(detector, images: List[np.ndarray]) -> dict:
+    # Warm up once so session initialization is not counted in fps
+    detector.detect(images[0])
+
+    counts = []
+    start_time = time.perf_counter()
+    for image in images:
+        counts.append(detector.count_rickshaws(detector.detect(image)))
+    elapsed = time.perf_counter() - start_time
+
+    return {
+        "counts": counts,
+        "fps": round(len(images) / elapsed, 2) if elapsed > 0 else 0.0,
+        "avg_latency_ms": round(elapsed / len(images) * 1000, 2)
+    }
+
+
+def compare_models(
+    model_path: str,
+    frames_dir: Path,
+    baseline_backend: str = BACKEND_ONNX,
+    imgsz: int = 640,
+    max_frames: Optional[int] = None
+) -> dict:
+    from app.model.detector import YOLODetector
+
+    frame_paths = list_calibration_frames(frames_dir, max_frames)
+    images = [image for image in (cv2.imread(str(path)) for path in frame_paths) if image is not None]
+    if not images:
+        raise ValueError(f"No readable sample frames in {frames_dir}")
+
+    def load(backend: str) -> YOLODetector:
+        return YOLODetector(
+            model_path=model_path,
+            confidence=settings.yolo_confidence,
+            iou=settings.yolo_iou,
+            device=settings.yolo_device,
+            backend=backend,
+            imgsz=imgsz
+        )
+
+    baseline = _run_detector(load(baseline_backend), images)
+    quantized = _run_detector(load(BACKEND_ONNX_INT8), images)
+
+    baseline_counts = np.array(baseline["counts"])
+    quantized_counts = np.array(quantized["counts"])
+    count_errors = np.abs(quantized_counts - baseline_counts)
+
+    return {
+        "frames": len(images),
+        "frames_dir": str(frames_dir),
+        "baseline_backend": baseline_backend,
+        "baseline": {
+            "fps": baseline["fps"],
+            "avg_latency_ms": baseline["avg_latency_ms"],
+            "total_count": int(baseline_counts.sum())
+        },
+        "int8": {
+            "fps": quantized["fps"],
+            "avg_latency_ms": quantized["avg_latency_ms"],
+            "total_count": int(quantized_counts.sum())
+        },
+        "speedup": round(quantized["fps"] / baseline["fps"], 2) if baseline["fps"] > 0 else None,
+        "count_accuracy": {
+            "exact_match_rate": round(float(np.mean(count_errors == 0)), 4),
+            "mean_absolute_error": round(float(np.mean(count_errors)), 4),
+            "max_absolute_error": int(count_errors.max()),
+            "total_count_difference": int(quantized_counts.sum() - baseline_counts.sum())
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="INT8 post-training quantization for the rickshaw detector")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    calibrate_parser = subparsers.add_parser("calibrate", help="Build the INT8 model from sample frames")
+    report_parser = subparsers.add_parser("report", help="Compare INT8 count accuracy and fps against FP32")
+
+    for subparser in (calibrate_parser, report_parser):
+        subparser.add_argument("--frames", type=Path, default=settings.calibration_frames_dir,
+                               help="Folder of sample frames (use each camera's own frames for a per-camera report)")
+        subparser.add_argument("--max-frames", type=int, default=settings.calibration_max_frames)
+        subparser.add_argument("--imgsz", type=int, default=settings.yolo_imgsz)
+
+    report_parser.add_argument("--baseline", default=BACKEND_ONNX, help="FP32 backend to compare against")
+    report_parser.add_argument("--output", type=Path, help="Write the report JSON to this file")
+
+    args = parser.parse_args()
+
+    if args.command == "calibrate":
+        int8_path = quantize_model(str(settings.model_path), args.frames, args.imgsz, args.max_frames)
+        print(f"INT8 model written to {int8_path}")
+        return
+
+    report = compare_models(str(settings.model_path), args.frames, args.baseline, args.imgsz, args.max_frames)
+    report_json = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(report_json)
+    print(report_json)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Optional, List, Tuple
 from app.db.models import CCTVStreamRequest
 from app.services.cctv_service import CCTVService
 from app.core.startup import get_detector
@@ -14,6 +14,12 @@ class CCTVStartRequest(BaseModel):
     camera_id: str
     rtsp_url: str
     camera_name: Optional[str] = "Camera"
+    scale_factor: Optional[float] = Field(None, gt=0, le=1, description="Shrinks the model input to yolo_imgsz * scale_factor unless imgsz is set (default: detection_scale_factor)")
+    imgsz: Optional[int] = Field(None, ge=32, le=1920, description="Model input size for this camera (default: yolo_imgsz)")
+    roi_mode: Optional[str] = Field(None, pattern="^(full|band|polygon)$", description="Region of interest for inference (default: roi_mode)")
+    roi_band_margin: Optional[float] = Field(None, gt=0, le=100, description="Band half-size around the counting line, % of frame")
+    roi_polygon: Optional[List[Tuple[float, float]]] = Field(None, description="Polygon vertices in % of frame for 'polygon' mode")
+    motion_gate: Optional[bool] = Field(None, description="Skip detection while the scene is static (default: enable_motion_gate)")
 
 
 class CCTVStatusResponse(BaseModel):
@@ -28,6 +34,7 @@ class CCTVStatusResponse(BaseModel):
     fps: float
     uptime: float
     stream_properties: Optional[dict] = None
+    motion_gate: Optional[dict] = None
     error_message: Optional[str] = None
 
 
@@ -50,7 +57,13 @@ async def start_cctv_stream(request: CCTVStartRequest):
         result = cctv_service.start_continuous_stream(
             camera_id=request.camera_id,
             rtsp_url=request.rtsp_url,
-            camera_name=request.camera_name or request.camera_id
+            camera_name=request.camera_name or request.camera_id,
+            scale_factor=request.scale_factor,
+            imgsz=request.imgsz,
+            roi_mode=request.roi_mode,
+            roi_band_margin=request.roi_band_margin,
+            roi_polygon=request.roi_polygon,
+            motion_gate=request.motion_gate
         )
         
         logger.info(f"Continuous stream started: {result}")
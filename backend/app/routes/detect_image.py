@@ -1,7 +1,10 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
-from app.db.models import ImageDetectionResponse, ErrorResponse
+from typing import List, Optional
+from fastapi import APIRouter, File, UploadFile, HTTPException, Query
+from fastapi.responses import Response
+from app.db.models import ImageDetectionResponse, BatchImageDetectionResponse, BatchImageResult, ErrorResponse
 from app.services.inference_service import InferenceService
 from app.core.startup import get_detector
+from app.core.executor import run_in_inference_executor
 from app.utils.file_utils import validate_image_file
 
 
@@ -13,13 +16,18 @@ router = APIRouter(prefix="/detect", tags=["Detection"])
     "/image",
     response_model=ImageDetectionResponse,
     responses={
+        200: {"content": {"image/jpeg": {}, "image/webp": {}}, "description": "Annotated image bytes when inline is set"},
         400: {"model": ErrorResponse, "description": "Invalid file format"},
         500: {"model": ErrorResponse, "description": "Processing error"}
     },
     summary="Detect rickshaws in an image",
-    description="Upload an image file to detect and count rickshaws. Returns annotated image with bounding boxes."
+    description="Upload an image file to detect and count rickshaws. Returns annotated image with bounding boxes, "
+                "or the annotated image itself with an X-Rickshaw-Count header when inline is set."
 )
-async def detect_image(file: UploadFile = File(..., description="Image file to process")):
+async def detect_image(
+    file: UploadFile = File(..., description="Image file to process"),
+    inline: Optional[str] = Query(None, pattern="^(jpeg|webp)$", description="Return the annotated image in the response body instead of saving it")
+):
     try:
         # Validate file
         validate_image_file(file)
@@ -31,12 +39,23 @@ async def detect_image(file: UploadFile = File(..., description="Image file to p
         inference_service = InferenceService(detector)
         
         # Process image
-        result = await inference_service.process_image(file)
+        result = await inference_service.process_image(file, inline_format=inline)
+        
+        if inline:
+            return Response(
+                content=result["image_bytes"],
+                media_type=result["media_type"],
+                headers={
+                    "X-Rickshaw-Count": str(result["rickshaw_count"]),
+                    "X-Detection-Cached": str(result["cached"]).lower()
+                }
+            )
         
         return ImageDetectionResponse(
             file_name=result["file_name"],
             rickshaw_count=result["rickshaw_count"],
-            output_url=result["output_url"]
+            output_url=result["output_url"],
+            cached=result["cached"]
         )
         
     except HTTPException:
@@ -46,3 +65,47 @@ async def detect_image(file: UploadFile = File(..., description="Image file to p
             status_code=500,
             detail=f"Error processing image: {str(e)}"
         )
+
+
+@router.post(
+    "/images",
+    response_model=BatchImageDetectionResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid batch"},
+        500: {"model": ErrorResponse, "description": "Processing error"}
+    },
+    summary="Detect rickshaws in many images",
+    description="Upload multiple image files and/or zip archives of images. Images are decoded in parallel, "
+                "run through the detector in batches, and reported per file."
+)
+async def detect_images(files: List[UploadFile] = File(..., description="Image files or zip archives to process")):
+    try:
+        uploads = [(file.filename or "", await file.read()) for file in files]
+        
+        # Get detector instance
+        detector = get_detector()
+        
+        # Create inference service
+        inference_service = InferenceService(detector)
+        
+        # Process the whole batch off the event loop
+        results = await run_in_inference_executor(inference_service.process_image_batch, uploads)
+        
+        processed = sum(1 for result in results if result.get("success", True))
+        return BatchImageDetectionResponse(
+            total_files=len(results),
+            processed=processed,
+            failed=len(results) - processed,
+            total_rickshaws=sum(result.get("rickshaw_count", 0) for result in results),
+            results=[BatchImageResult(**result) for result in results]
+        )
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing images: {str(e)}"
+        )
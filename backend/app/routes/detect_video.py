@@ -1,10 +1,13 @@
+import json
 import uuid
-import threading
 from pathlib import Path
+from typing import Optional
 from fastapi import APIRouter, File, UploadFile, HTTPException, Query
-from app.db.models import VideoDetectionResponse, ErrorResponse
+from app.db.models import VideoDetectionResponse, RecountRequest, RecountResponse, ErrorResponse
 from app.services.video_service import VideoService
 from app.services.video_job_manager import get_job_manager
+from app.services.video_job_queue import get_video_job_queue, QueueFullError
+from app.db.database import get_video_job
 from app.core.startup import get_detector
 from app.utils.file_utils import validate_video_file, generate_unique_filename, save_upload_file
 from app.core.config import settings, logger
@@ -27,7 +30,10 @@ router = APIRouter(prefix="/detect", tags=["Detection"])
 async def detect_video(
     file: UploadFile = File(..., description="Video file to process"),
     enable_counting: bool = Query(True, description="Enable entry/exit counting"),
-    camera_id: str = Query("default", description="Camera identifier for logging")
+    camera_id: str = Query("default", description="Camera identifier for logging"),
+    adaptive_skip: Optional[bool] = Query(None, description="Skip frames adaptively and interpolate boxes (default: adaptive_frame_skip)"),
+    chunked: Optional[bool] = Query(None, description="Split long videos across worker processes (default: enable_chunked_video)"),
+    output: str = Query("video", pattern="^(video|none|overlay)$", description="'video' writes the annotated video, 'none' only returns counts and events, 'overlay' keeps the video untouched and returns per-frame detections for client-side drawing")
 ):
     try:
         logger.info(f"Video detection request: {file.filename}, counting={enable_counting}")
@@ -45,7 +51,10 @@ async def detect_video(
         result = await video_service.process_video(
             file=file,
             enable_counting=enable_counting,
-            camera_id=camera_id
+            camera_id=camera_id,
+            adaptive_skip=adaptive_skip,
+            chunked=chunked,
+            output=output
         )
         
         logger.info(f"Video processing complete: {result}")
@@ -56,7 +65,11 @@ async def detect_video(
             total_entry=result["total_entry"],
             total_exit=result["total_exit"],
             net_count=result["net_count"],
-            output_url=result["output_url"]
+            output_url=result["output_url"],
+            output=result["output"],
+            metadata_url=result.get("metadata_url"),
+            events=result.get("events"),
+            render_time_saved_seconds=result.get("render_time_saved_seconds")
         )
         
     except HTTPException:
@@ -69,51 +82,126 @@ async def detect_video(
         )
 
 
+@router.post(
+    "/video/{file_name}/rerender",
+    response_model=VideoDetectionResponse,
+    responses={
+        404: {"model": ErrorResponse, "description": "No stored detections for this video"},
+        500: {"model": ErrorResponse, "description": "Processing error"}
+    },
+    summary="Re-render a processed video without inference",
+    description="Draw a new annotated video from the detections stored when the video was first processed. Tracking and counting are replayed with the current counting line; the model is not run."
+)
+async def rerender_video(
+    file_name: str,
+    enable_counting: bool = Query(True, description="Enable entry/exit counting")
+):
+    try:
+        logger.info(f"Video re-render request: {file_name}, counting={enable_counting}")
+
+        video_service = VideoService(get_detector())
+        result = await video_service.rerender_video(file_name, enable_counting)
+
+        return VideoDetectionResponse(
+            file_name=result["file_name"],
+            rickshaw_count=result["rickshaw_count"],
+            total_entry=result["total_entry"],
+            total_exit=result["total_exit"],
+            net_count=result["net_count"],
+            output_url=result["output_url"],
+            output=result["output"],
+            message="Video re-rendered from stored detections"
+        )
+
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error re-rendering video: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error re-rendering video: {str(e)}"
+        )
+
+
+@router.post(
+    "/video/{file_name}/recount",
+    response_model=RecountResponse,
+    responses={
+        404: {"model": ErrorResponse, "description": "No stored trajectories for this video"},
+        500: {"model": ErrorResponse, "description": "Processing error"}
+    },
+    summary="Recount entries/exits for other counting lines",
+    description="Replay the track trajectories stored when the video was processed against one or more candidate counting lines. No decoding or inference; returns in milliseconds."
+)
+async def recount_video(file_name: str, request: RecountRequest):
+    try:
+        video_service = VideoService(get_detector())
+        result = video_service.recount_video(
+            file_name,
+            [(line.line_start, line.line_end) for line in request.lines],
+            request.use_percentage
+        )
+        return RecountResponse(**result)
+
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error recounting video: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error recounting video: {str(e)}"
+        )
+
+
 @router.post(
     "/video/async",
+    responses={
+        429: {"model": ErrorResponse, "description": "Video job queue is full"}
+    },
     summary="Start video processing with live preview (async)",
-    description="Upload a video and start processing in background. Returns job_id immediately for live preview streaming."
+    description="Upload a video and queue it for background processing. Returns job_id immediately for live preview streaming, or 429 with Retry-After when the queue is full."
 )
 async def detect_video_async(
     file: UploadFile = File(..., description="Video file to process"),
     enable_counting: bool = Query(True, description="Enable entry/exit counting"),
-    camera_id: str = Query("default", description="Camera identifier for logging")
+    camera_id: str = Query("default", description="Camera identifier for logging"),
+    output: str = Query("video", pattern="^(video|none|overlay)$", description="'video' writes the annotated video, 'none' only returns counts and events, 'overlay' keeps the video untouched and returns per-frame detections for client-side drawing")
 ):
     try:
-        logger.info(f"Async video detection request: {file.filename}")
+        logger.info(f"Async video detection request: {file.filename}, output={output}")
         
         # Validate file
         validate_video_file(file)
         
+        # Reject before reading the upload when there is no room to queue it
+        job_queue = get_video_job_queue()
+        if job_queue.is_full():
+            raise _queue_full_error()
+        
         # Generate job ID and filenames
         job_id = str(uuid.uuid4())
         output_filename = generate_unique_filename(file.filename)
         temp_input_path = settings.videos_output_dir / f"temp_input_{output_filename}"
         
-        # Save uploaded file temporarily
+        # Save uploaded file; it stays on disk until a worker picks the job up
         await save_upload_file(file, temp_input_path)
         logger.info(f"[Job {job_id}] Video saved temporarily: {temp_input_path}")
         
-        # Get detector instance
-        detector = get_detector()
-        
-        # Create video service
-        video_service = VideoService(detector)
-        
-        # *** Start processing in background thread ***
-        processing_thread = threading.Thread(
-            target=video_service.process_video_with_live_preview,
-            args=(job_id, temp_input_path, output_filename, enable_counting, camera_id),
-            daemon=True
-        )
-        processing_thread.start()
-        
-        logger.info(f"[Job {job_id}] Processing started in background thread")
+        try:
+            queue_position = job_queue.submit(job_id, temp_input_path, output_filename, enable_counting, camera_id, output)
+        except QueueFullError:
+            # Queue filled up while the upload was being saved
+            if temp_input_path.exists():
+                temp_input_path.unlink()
+            raise _queue_full_error()
         
         return {
             "success": True,
             "job_id": job_id,
-            "message": "Video processing started. Use /api/stream/video/{job_id} for live preview."
+            "status": "queued",
+            "queue_position": queue_position,
+            "message": "Video queued for processing. Use /api/stream/video/{job_id} for live preview"
+                       + (" and /api/stream/metadata/{job_id} for detections." if output == "overlay" else ".")
         }
         
     except HTTPException:
@@ -126,6 +214,14 @@ async def detect_video_async(
         )
 
 
+def _queue_full_error() -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Video processing queue is full. Please retry later.",
+        headers={"Retry-After": str(settings.video_job_retry_after)}
+    )
+
+
 @router.get(
     "/video/status/{job_id}",
     summary="Get video processing job status",
@@ -137,10 +233,19 @@ async def get_job_status(job_id: str):
         job = job_manager.get_job(job_id)
         
         if not job:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Job not found: {job_id}"
-            )
+            # Evicted from memory (or from before a restart): answer from the persisted record
+            stored_job = get_video_job(job_id)
+            if not stored_job:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Job not found: {job_id}"
+                )
+            response = {"job_id": job_id, "status": stored_job["status"]}
+            if stored_job["result"]:
+                response["result"] = json.loads(stored_job["result"])
+            if stored_job["error_message"]:
+                response["error"] = stored_job["error_message"]
+            return response
         
         response = {
             "job_id": job_id,
@@ -152,6 +257,10 @@ async def get_job_status(job_id: str):
             "exit_count": job.total_exit
         }
         
+        # Waiting jobs report where they are in line (1 = next to start)
+        if job.status == "queued":
+            response["queue_position"] = get_video_job_queue().get_position(job_id)
+        
         # Include results if completed
         if job.status == "completed":
             response["result"] = {
@@ -160,8 +269,14 @@ async def get_job_status(job_id: str):
                 "total_entry": job.total_entry,
                 "total_exit": job.total_exit,
                 "net_count": job.net_count,
-                "output_url": job.output_url
+                "output_url": job.output_url,
+                "output": job.output
             }
+            if job.output == "overlay":
+                response["result"]["metadata_url"] = job.metadata_url
+            if job.output != "video":
+                response["result"]["events"] = job.events
+                response["result"]["render_time_saved_seconds"] = job.render_time_saved_seconds
         
         # Include error if failed
         if job.status == "failed":
@@ -232,13 +347,17 @@ async def resume_job(job_id: str):
 @router.post(
     "/video/stop/{job_id}",
     summary="Stop video processing",
-    description="Stop a running or paused video processing job."
+    description="Stop a queued, running or paused video processing job."
 )
 async def stop_job(job_id: str):
     try:
         job_manager = get_job_manager()
         success = job_manager.stop_job(job_id)
         
+        # A job that has not started yet is dropped from the queue right away
+        if success:
+            get_video_job_queue().cancel(job_id)
+        
         if not success:
             raise HTTPException(
                 status_code=400,
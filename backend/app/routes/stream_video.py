@@ -1,8 +1,10 @@
 import cv2
 import time
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from app.services.video_job_manager import get_job_manager
+from app.services.overlay_metadata import overlay_metadata_path, follow_lines, ndjson_to_webvtt
+from app.db.database import get_video_job
 from app.core.config import logger
 
 
@@ -109,3 +111,65 @@ async def stream_video(job_id: str):
             status_code=500,
             detail=f"Error streaming video: {str(e)}"
         )
+
+
+@router.get(
+    "/metadata/{video_id}",
+    summary="Stream per-frame detection metadata (output=overlay)",
+    description="Stream the detections/tracks of an overlay job as NDJSON or a WebVTT metadata track. "
+                "Accepts a job_id (followed live while the job runs) or the output file name of a finished video."
+)
+async def stream_metadata(
+    video_id: str,
+    format: str = Query("ndjson", pattern="^(ndjson|webvtt)$", description="ndjson or webvtt")
+):
+    try:
+        job_manager = get_job_manager()
+        stored_job = get_video_job(video_id)
+
+        if stored_job:
+            if stored_job.get("output_mode") != "overlay":
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Job {video_id} was not submitted with output=overlay"
+                )
+            metadata_path = overlay_metadata_path(stored_job["output_filename"])
+        else:
+            metadata_path = overlay_metadata_path(video_id)
+            if not metadata_path.exists():
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Metadata not found: {video_id}"
+                )
+
+        def is_running() -> bool:
+            if not stored_job:
+                return False
+            job = job_manager.get_job(video_id)
+            if job:
+                return job.status in ("queued", "processing", "paused")
+            current = get_video_job(video_id)
+            return bool(current) and current["status"] in ("queued", "processing")
+
+        def generate_lines():
+            # Queued jobs have not opened the file yet; wait for it while the job is alive
+            while not metadata_path.exists():
+                if not is_running():
+                    return
+                time.sleep(0.5)
+            yield from follow_lines(metadata_path, is_running)
+
+        logger.info(f"[Stream {video_id}] Starting {format} metadata stream")
+
+        if format == "webvtt":
+            return StreamingResponse(ndjson_to_webvtt(generate_lines()), media_type="text/vtt")
+        return StreamingResponse(generate_lines(), media_type="application/x-ndjson")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[Stream {video_id}] Error streaming metadata: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error streaming metadata: {str(e)}"
+        )
@@ -38,6 +38,9 @@ class CCTVJobState:
     stream_width: int = 0
     stream_height: int = 0
     stream_fps: int = 0
+    
+    # Motion gate statistics (None when the gate is disabled for this camera)
+    motion_gate: Optional[dict] = None
 
 
 class CCTVJobManager:
@@ -132,6 +135,11 @@ class CCTVJobManager:
                 self._jobs[camera_id].stream_fps = fps
                 logger.info(f"Camera {camera_id} properties: {width}x{height} @ {fps}fps")
     
+    def update_motion_gate(self, camera_id: str, stats: dict):
+        with self._jobs_lock:
+            if camera_id in self._jobs:
+                self._jobs[camera_id].motion_gate = stats
+    
     def set_started(self, camera_id: str):
         with self._jobs_lock:
             if camera_id in self._jobs:
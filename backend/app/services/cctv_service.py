@@ -4,12 +4,12 @@ import json
 import time
 import threading
 from datetime import datetime
-from typing import Optional, Dict
-from app.model.detector import YOLODetector
-from app.utils.draw_utils import (
-    draw_detections, draw_entry_exit_line, draw_entry_exit_counts
-)
+from typing import Optional, Dict, List, Tuple
+from app.model.detector import YOLODetector, DetectionResult
+from app.utils.draw_utils import draw_detections, FrameAnnotator
 from app.utils.count_utils import LineCrossingDetector, SimpleTracker
+from app.utils.frame_utils import detect_frames, build_roi, RegionOfInterest
+from app.utils.motion_utils import MotionGate
 from app.db.database import log_rickshaw_event
 from app.services.cctv_job_manager import get_cctv_job_manager
 from app.core.config import settings, logger
@@ -22,7 +22,13 @@ class CCTVStreamProcessor:
         camera_id: str,
         rtsp_url: str,
         camera_name: str = "Camera",
-        continuous_mode: bool = False  # NEW: Enable continuous streaming mode
+        continuous_mode: bool = False,  # NEW: Enable continuous streaming mode
+        scale_factor: Optional[float] = None,
+        imgsz: Optional[int] = None,
+        roi_mode: Optional[str] = None,
+        roi_band_margin: Optional[float] = None,
+        roi_polygon: Optional[List[Tuple[float, float]]] = None,
+        motion_gate: Optional[bool] = None
     ):
         self.detector = detector
         self.camera_id = camera_id
@@ -30,10 +36,30 @@ class CCTVStreamProcessor:
         self.camera_name = camera_name
         self.continuous_mode = continuous_mode  # NEW: Streaming mode flag
         
+        # Per-camera model input: an explicit imgsz, or yolo_imgsz shrunk by the scale factor
+        self.scale_factor = scale_factor if scale_factor is not None else settings.detection_scale_factor
+        self.imgsz = imgsz
+        
+        # Per-camera region of interest around the counting line (built once frame size is known)
+        self.roi_mode = roi_mode or settings.roi_mode
+        self.roi_band_margin = roi_band_margin if roi_band_margin is not None else settings.roi_band_margin
+        self.roi_polygon = roi_polygon or settings.roi_polygon
+        self.roi: Optional[RegionOfInterest] = None
+        
+        # Optional motion gate: skip the detector while nothing moves in the scene
+        use_motion_gate = motion_gate if motion_gate is not None else settings.enable_motion_gate
+        self.motion_gate: Optional[MotionGate] = MotionGate(
+            threshold=settings.motion_threshold,
+            pixel_threshold=settings.motion_pixel_threshold,
+            hold_frames=settings.motion_hold_frames,
+            learning_rate=settings.motion_learning_rate
+        ) if use_motion_gate else None
+        
         self.is_running = False
         self.cap: Optional[cv2.VideoCapture] = None
         self.line_detector: Optional[LineCrossingDetector] = None
         self.tracker: Optional[SimpleTracker] = None
+        self.annotator: Optional[FrameAnnotator] = None
         
         self.frame_count = 0
         self.frames_processed = 0
@@ -87,9 +113,22 @@ class CCTVStreamProcessor:
                 use_percentage=True
             )
             
+            # Camera line + label, pre-rendered on the first annotated frame
+            self.annotator = FrameAnnotator(
+                self.detector,
+                line=self.line_detector.get_line_pixels(),
+                line_label=f"{self.camera_name}"
+            )
+            
             # Initialize tracker
             self.tracker = SimpleTracker()
             
+            self.roi = build_roi(width, height, self.roi_mode, self.roi_band_margin, self.roi_polygon)
+            
+            # The old background is meaningless after a (re)connect
+            if self.motion_gate:
+                self.motion_gate.reset()
+            
             return True
             
         except Exception as e:
@@ -143,11 +182,19 @@ class CCTVStreamProcessor:
     
     def process_frame(self, frame: np.ndarray) -> Optional[np.ndarray]:
         try:
-            # Run detection
-            detection_result = self.detector.detect(frame)
+            # Only look for motion where detection would run
+            motion_frame = self.roi.crop(frame) if self.roi else frame
             
-            # Draw detections
-            annotated_frame = draw_detections(frame, detection_result, self.detector)
+            if self.motion_gate and not self.motion_gate.should_detect(motion_frame):
+                # Static scene: skip the detector and leave the tracker alone. Nothing moved, so the tracks
+                # are still where they were; ageing them would expire a rickshaw waiting at the line
+                detection_result = DetectionResult.empty()
+            else:
+                # Run detection at the camera's input size; boxes come back in frame coordinates
+                detection_result = detect_frames(self.detector, [frame], self.scale_factor, self.imgsz, self.roi)[0]
+            
+            # Draw detections straight into the captured frame (nothing reads it afterwards)
+            annotated_frame = draw_detections(frame, detection_result, self.detector, inplace=True)
             
             # Track objects and check for line crossings
             if len(detection_result) > 0 and self.line_detector and self.tracker:
@@ -184,17 +231,9 @@ class CCTVStreamProcessor:
                             self.exit_count += 1
                 
                 # Draw line and counts
-                if self.line_detector:
-                    line_start, line_end = self.line_detector.get_line_pixels()
-                    annotated_frame = draw_entry_exit_line(
-                        annotated_frame, line_start, line_end, 
-                        label=f"{self.camera_name}"
-                    )
-                    
-                    entry, exit_count, net = self.line_detector.get_counts()
-                    annotated_frame = draw_entry_exit_counts(
-                        annotated_frame, entry, exit_count, net
-                    )
+                if self.line_detector and self.annotator:
+                    self.annotator.draw_line(annotated_frame)
+                    self.annotator.draw_counts(annotated_frame, self.line_detector.get_counts())
             
             self.frames_processed += 1
             
@@ -206,6 +245,8 @@ class CCTVStreamProcessor:
                     self.entry_count,
                     self.exit_count
                 )
+                if self.motion_gate and self.frames_processed % 30 == 0:
+                    self.job_manager.update_motion_gate(self.camera_id, self.motion_gate.get_stats())
             
             return annotated_frame
             
@@ -293,7 +334,8 @@ class CCTVStreamProcessor:
             "net_count": self.entry_count - self.exit_count,
             "frames_processed": self.frames_processed,
             "duration": processing_time,
-            "avg_fps": self.frames_processed / processing_time if processing_time > 0 else 0
+            "avg_fps": self.frames_processed / processing_time if processing_time > 0 else 0,
+            "motion_gate": self.motion_gate.get_stats() if self.motion_gate else None
         }
         
         logger.info(f"Stream processing complete: {stats}")
@@ -317,7 +359,13 @@ class CCTVService:
         self,
         camera_id: str,
         rtsp_url: str,
-        camera_name: str = "Camera"
+        camera_name: str = "Camera",
+        scale_factor: Optional[float] = None,
+        imgsz: Optional[int] = None,
+        roi_mode: Optional[str] = None,
+        roi_band_margin: Optional[float] = None,
+        roi_polygon: Optional[List[Tuple[float, float]]] = None,
+        motion_gate: Optional[bool] = None
     ) -> Dict:
         # Check if camera already streaming
         if camera_id in self.active_streams:
@@ -341,7 +389,13 @@ class CCTVService:
             camera_id=camera_id,
             rtsp_url=rtsp_url,
             camera_name=camera_name,
-            continuous_mode=True  # Enable continuous streaming
+            continuous_mode=True,  # Enable continuous streaming
+            scale_factor=scale_factor,
+            imgsz=imgsz,
+            roi_mode=roi_mode,
+            roi_band_margin=roi_band_margin,
+            roi_polygon=roi_polygon,
+            motion_gate=motion_gate
         )
         
         self.active_streams[camera_id] = processor
@@ -423,6 +477,7 @@ class CCTVService:
                 "height": job.stream_height,
                 "fps": job.stream_fps
             } if job.stream_width > 0 else None,
+            "motion_gate": job.motion_gate,
             "error_message": job.error_message
         }
     
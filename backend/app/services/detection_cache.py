@@ -0,0 +1,210 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+from app.core.config import settings, logger
+
+
+@dataclass
+class CachedDetection:
+    file_name: str
+    rickshaw_count: int
+    output_url: str
+    output_bytes: Optional[bytes] = field(default=None, repr=False)  # Encoded annotated image
+
+    @property
+    def size(self) -> int:
+        return len(self.output_bytes) if self.output_bytes else 0
+
+
+def _model_fingerprint() -> str:
+    # Everything that changes the detections or the drawing; a retrained model changes the mtime
+    model_path = Path(settings.model_path)
+    model_mtime = model_path.stat().st_mtime_ns if model_path.exists() else 0
+    return json.dumps([
+        str(model_path), model_mtime, settings.inference_backend, settings.yolo_imgsz,
+        settings.yolo_confidence, settings.yolo_iou, settings.min_detection_confidence,
+        settings.target_class
+    ])
+
+
+class DetectionCache:
+    def __init__(self, max_bytes: int, cache_dir: Path, max_disk_entries: int = 10000):
+        self.max_bytes = max_bytes
+        self.cache_dir = Path(cache_dir)
+        self.max_disk_entries = max_disk_entries
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._entries: "OrderedDict[str, CachedDetection]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._current_bytes = 0
+        self._fingerprint = _model_fingerprint()
+
+        # Spilled keys, oldest first. Disk I/O never happens under _lock; this index only needs _disk_lock,
+        # so pruning never has to list the directory
+        self._disk_keys: "OrderedDict[str, None]" = OrderedDict()
+        self._disk_lock = threading.Lock()
+        self._load_disk_index()
+
+        # Statistics
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        logger.info(f"DetectionCache initialized: {max_bytes / 1024 / 1024:.0f} MB in memory, spill dir {self.cache_dir}")
+
+    def make_key(self, content: bytes) -> str:
+        digest = hashlib.sha256(content)
+        digest.update(self._fingerprint.encode())
+        return digest.hexdigest()
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[CachedDetection]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if entry is not None:
+            output_exists = (settings.images_output_dir / entry.file_name).exists()
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    if output_exists:
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        return entry
+                    # Output was deleted behind our back; the entry is useless
+                    self._remove(key)
+
+        entry = self._load_from_disk(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            if key in self._entries:
+                # Another request promoted it meanwhile
+                return self._entries[key]
+            evicted = self._insert(key, entry)
+        self._spill_to_disk(evicted)
+        return entry
+
+    def put(self, key: str, entry: CachedDetection):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            evicted = self._insert(key, entry)
+        self._spill_to_disk(evicted)
+
+    def _insert(self, key: str, entry: CachedDetection) -> List[Tuple[str, CachedDetection]]:
+        self._entries[key] = entry
+        self._current_bytes += entry.size
+
+        # Evict least recently used entries until we are back under budget; the caller spills them after unlocking
+        evicted = []
+        while self._current_bytes > self.max_bytes and len(self._entries) > 1:
+            old_key, old_entry = self._entries.popitem(last=False)
+            self._current_bytes -= old_entry.size
+            evicted.append((old_key, old_entry))
+        return evicted
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._current_bytes -= entry.size
+
+    def _load_disk_index(self):
+        # One directory scan at startup; afterwards the index is kept up to date by spills and loads
+        spilled = sorted(self.cache_dir.glob("*.json"), key=lambda path: path.stat().st_mtime)
+        for path in spilled:
+            self._disk_keys[path.stem] = None
+        self._prune_disk()
+
+    def _spill_to_disk(self, evicted: List[Tuple[str, CachedDetection]]):
+        # The annotated image already lives in the outputs dir, so only the metadata is written
+        for key, entry in evicted:
+            try:
+                metadata = asdict(entry)
+                metadata.pop("output_bytes")
+                self._disk_path(key).write_text(json.dumps(metadata))
+            except OSError as e:
+                logger.warning(f"Failed to spill cache entry {key[:12]} to disk: {str(e)}")
+                continue
+            with self._disk_lock:
+                self._disk_keys[key] = None
+                self._disk_keys.move_to_end(key)
+        if evicted:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        with self._disk_lock:
+            expired = []
+            while len(self._disk_keys) > self.max_disk_entries:
+                expired.append(self._disk_keys.popitem(last=False)[0])
+        for key in expired:
+            self._disk_path(key).unlink(missing_ok=True)
+
+    def _forget_disk(self, key: str):
+        with self._disk_lock:
+            self._disk_keys.pop(key, None)
+        self._disk_path(key).unlink(missing_ok=True)
+
+    def _load_from_disk(self, key: str) -> Optional[CachedDetection]:
+        with self._disk_lock:
+            if key not in self._disk_keys:
+                return None
+        path = self._disk_path(key)
+        try:
+            entry = CachedDetection(**json.loads(path.read_text()))
+            output_path = settings.images_output_dir / entry.file_name
+            if not output_path.exists():
+                self._forget_disk(key)
+                return None
+            entry.output_bytes = output_path.read_bytes()
+            self._forget_disk(key)  # Promoted back to memory
+            return entry
+        except FileNotFoundError:
+            # Removed behind our back
+            self._forget_disk(key)
+            return None
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {path.name}: {str(e)}")
+            self._forget_disk(key)
+            return None
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "memory_bytes": self._current_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0
+            }
+
+
+# Singleton instance
+_detection_cache: Optional[DetectionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_detection_cache() -> Optional[DetectionCache]:
+    global _detection_cache
+
+    if not settings.enable_image_cache:
+        return None
+
+    if _detection_cache is None:
+        with _cache_lock:
+            if _detection_cache is None:
+                _detection_cache = DetectionCache(
+                    max_bytes=settings.image_cache_max_bytes,
+                    cache_dir=settings.image_cache_dir,
+                    max_disk_entries=settings.image_cache_max_disk_entries
+                )
+
+    return _detection_cache
@@ -0,0 +1,302 @@
+import json
+import shutil
+import threading
+import time
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from app.model.detector import DetectionResult
+from app.core.config import settings, logger
+
+
+# One record per detection; frames without detections have no records
+DETECTION_DTYPE = np.dtype([
+    ("frame", "<i4"),  # 1-based frame number
+    ("box", "<f4", (4,)),  # x1, y1, x2, y2 in original frame pixels
+    ("confidence", "<f4"),
+    ("class_id", "<i2")
+])
+
+
+# One record per tracked object per analysed frame, in the order LineCrossingDetector saw them
+TRACK_DTYPE = np.dtype([
+    ("segment", "<i2"),  # Chunk index (track IDs are only unique within a chunk); 0 for sequential runs
+    ("track", "<i4"),
+    ("frame", "<i4"),
+    ("center", "<f4", (2,))  # Box center in original frame pixels
+])
+
+
+def _store_paths(file_name: str) -> Tuple[Path, Path]:
+    # Keyed by the output file name's stem (a UUID); never trust a path from the URL
+    stem = Path(file_name).stem
+    return settings.detection_store_dir / f"{stem}.dets", settings.detection_store_dir / f"{stem}.json"
+
+
+def _trajectory_paths(file_name: str) -> Tuple[Path, Path]:
+    stem = Path(file_name).stem
+    return settings.detection_store_dir / f"{stem}.tracks", settings.detection_store_dir / f"{stem}.tracks.json"
+
+
+_prune_lock = threading.Lock()
+
+
+def prune_detection_store(keep: Optional[str] = None) -> int:
+    # Every file of a store starts with the output file's stem (a UUID), so a store is pruned as a whole:
+    # first everything older than the age limit, then the oldest stores until the directory fits the size limit
+    store_dir = settings.detection_store_dir
+    if not store_dir.exists():
+        return 0
+    keep_stem = Path(keep).stem if keep else None
+
+    with _prune_lock:
+        stores: Dict[str, List[Path]] = {}
+        sizes: Dict[str, int] = {}
+        modified: Dict[str, float] = {}
+        for path in store_dir.iterdir():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # Removed by a concurrent discard
+            stem = path.name.split(".", 1)[0]
+            stores.setdefault(stem, []).append(path)
+            sizes[stem] = sizes.get(stem, 0) + stat.st_size
+            modified[stem] = max(modified.get(stem, 0.0), stat.st_mtime)
+
+        # Oldest first, never the caller's own store. Stores without metadata are still being written
+        # (or were left by a crash): only the age limit removes those
+        candidates = sorted((stem for stem in stores if stem != keep_stem), key=modified.__getitem__)
+        total_bytes = sum(sizes.values())
+        expired_before = time.time() - settings.detection_store_max_age_hours * 3600
+        pruned = 0
+        for stem in candidates:
+            expired = settings.detection_store_max_age_hours > 0 and modified[stem] < expired_before
+            complete = _trajectory_paths(stem)[1].exists()
+            over_budget = complete and 0 < settings.detection_store_max_bytes < total_bytes
+            if not expired and not over_budget:
+                continue
+            for path in stores[stem]:
+                path.unlink(missing_ok=True)
+            total_bytes -= sizes[stem]
+            pruned += 1
+
+    if pruned:
+        logger.info(f"Pruned {pruned} detection stores from {store_dir} ({total_bytes / 1024 / 1024:.1f} MB kept)")
+    return pruned
+
+
+def _track_keys(records: np.ndarray) -> np.ndarray:
+    # One key per (segment, track) so IDs from different chunks never merge
+    return (records["segment"].astype(np.int64) << 32) | records["track"].astype(np.int64)
+
+
+class TrajectoryWriter:
+    # Track centers as the tracker produced them, so counts for another line can be replayed without video
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.data_path, self.meta_path = _trajectory_paths(file_name)
+        self.data_path.parent.mkdir(parents=True, exist_ok=True)
+        self.meta_path.unlink(missing_ok=True)
+
+        self._records: List[np.ndarray] = []
+        # First frame whose crossings count, per segment (chunks start tracking early to warm up)
+        self.segment_starts: Dict[int, int] = {0: 1}
+
+    def add(self, frame_number: int, tracked_objects: Dict[int, np.ndarray], segment: int = 0):
+        if not tracked_objects:
+            return
+
+        boxes = np.array(list(tracked_objects.values()), dtype=np.float32)
+        records = np.empty(len(boxes), dtype=TRACK_DTYPE)
+        records["segment"] = segment
+        records["track"] = list(tracked_objects.keys())
+        records["frame"] = frame_number
+        records["center"][:, 0] = (boxes[:, 0] + boxes[:, 2]) / 2
+        records["center"][:, 1] = (boxes[:, 1] + boxes[:, 3]) / 2
+        self._records.append(records)
+
+    def close(self, width: int, height: int):
+        records = np.concatenate(self._records) if self._records else np.empty(0, dtype=TRACK_DTYPE)
+        # Group rows by track; lexsort is stable, so each track keeps its update order
+        records[np.lexsort((records["track"], records["segment"]))].tofile(self.data_path)
+
+        self.meta_path.write_text(json.dumps({
+            "file_name": self.file_name,
+            "width": width,
+            "height": height,
+            "segment_starts": {str(segment): start for segment, start in self.segment_starts.items()},
+            "tracks": len(np.unique(_track_keys(records))),
+            "created_at": datetime.now().isoformat()
+        }))
+        self._records = []
+
+    def discard(self):
+        self._records = []
+        self.data_path.unlink(missing_ok=True)
+        self.meta_path.unlink(missing_ok=True)
+
+
+class DetectionStoreWriter:
+    # Appends detections while a video is analysed. The metadata file is written last, so a store
+    # without one (crash, stop) is never opened. Track trajectories are kept alongside for recounting.
+    def __init__(self, file_name: str, keep_detections: bool = True, flush_rows: int = 4096):
+        self.file_name = file_name
+        self.flush_rows = flush_rows
+        self.data_path, self.meta_path = _store_paths(file_name)
+        self.data_path.parent.mkdir(parents=True, exist_ok=True)
+        self.meta_path.unlink(missing_ok=True)
+
+        # Without detections (adaptive skipping) only the trajectories are stored
+        self._file = open(self.data_path, "wb") if keep_detections else None
+        self.trajectories = TrajectoryWriter(file_name)
+        self._pending: List[np.ndarray] = []
+        self._pending_rows = 0
+        self._last_frame = 0
+        self.frames_recorded = 0
+        self.detections = 0
+
+    def add(self, frame_number: int, detection_result: DetectionResult):
+        # Frames must arrive in order; a backward seek re-analyses stored frames, so the first pass wins
+        if self._file is None or frame_number <= self._last_frame:
+            return
+        self._last_frame = frame_number
+        self.frames_recorded += 1
+        if len(detection_result) == 0:
+            return
+
+        records = np.empty(len(detection_result), dtype=DETECTION_DTYPE)
+        records["frame"] = frame_number
+        records["box"] = detection_result.boxes
+        records["confidence"] = detection_result.confidences
+        records["class_id"] = detection_result.class_ids
+        self._pending.append(records)
+        self._pending_rows += len(records)
+        self.detections += len(records)
+
+        if self._pending_rows >= self.flush_rows:
+            self._flush()
+
+    def add_tracks(self, frame_number: int, tracked_objects: Dict[int, np.ndarray], segment: int = 0):
+        self.trajectories.add(frame_number, tracked_objects, segment)
+
+    def _flush(self):
+        if self._pending:
+            np.concatenate(self._pending).tofile(self._file)
+            self._pending = []
+            self._pending_rows = 0
+
+    def close(self, source_path: Path, width: int, height: int, fps: int, frames_processed: int, move_source: bool = True):
+        self.trajectories.close(width, height)
+        if self._file is None:
+            return
+
+        # Keep the source video next to the detections: re-rendering needs the pixels, not the model.
+        # Overlay runs already keep it as their output video, so it is referenced where it is.
+        self._flush()
+        self._file.close()
+
+        retained_source = Path(source_path)
+        if move_source:
+            retained_source = settings.detection_store_dir / f"{Path(self.file_name).stem}.source{Path(source_path).suffix}"
+            shutil.move(str(source_path), str(retained_source))
+
+        self.meta_path.write_text(json.dumps({
+            "file_name": self.file_name,
+            "source_path": str(retained_source),
+            "width": width,
+            "height": height,
+            "fps": fps,
+            "frames_processed": frames_processed,
+            "frames_recorded": self.frames_recorded,
+            "detections": self.detections,
+            "model_path": str(settings.model_path),
+            "created_at": datetime.now().isoformat()
+        }))
+        logger.info(f"Detection store written for {self.file_name}: {self.detections} detections "
+                    f"in {self.frames_recorded} frames ({self.data_path.stat().st_size / 1024:.1f} KB)")
+        prune_detection_store(keep=self.file_name)
+
+    def discard(self):
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+        self.data_path.unlink(missing_ok=True)
+        self.meta_path.unlink(missing_ok=True)
+        self.trajectories.discard()
+
+
+class DetectionStore:
+    # Read side: the records are memory-mapped, so opening a long video's store costs almost nothing
+    def __init__(self, data_path: Path, meta: dict):
+        self.meta = meta
+        self.file_name: str = meta["file_name"]
+        self.source_path = Path(meta["source_path"])
+        self.width: int = meta["width"]
+        self.height: int = meta["height"]
+        self.fps: int = meta["fps"]
+        self.frames_processed: int = meta["frames_processed"]
+
+        if data_path.stat().st_size > 0:
+            self.records = np.memmap(data_path, dtype=DETECTION_DTYPE, mode="r")
+        else:
+            self.records = np.empty(0, dtype=DETECTION_DTYPE)
+
+        # Records are in frame order: frame f owns records[bounds[f - 1]:bounds[f]]
+        self._bounds = np.searchsorted(self.records["frame"], np.arange(1, self.frames_processed + 2))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def frame(self, frame_number: int) -> DetectionResult:
+        if frame_number < 1 or frame_number > self.frames_processed:
+            return DetectionResult.empty()
+
+        rows = self.records[self._bounds[frame_number - 1]:self._bounds[frame_number]]
+        if len(rows) == 0:
+            return DetectionResult.empty()
+        return DetectionResult(
+            np.array(rows["box"], dtype=np.float32),
+            np.array(rows["confidence"], dtype=np.float32),
+            rows["class_id"].astype(int)
+        )
+
+
+def open_detection_store(file_name: str) -> Optional[DetectionStore]:
+    data_path, meta_path = _store_paths(file_name)
+    if not meta_path.exists() or not data_path.exists():
+        return None
+
+    store = DetectionStore(data_path, json.loads(meta_path.read_text()))
+    if not store.source_path.exists():
+        logger.warning(f"Detection store for {file_name} has no source video ({store.source_path})")
+        return None
+    return store
+
+
+class TrajectoryStore:
+    def __init__(self, data_path: Path, meta: dict):
+        self.meta = meta
+        self.width: int = meta["width"]
+        self.height: int = meta["height"]
+        self.tracks: int = meta["tracks"]
+
+        records = np.fromfile(data_path, dtype=TRACK_DTYPE)
+        self.frames = records["frame"]
+        self.centers = np.ascontiguousarray(records["center"])
+        self.track_keys = _track_keys(records)
+
+        segment_starts = {int(segment): start for segment, start in meta["segment_starts"].items()}
+        lookup = np.zeros(max(segment_starts) + 1, dtype=np.int32)
+        for segment, start in segment_starts.items():
+            lookup[segment] = start
+        self.counted_from = lookup[records["segment"]]
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+
+def open_trajectories(file_name: str) -> Optional[TrajectoryStore]:
+    data_path, meta_path = _trajectory_paths(file_name)
+    if not meta_path.exists() or not data_path.exists():
+        return None
+    return TrajectoryStore(data_path, json.loads(meta_path.read_text()))
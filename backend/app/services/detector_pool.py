@@ -0,0 +1,361 @@
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+import numpy as np
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+from app.model.detector import DetectionResult
+from app.core.config import logger
+
+
+def _worker_main(
+    worker_index: int,
+    shm_name: str,
+    slot_bytes: int,
+    request_queue: mp.Queue,
+    result_queue: mp.Queue,
+    detector_kwargs: dict,
+    num_threads: int
+):
+    # Runs in a spawned process: load the model once, then serve frames out of shared memory
+    import torch
+    from app.model.detector import YOLODetector
+
+    torch.set_num_threads(num_threads)
+    shm = shared_memory.SharedMemory(name=shm_name)
+
+    try:
+        detector = YOLODetector(**detector_kwargs)
+        result_queue.put(("ready", worker_index, dict(detector.class_names)))
+    except Exception as e:
+        result_queue.put(("failed", worker_index, str(e)))
+        shm.close()
+        return
+
+    while True:
+        message = request_queue.get()
+        if message is None:
+            break
+
+        request_id, frame_specs, imgsz = message
+        try:
+            frames = []
+            for slot, shape, dtype, inline_frame in frame_specs:
+                if inline_frame is not None:
+                    frames.append(inline_frame)
+                else:
+                    frames.append(np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=slot * slot_bytes))
+
+            results = detector.detect_batch(frames, imgsz)
+            payload = [(result.boxes, result.confidences, result.class_ids) for result in results]
+            del frames
+            result_queue.put(("result", request_id, payload))
+        except Exception as e:
+            result_queue.put(("error", request_id, str(e)))
+
+    shm.close()
+
+
+class DetectorPool:
+    def __init__(
+        self,
+        num_workers: int,
+        model_path: str,
+        confidence: float = 0.25,
+        iou: float = 0.45,
+        device: str = "cpu",
+        backend: str = "torch",
+        imgsz: int = 640,
+        slots_per_worker: int = 8,
+        max_frame_bytes: int = 1920 * 1080 * 3,
+        worker_threads: int = 0,
+        startup_timeout: float = 300.0,
+        request_timeout: float = 120.0,
+        max_restarts: int = 3
+    ):
+        from app.model.backends import resolve_model_artifact
+
+        # Export once here so workers never race to build the same artifact
+        resolve_model_artifact(model_path, backend, imgsz)
+
+        self.num_workers = num_workers
+        self.slots_per_worker = slots_per_worker
+        self.slot_bytes = max_frame_bytes
+        self.request_timeout = request_timeout
+        self.max_restarts = max_restarts
+        self.class_names: Dict[int, str] = {}
+
+        self._detector_kwargs = {
+            "model_path": model_path,
+            "confidence": confidence,
+            "iou": iou,
+            "device": device,
+            "backend": backend,
+            "imgsz": imgsz
+        }
+        self._num_threads = worker_threads or max(1, (os.cpu_count() or 1) // num_workers)
+
+        self._ctx = mp.get_context("spawn")
+        self._result_queue = self._ctx.Queue()
+        self._request_queues: List[mp.Queue] = []
+        self._shared_memory: List[shared_memory.SharedMemory] = []
+        self._free_slots: List[queue.Queue] = []
+        self._slot_locks: List[threading.Lock] = []
+        self._processes: List[mp.Process] = []
+        # Workers that receive requests: a crashed worker leaves the rotation until its replacement is ready
+        self._ready: List[bool] = [False] * num_workers
+        self._retired: List[bool] = [False] * num_workers
+        self._restart_attempts: List[int] = [0] * num_workers  # Reset once a replacement is ready
+
+        for worker_index in range(num_workers):
+            shm = shared_memory.SharedMemory(create=True, size=slots_per_worker * max_frame_bytes)
+            free_slots = queue.Queue()
+            for slot in range(slots_per_worker):
+                free_slots.put(slot)
+
+            self._shared_memory.append(shm)
+            self._free_slots.append(free_slots)
+            self._slot_locks.append(threading.Lock())
+            self._request_queues.append(self._ctx.Queue())
+            self._processes.append(self._start_process(worker_index, self._request_queues[worker_index]))
+
+        self._wait_until_ready(startup_timeout)
+
+        self._pending: Dict[int, Tuple[Future, int, List[int]]] = {}
+        self._pending_lock = threading.Lock()
+        self._request_ids = itertools.count()
+        self._next_worker = itertools.cycle(range(num_workers))
+        self._worker_lock = threading.Lock()
+        self._running = True
+
+        self._dispatcher = threading.Thread(target=self._dispatch_results, name="detector-pool-results", daemon=True)
+        self._dispatcher.start()
+
+        logger.info(f"DetectorPool started: {num_workers} workers x {self._num_threads} threads, "
+                    f"{slots_per_worker} shared-memory slots of {max_frame_bytes / 1024 / 1024:.1f} MB each")
+
+    def _start_process(self, worker_index: int, request_queue: mp.Queue) -> mp.Process:
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_index, self._shared_memory[worker_index].name, self.slot_bytes, request_queue,
+                  self._result_queue, self._detector_kwargs, self._num_threads),
+            name=f"detector-worker-{worker_index}",
+            daemon=True
+        )
+        process.start()
+        return process
+
+    def _wait_until_ready(self, timeout: float):
+        ready = 0
+        while ready < self.num_workers:
+            try:
+                status, worker_index, payload = self._result_queue.get(timeout=timeout)
+            except queue.Empty:
+                self.shutdown()
+                raise RuntimeError(f"Detector workers did not start within {timeout}s")
+
+            if status == "failed":
+                self.shutdown()
+                raise RuntimeError(f"Detector worker {worker_index} failed to load model: {payload}")
+
+            self.class_names = payload
+            self._ready[worker_index] = True
+            ready += 1
+            logger.info(f"Detector worker {worker_index} ready")
+
+    def _submit(self, worker_index: int, frames: List[np.ndarray], imgsz: Optional[int] = None) -> Future:
+        free_slots = self._free_slots[worker_index]
+        frame_specs = []
+        used_slots = []
+
+        # One caller at a time claims slots, so two partial claims can never deadlock a full ring
+        with self._slot_locks[worker_index]:
+            for frame in frames:
+                if frame.nbytes > self.slot_bytes:
+                    # Larger than a slot: fall back to pickling this frame through the queue
+                    frame_specs.append((-1, frame.shape, frame.dtype.str, frame))
+                    continue
+
+                # Blocks when this worker's ring is full, which applies backpressure to callers
+                try:
+                    slot = free_slots.get(timeout=self.request_timeout)
+                except queue.Empty:
+                    self._release(worker_index, used_slots)
+                    raise RuntimeError(f"No free shared-memory slot on detector worker {worker_index} "
+                                       f"within {self.request_timeout}s")
+                view = np.ndarray(frame.shape, dtype=frame.dtype,
+                                  buffer=self._shared_memory[worker_index].buf, offset=slot * self.slot_bytes)
+                np.copyto(view, frame)
+                del view
+                frame_specs.append((slot, frame.shape, frame.dtype.str, None))
+                used_slots.append(slot)
+
+        future = Future()
+        request_id = next(self._request_ids)
+        with self._pending_lock:
+            self._pending[request_id] = (future, worker_index, used_slots)
+
+        # Read after registering: a worker replaced meanwhile either failed this request or gets it on its new queue
+        self._request_queues[worker_index].put((request_id, frame_specs, imgsz))
+        return future
+
+    def _release(self, worker_index: int, slots: List[int]):
+        for slot in slots:
+            self._free_slots[worker_index].put(slot)
+
+    def _dispatch_results(self):
+        last_check = time.monotonic()
+        while self._running:
+            # Liveness is checked on a timer, not only when idle: a busy pool must notice a crash too
+            if time.monotonic() - last_check >= 1.0:
+                self._restart_dead_workers()
+                last_check = time.monotonic()
+
+            try:
+                status, request_id, payload = self._result_queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            if status in ("ready", "failed"):
+                # A replacement worker finished (or failed) loading the model; request_id is its index
+                self._worker_started(request_id, status, payload)
+                continue
+
+            with self._pending_lock:
+                pending = self._pending.pop(request_id, None)
+            if pending is None:
+                continue
+
+            future, worker_index, slots = pending
+            self._release(worker_index, slots)
+
+            if status == "result":
+                future.set_result([
+                    DetectionResult(boxes, confidences, class_ids)
+                    for boxes, confidences, class_ids in payload
+                ])
+            else:
+                future.set_exception(RuntimeError(f"Detector worker {worker_index} error: {payload}"))
+
+    def _restart_dead_workers(self):
+        with self._worker_lock:
+            dead_workers = {
+                index for index, process in enumerate(self._processes)
+                if not process.is_alive() and not self._retired[index]
+            }
+            if not dead_workers or not self._running:
+                return
+
+            for worker_index in dead_workers:
+                self._ready[worker_index] = False
+            self._fail_pending(dead_workers)
+
+            for worker_index in dead_workers:
+                self._processes[worker_index].join(timeout=0)
+                exit_code = self._processes[worker_index].exitcode
+                if self._restart_attempts[worker_index] >= self.max_restarts:
+                    # Keeps dying before it is ready (e.g. the model no longer loads): stop trying
+                    self._retired[worker_index] = True
+                    logger.error(f"Detector worker {worker_index} exited (exit code {exit_code}) after "
+                                 f"{self.max_restarts} restarts; removing it from the pool")
+                    continue
+
+                self._restart_attempts[worker_index] += 1
+                logger.error(f"Detector worker {worker_index} exited unexpectedly (exit code {exit_code}); restarting it")
+                # Requests still queued for the dead worker were failed above: its replacement starts empty
+                old_queue = self._request_queues[worker_index]
+                old_queue.cancel_join_thread()
+                old_queue.close()
+                self._request_queues[worker_index] = self._ctx.Queue()
+                self._processes[worker_index] = self._start_process(worker_index, self._request_queues[worker_index])
+
+    def _fail_pending(self, worker_indices: set):
+        with self._pending_lock:
+            failed = [request_id for request_id, (_, worker_index, _) in self._pending.items()
+                      if worker_index in worker_indices]
+            for request_id in failed:
+                future, worker_index, slots = self._pending.pop(request_id)
+                # The worker is gone, so nothing reads these slots any more
+                self._release(worker_index, slots)
+                future.set_exception(RuntimeError(f"Detector worker {worker_index} exited unexpectedly"))
+
+    def _worker_started(self, worker_index: int, status: str, payload):
+        if status == "failed":
+            # The process exits after reporting; the next liveness check counts it as a failed restart
+            logger.error(f"Detector worker {worker_index} failed to load model on restart: {payload}")
+            return
+        with self._worker_lock:
+            self._ready[worker_index] = True
+            self._restart_attempts[worker_index] = 0
+        logger.info(f"Detector worker {worker_index} restarted")
+
+    def _pick_worker(self) -> int:
+        with self._worker_lock:
+            for _ in range(self.num_workers):
+                worker_index = next(self._next_worker)
+                if self._ready[worker_index] and self._processes[worker_index].is_alive():
+                    return worker_index
+        raise RuntimeError("No detector worker is available")
+
+    def detect_batch(self, images: List[np.ndarray], imgsz: Optional[int] = None) -> List[DetectionResult]:
+        if not images:
+            return []
+
+        # Spread chunks across workers; each chunk is one batched forward pass in one process
+        futures = []
+        for start in range(0, len(images), self.slots_per_worker):
+            chunk = images[start:start + self.slots_per_worker]
+            futures.append(self._submit(self._pick_worker(), chunk, imgsz))
+
+        results: List[DetectionResult] = []
+        for future in futures:
+            try:
+                results.extend(future.result(timeout=self.request_timeout))
+            except FutureTimeoutError:
+                raise RuntimeError(f"Detector worker did not answer within {self.request_timeout}s")
+        return results
+
+    def detect(self, image: np.ndarray, imgsz: Optional[int] = None) -> DetectionResult:
+        return self.detect_batch([image], imgsz)[0]
+
+    def get_class_name(self, class_id: int) -> str:
+        return self.class_names.get(class_id, "unknown")
+
+    def count_rickshaws(self, detection_result: DetectionResult) -> int:
+        return len(detection_result)
+
+    def shutdown(self):
+        worker_lock = getattr(self, "_worker_lock", None)
+        if worker_lock is not None:
+            # Taken so a liveness check in progress finishes before its workers are joined
+            with worker_lock:
+                self._running = False
+        else:
+            self._running = False
+
+        for request_queue in self._request_queues:
+            request_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+
+        for shm in self._shared_memory:
+            shm.close()
+            shm.unlink()
+
+        pending_lock = getattr(self, "_pending_lock", None)
+        if pending_lock is not None:
+            with pending_lock:
+                for future, _, _ in self._pending.values():
+                    if not future.done():
+                        future.set_exception(RuntimeError("Detector pool is shut down"))
+                self._pending.clear()
+
+        logger.info("DetectorPool stopped")
@@ -0,0 +1,148 @@
+import queue
+import threading
+import time
+import numpy as np
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import List, Optional
+from app.model.detector import YOLODetector, DetectionResult
+from app.core.config import logger
+
+
+@dataclass
+class InferenceRequest:
+    image: np.ndarray
+    imgsz: Optional[int] = None
+    future: Future = field(default_factory=Future)
+
+
+class InferenceScheduler:
+    def __init__(self, detector: YOLODetector, max_batch_size: int = 8, max_wait_ms: float = 10.0):
+        self.detector = detector
+        self.class_names = detector.class_names
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: "queue.Queue[Optional[InferenceRequest]]" = queue.Queue()
+        self._deferred: List[InferenceRequest] = []  # Requests waiting for a batch with their imgsz
+        self._running = True
+
+        # Statistics
+        self._stats_lock = threading.Lock()
+        self.batches_run = 0
+        self.frames_processed = 0
+
+        self._worker = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self._worker.start()
+        logger.info(f"InferenceScheduler started: max_batch_size={self.max_batch_size}, "
+                    f"max_wait={max_wait_ms}ms")
+
+    def submit(self, image: np.ndarray, imgsz: Optional[int] = None) -> Future:
+        if not self._running:
+            raise RuntimeError("Inference scheduler is shut down")
+        request = InferenceRequest(image=image, imgsz=imgsz)
+        self._queue.put(request)
+        return request.future
+
+    def detect(self, image: np.ndarray, imgsz: Optional[int] = None) -> DetectionResult:
+        return self.submit(image, imgsz).result()
+
+    def detect_batch(self, images: List[np.ndarray], imgsz: Optional[int] = None) -> List[DetectionResult]:
+        # Submit everything first so the frames can share micro-batches with other callers
+        futures = [self.submit(image, imgsz) for image in images]
+        return [future.result() for future in futures]
+
+    def get_class_name(self, class_id: int) -> str:
+        return self.detector.get_class_name(class_id)
+
+    def count_rickshaws(self, detection_result: DetectionResult) -> int:
+        return self.detector.count_rickshaws(detection_result)
+
+    def _collect_batch(self, first: InferenceRequest) -> List[InferenceRequest]:
+        batch = [first]
+
+        # Requests deferred by an earlier batch go first if they share this input size
+        still_deferred = []
+        for request in self._deferred:
+            if request.imgsz == first.imgsz and len(batch) < self.max_batch_size:
+                batch.append(request)
+            else:
+                still_deferred.append(request)
+        self._deferred = still_deferred
+
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                # Shutdown sentinel - finish this batch, then let the worker loop exit
+                self._queue.put(None)
+                break
+            if request.imgsz != first.imgsz:
+                # A forward pass needs one input size, so this frame waits for the next batch
+                self._deferred.append(request)
+                continue
+            batch.append(request)
+
+        return batch
+
+    def _run(self):
+        while True:
+            if self._deferred:
+                first = self._deferred.pop(0)
+            else:
+                first = self._queue.get()
+                if first is None:
+                    break
+
+            batch = self._collect_batch(first)
+
+            try:
+                results = self.detector.detect_batch([request.image for request in batch], first.imgsz)
+                for request, result in zip(batch, results):
+                    request.future.set_result(result)
+            except Exception as e:
+                logger.error(f"Batched inference failed for {len(batch)} frames: {str(e)}")
+                for request in batch:
+                    request.future.set_exception(e)
+
+            with self._stats_lock:
+                self.batches_run += 1
+                self.frames_processed += len(batch)
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "batches_run": self.batches_run,
+                "frames_processed": self.frames_processed,
+                "avg_batch_size": round(self.frames_processed / self.batches_run, 2) if self.batches_run else 0.0,
+                "queue_depth": self._queue.qsize()
+            }
+
+    def shutdown(self):
+        if not self._running:
+            return
+        self._running = False
+        self._queue.put(None)
+        self._worker.join(timeout=5)
+
+        # Fail anything still waiting so callers do not block forever
+        for request in self._deferred:
+            if not request.future.done():
+                request.future.set_exception(RuntimeError("Inference scheduler is shut down"))
+        self._deferred = []
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None and not request.future.done():
+                request.future.set_exception(RuntimeError("Inference scheduler is shut down"))
+
+        logger.info(f"InferenceScheduler stopped: {self.get_stats()}")
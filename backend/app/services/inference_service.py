@@ -1,73 +1,242 @@
 import cv2
+import itertools
 import numpy as np
 from pathlib import Path
+from typing import List, Optional, Tuple
 from fastapi import UploadFile
-from app.model.detector import YOLODetector
+from app.model.detector import YOLODetector, DetectionResult
 from app.utils.draw_utils import draw_detections, draw_count_overlay
-from app.utils.file_utils import generate_unique_filename, save_upload_file, get_output_url
-from app.db.database import insert_detection
-from app.core.config import settings
+from app.utils.file_utils import generate_unique_filename, get_output_url, is_zip_file, extract_zip_entries
+from app.services.detection_cache import get_detection_cache, CachedDetection
+from app.db.database import insert_detection, insert_detections_batch
+from app.core.config import settings, logger
+from app.core.executor import run_in_inference_executor, get_decode_executor
+
+
+# Inline response formats: name -> (extension, media type)
+INLINE_FORMATS = {
+    "jpeg": (".jpg", "image/jpeg"),
+    "webp": (".webp", "image/webp")
+}
+
+
+def decode_image(content: bytes) -> Optional[np.ndarray]:
+    # Decode straight from the upload bytes, no temp file
+    return cv2.imdecode(np.frombuffer(content, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def encode_image(image: np.ndarray, extension: str, quality: Optional[int] = None) -> bytes:
+    params = []
+    if quality is not None and extension in (".jpg", ".jpeg"):
+        params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+    elif quality is not None and extension == ".webp":
+        params = [cv2.IMWRITE_WEBP_QUALITY, quality]
+
+    success, encoded = cv2.imencode(extension, image, params)
+    if not success:
+        raise ValueError(f"Failed to encode annotated image as {extension}")
+    return encoded.tobytes()
 
 
 class InferenceService:
     def __init__(self, detector: YOLODetector):
         self.detector = detector
-    
-    async def process_image(self, file: UploadFile) -> dict:
-        # Generate unique filename
-        output_filename = generate_unique_filename(file.filename)
-        
-        # Create temporary path for uploaded file
-        temp_path = settings.images_output_dir / f"temp_{output_filename}"
-        
-        try:
-            # Save uploaded file temporarily
-            await save_upload_file(file, temp_path)
-            
-            # Read image
-            image = cv2.imread(str(temp_path))
-            
-            if image is None:
-                raise ValueError("Failed to read image file")
-            
-            # Run detection
-            detection_result = self.detector.detect(image)
-            
-            # Count rickshaws
-            rickshaw_count = self.detector.count_rickshaws(detection_result)
-            
-            # Draw detections on image
-            annotated_image = draw_detections(image, detection_result, self.detector)
-            
-            # Draw count overlay
-            annotated_image = draw_count_overlay(annotated_image, rickshaw_count)
-            
-            # Save annotated image
-            output_path = settings.images_output_dir / output_filename
-            cv2.imwrite(str(output_path), annotated_image)
-            
-            # Remove temporary file
-            if temp_path.exists():
-                temp_path.unlink()
-            
-            # Insert record into database
+
+    async def process_image(self, file: UploadFile, inline_format: Optional[str] = None) -> dict:
+        if inline_format is not None and inline_format not in INLINE_FORMATS:
+            raise ValueError(f"Invalid inline format: {inline_format}. Allowed formats: {', '.join(INLINE_FORMATS)}")
+
+        content = await file.read()
+
+        # Decoding, inference, drawing and encoding are CPU-bound: keep them off the event loop
+        return await run_in_inference_executor(self.process_image_bytes, content, file.filename, inline_format)
+
+    def process_image_bytes(self, content: bytes, filename: str, inline_format: Optional[str] = None) -> dict:
+        # Identical upload with identical model settings: reuse the earlier result
+        cache = get_detection_cache()
+        cache_key = cache.make_key(content) if cache else None
+        if cache:
+            cached = cache.get(cache_key)
+            if cached:
+                logger.info(f"Image cache hit: {filename} -> {cached.file_name}")
+                insert_detection(
+                    file_type="image",
+                    file_name=cached.file_name,
+                    rickshaw_count=cached.rickshaw_count
+                )
+                result = {
+                    "file_name": cached.file_name,
+                    "rickshaw_count": cached.rickshaw_count,
+                    "output_url": cached.output_url,
+                    "cached": True
+                }
+                if inline_format:
+                    result["image_bytes"] = self._transcode(cached, inline_format)
+                    result["media_type"] = INLINE_FORMATS[inline_format][1]
+                return result
+
+        # Read image
+        image = decode_image(content)
+
+        if image is None:
+            raise ValueError("Failed to read image file")
+
+        # Run detection
+        detection_result = self.detector.detect(image)
+
+        # Count rickshaws
+        rickshaw_count = self.detector.count_rickshaws(detection_result)
+
+        # Draw detections and count overlay on the decoded image itself (it is not used afterwards)
+        annotated_image = draw_detections(image, detection_result, self.detector, inplace=True)
+        annotated_image = draw_count_overlay(annotated_image, rickshaw_count, inplace=True)
+
+        if inline_format:
+            # Returned in the response body only; nothing is written to outputs/images
+            extension, media_type = INLINE_FORMATS[inline_format]
             insert_detection(
                 file_type="image",
-                file_name=output_filename,
+                file_name=filename,
                 rickshaw_count=rickshaw_count
             )
-            
-            # Generate output URL
+            return {
+                "file_name": filename,
+                "rickshaw_count": rickshaw_count,
+                "output_url": None,
+                "cached": False,
+                "image_bytes": encode_image(annotated_image, extension, settings.inline_image_quality),
+                "media_type": media_type
+            }
+
+        # Generate unique filename
+        output_filename = generate_unique_filename(filename)
+
+        # Encode once; the bytes go to disk and into the cache
+        output_path = settings.images_output_dir / output_filename
+        output_bytes = encode_image(annotated_image, output_path.suffix)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_bytes(output_bytes)
+
+        # Insert record into database
+        insert_detection(
+            file_type="image",
+            file_name=output_filename,
+            rickshaw_count=rickshaw_count
+        )
+
+        # Generate output URL
+        output_url = get_output_url(output_filename, "image")
+
+        if cache:
+            cache.put(cache_key, CachedDetection(output_filename, rickshaw_count, output_url, output_bytes))
+
+        return {
+            "file_name": output_filename,
+            "rickshaw_count": rickshaw_count,
+            "output_url": output_url,
+            "cached": False
+        }
+
+    def _transcode(self, cached: CachedDetection, inline_format: str) -> bytes:
+        extension = INLINE_FORMATS[inline_format][0]
+        suffix = Path(cached.file_name).suffix.lower()
+        if suffix == extension or (suffix == ".jpeg" and extension == ".jpg"):
+            return cached.output_bytes
+        # Cached output is in another format: re-encode, which is still far cheaper than inference
+        return encode_image(decode_image(cached.output_bytes), extension, settings.inline_image_quality)
+
+    def process_image_batch(self, uploads: List[Tuple[str, bytes]]) -> List[dict]:
+        # Zip archives are expanded in place; every entry is reported as its own result
+        entries: List[Tuple[str, bytes]] = []
+        for filename, content in uploads:
+            if is_zip_file(filename):
+                entries.extend(extract_zip_entries(content, settings.max_upload_size))
+            else:
+                entries.append((filename, content))
+
+        if len(entries) > settings.max_batch_images:
+            raise ValueError(f"Too many images: {len(entries)} (limit {settings.max_batch_images})")
+
+        results: List[Optional[dict]] = [None] * len(entries)
+        cache = get_detection_cache()
+        pending = []  # (index, filename, cache_key, content)
+
+        for index, (filename, content) in enumerate(entries):
+            if Path(filename).suffix.lower() not in settings.allowed_image_extensions:
+                results[index] = {"source_file": filename, "success": False, "error": "Invalid image format"}
+                continue
+
+            cache_key = cache.make_key(content) if cache else None
+            cached = cache.get(cache_key) if cache else None
+            if cached:
+                results[index] = {
+                    "source_file": filename,
+                    "file_name": cached.file_name,
+                    "rickshaw_count": cached.rickshaw_count,
+                    "output_url": cached.output_url,
+                    "cached": True
+                }
+            else:
+                pending.append((index, filename, cache_key, content))
+
+        # cv2.imdecode releases the GIL, so decoding fans out across the decode pool
+        decode_executor = get_decode_executor()
+        images = list(decode_executor.map(decode_image, [content for *_, content in pending]))
+
+        decoded = []  # (index, filename, cache_key, image)
+        for (index, filename, cache_key, _), image in zip(pending, images):
+            if image is None:
+                results[index] = {"source_file": filename, "success": False, "error": "Failed to read image file"}
+            else:
+                decoded.append((index, filename, cache_key, image))
+
+        # Same-sized images share a forward pass so each keeps its rectangular letterbox
+        decoded.sort(key=lambda item: item[3].shape)
+        detection_results: List[DetectionResult] = []
+        for _, group in itertools.groupby(decoded, key=lambda item: item[3].shape):
+            group = list(group)
+            for start in range(0, len(group), settings.inference_batch_size):
+                chunk = group[start:start + settings.inference_batch_size]
+                detection_results.extend(self.detector.detect_batch([item[3] for item in chunk]))
+
+        # Drawing, encoding and writing are per image, so they fan out as well
+        rendered = decode_executor.map(self._render_and_save, decoded, detection_results)
+        for (index, *_), result in zip(decoded, rendered):
+            results[index] = result
+
+        insert_detections_batch([
+            ("image", result["file_name"], result["rickshaw_count"])
+            for result in results if result.get("file_name")
+        ])
+
+        logger.info(f"Batch image detection: {len(entries)} images, {len(decoded)} inferred, "
+                    f"{len(entries) - len(pending)} from cache or rejected")
+        return results
+
+    def _render_and_save(self, item: Tuple[int, str, Optional[str], np.ndarray], detection_result: DetectionResult) -> dict:
+        _, filename, cache_key, image = item
+        try:
+            rickshaw_count = self.detector.count_rickshaws(detection_result)
+            annotated_image = draw_detections(image, detection_result, self.detector, inplace=True)
+            annotated_image = draw_count_overlay(annotated_image, rickshaw_count, inplace=True)
+
+            output_filename = generate_unique_filename(filename)
+            output_path = settings.images_output_dir / output_filename
+            output_bytes = encode_image(annotated_image, output_path.suffix)
+            output_path.write_bytes(output_bytes)
             output_url = get_output_url(output_filename, "image")
-            
+
+            cache = get_detection_cache()
+            if cache and cache_key:
+                cache.put(cache_key, CachedDetection(output_filename, rickshaw_count, output_url, output_bytes))
+
             return {
+                "source_file": filename,
                 "file_name": output_filename,
                 "rickshaw_count": rickshaw_count,
-                "output_url": output_url
+                "output_url": output_url,
+                "cached": False
             }
-            
         except Exception as e:
-            # Clean up temporary file on error
-            if temp_path.exists():
-                temp_path.unlink()
-            raise e
+            logger.error(f"Error rendering {filename}: {str(e)}")
+            return {"source_file": filename, "success": False, "error": str(e)}
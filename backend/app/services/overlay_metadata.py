@@ -0,0 +1,170 @@
+import json
+import time
+import numpy as np
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+from app.model.detector import DetectionResult
+from app.core.config import settings
+
+
+# Per-object fields in every frame record
+OBJECT_FIELDS = ["x1", "y1", "x2", "y2", "confidence", "class_id", "track_id"]
+
+
+def overlay_metadata_path(file_name: str) -> Path:
+    # Served next to the untouched video from /outputs/videos; keyed by the output stem, never a URL path
+    return settings.videos_output_dir / f"{Path(file_name).stem}.overlay.ndjson"
+
+
+def _dumps(record: dict) -> str:
+    return json.dumps(record, separators=(",", ":")) + "\n"
+
+
+class OverlayMetadataWriter:
+    # NDJSON track for output=overlay: a header line, one line per analysed frame, an end line.
+    # Lines are flushed regularly so /stream/metadata can follow a job while it runs.
+    def __init__(
+        self,
+        file_name: str,
+        width: int,
+        height: int,
+        fps: int,
+        line: Optional[Tuple[Tuple[int, int], Tuple[int, int]]] = None,
+        class_names: Optional[Dict[int, str]] = None,
+        flush_frames: int = 30
+    ):
+        self.path = overlay_metadata_path(file_name)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fps = fps
+        self.flush_frames = flush_frames
+        self._last_frame = 0
+        self._unflushed = 0
+        self.frames_written = 0
+
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._file.write(_dumps({
+            "type": "header",
+            "file_name": file_name,
+            "width": width,
+            "height": height,
+            "fps": fps,
+            "line": [list(point) for point in line] if line else None,
+            "classes": {str(class_id): name for class_id, name in (class_names or {}).items()},
+            "fields": OBJECT_FIELDS
+        }))
+        self._file.flush()
+
+    def add(
+        self,
+        frame_number: int,
+        detection_result: DetectionResult,
+        tracked_objects: Optional[Dict[str, np.ndarray]] = None,
+        counts: Optional[Tuple[int, int]] = None
+    ):
+        # Frames must arrive in order; a backward seek re-analyses frames that are already written
+        if frame_number <= self._last_frame:
+            return
+        self._last_frame = frame_number
+
+        # The tracker hands back the detection rows themselves, so the raw bytes identify each row
+        track_ids = {bbox.tobytes(): str(track_id) for track_id, bbox in (tracked_objects or {}).items()}
+        boxes = np.round(detection_result.boxes.astype(float), 1).tolist()
+        objects = [
+            box + [round(float(confidence), 3), int(class_id), track_ids.get(row.tobytes())]
+            for box, row, confidence, class_id in zip(
+                boxes, detection_result.boxes, detection_result.confidences, detection_result.class_ids
+            )
+        ]
+
+        record = {
+            "frame": frame_number,
+            "time": round((frame_number - 1) / self.fps, 3) if self.fps > 0 else None,
+            "objects": objects
+        }
+        if counts is not None:
+            record["entry"], record["exit"] = counts
+        self._file.write(_dumps(record))
+        self.frames_written += 1
+
+        self._unflushed += 1
+        if self._unflushed >= self.flush_frames:
+            self._file.flush()
+            self._unflushed = 0
+
+    def close(self, frames_processed: int, total_entry: int, total_exit: int):
+        # The end line tells streaming clients the track is complete
+        self._file.write(_dumps({
+            "type": "end",
+            "frames_processed": frames_processed,
+            "frames_written": self.frames_written,
+            "total_entry": total_entry,
+            "total_exit": total_exit
+        }))
+        self._file.close()
+
+    def discard(self):
+        if not self._file.closed:
+            self._file.close()
+        self.path.unlink(missing_ok=True)
+
+
+def _vtt_timestamp(seconds: float) -> str:
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
+
+
+def ndjson_to_webvtt(lines: Iterable[str]) -> Iterator[str]:
+    # WebVTT metadata track (<track kind="metadata">): one cue per analysed frame with the frame record as
+    # JSON payload. A cue lasts until the next analysed frame, so skipped frames keep the last boxes.
+    yield "WEBVTT\n\n"
+    frame_duration = 0.0
+    pending: Optional[dict] = None
+
+    def cue(record: dict, end: float) -> str:
+        start = record["time"]
+        return f"{_vtt_timestamp(start)} --> {_vtt_timestamp(max(end, start + 0.001))}\n{json.dumps(record, separators=(',', ':'))}\n\n"
+
+    for line in lines:
+        record = json.loads(line)
+        record_type = record.get("type")
+        if record_type == "header":
+            fps = record.get("fps") or 0
+            frame_duration = 1 / fps if fps > 0 else 0.0
+            continue
+        if record_type == "end":
+            break
+        if record.get("time") is None:
+            continue
+        if pending is not None:
+            yield cue(pending, record["time"])
+        pending = record
+
+    if pending is not None:
+        yield cue(pending, pending["time"] + frame_duration)
+
+
+def follow_lines(path: Path, is_running: Callable[[], bool], poll_interval: float = 0.1) -> Iterator[str]:
+    # Yields complete lines as the writer appends them, until the end line (or the job stops without one)
+    with open(path, encoding="utf-8") as file:
+        partial = ""
+        while True:
+            line = file.readline()
+            if line.endswith("\n"):
+                line, partial = partial + line, ""
+                yield line
+                if line.startswith('{"type":"end"'):
+                    return
+                continue
+
+            partial += line
+            if not is_running():
+                # Finished or failed: drain what is left, then stop
+                remainder = partial + file.read()
+                for rest in remainder.splitlines(keepends=True):
+                    if rest.endswith("\n"):
+                        yield rest
+                return
+            time.sleep(poll_interval)
@@ -0,0 +1,356 @@
+import json
+import math
+import multiprocessing as mp
+import os
+import subprocess
+import cv2
+import numpy as np
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from app.model.detector import YOLODetector, DetectionResult
+from app.utils.count_utils import LineCrossingDetector, SimpleTracker
+from app.utils.frame_utils import detect_frames, build_roi
+from app.utils.video_writer import create_video_writer, find_ffmpeg
+from app.services.detection_store import DetectionStoreWriter
+from app.services.overlay_metadata import OverlayMetadataWriter
+from app.db.database import log_rickshaw_event
+from app.core.config import settings, logger
+
+
+@dataclass
+class VideoChunk:
+    index: int
+    start: int  # First frame (0-based) whose events and output belong to this chunk
+    end: Optional[int]  # Exclusive; None = until the end of the file
+    warmup_start: int  # Tracking starts here so tracks are established before `start`
+
+
+@dataclass
+class ChunkAnalysis:
+    index: int
+    # Per owned frame: (boxes, confidences, class_ids)
+    detections: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = field(default_factory=list)
+    # Crossings inside [start, end) only: (frame_number, event_type, track_id, confidence, bbox)
+    events: List[Tuple[int, str, int, float, List[float]]] = field(default_factory=list)
+    # Tracker output per frame, warm-up included, for the trajectory store: (frame_number, track_id -> bbox)
+    tracks: List[Tuple[int, Dict[int, np.ndarray]]] = field(default_factory=list)
+    max_rickshaw_count: int = 0
+
+
+def plan_chunks(total_frames: int, num_chunks: int, overlap: int) -> List[VideoChunk]:
+    chunk_size = math.ceil(total_frames / num_chunks)
+    chunks = []
+    for index in range(num_chunks):
+        start = index * chunk_size
+        if start >= total_frames:
+            break
+        # The frame count in the header can be off; the last chunk reads to EOF
+        end = None if index == num_chunks - 1 else min(start + chunk_size, total_frames)
+        chunks.append(VideoChunk(index, start, end, max(0, start - overlap)))
+    return chunks
+
+
+# Detector loaded once per worker process by the pool initializer
+_worker_detector = None
+
+
+def _init_worker(detector_factory: Optional[Callable], detector_kwargs: dict, num_threads: int):
+    global _worker_detector
+
+    if detector_factory is not None:
+        _worker_detector = detector_factory()
+        return
+
+    import torch
+    torch.set_num_threads(num_threads)
+    _worker_detector = YOLODetector(**detector_kwargs)
+
+
+def _analyze_chunk(video_path: str, chunk: VideoChunk, enable_counting: bool, record_tracks: bool = False) -> ChunkAnalysis:
+    cap = cv2.VideoCapture(video_path)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    roi = build_roi(width, height, settings.roi_mode, settings.roi_band_margin, settings.roi_polygon)
+
+    line_detector = LineCrossingDetector(
+        line_start=settings.entry_line_start,
+        line_end=settings.entry_line_end,
+        frame_width=width,
+        frame_height=height,
+        use_percentage=True
+    ) if enable_counting else None
+    tracker = SimpleTracker() if enable_counting or record_tracks else None
+
+    analysis = ChunkAnalysis(chunk.index)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, chunk.warmup_start)
+    frame_index = chunk.warmup_start
+
+    while chunk.end is None or frame_index < chunk.end:
+        batch_size = settings.inference_batch_size
+        if chunk.end is not None:
+            batch_size = min(batch_size, chunk.end - frame_index)
+
+        frames = []
+        while len(frames) < batch_size:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        if not frames:
+            break
+
+        detection_results = detect_frames(_worker_detector, frames, settings.detection_scale_factor, roi=roi)
+
+        for detection_result in detection_results:
+            frame_number = frame_index + 1
+            owned = frame_index >= chunk.start
+            if owned:
+                analysis.detections.append(
+                    (detection_result.boxes, detection_result.confidences, detection_result.class_ids)
+                )
+                analysis.max_rickshaw_count = max(analysis.max_rickshaw_count, len(detection_result))
+
+            # Same tracking and counting rules as FrameAnalyzer; warm-up crossings belong to the previous chunk
+            if tracker and len(detection_result) > 0:
+                tracked_objects = tracker.update(detection_result.boxes)
+                if record_tracks:
+                    analysis.tracks.append((frame_number, tracked_objects))
+                for track_id, bbox in (tracked_objects.items() if line_detector else ()):
+                    event = line_detector.update(object_id=str(track_id), bbox=bbox, frame_number=frame_number)
+                    if event and owned:
+                        index = np.flatnonzero((detection_result.boxes == bbox).all(axis=1))[0]
+                        analysis.events.append((
+                            frame_number, event, track_id,
+                            float(detection_result.confidences[index]), bbox.tolist()
+                        ))
+            frame_index += 1
+
+    cap.release()
+    return analysis
+
+
+def _render_chunk(
+    video_path: str,
+    chunk: VideoChunk,
+    analysis: ChunkAnalysis,
+    count_offset: Tuple[int, int],
+    enable_counting: bool,
+    segment_path: str
+) -> int:
+    from app.services.video_service import FrameAnalyzer
+
+    cap = cv2.VideoCapture(video_path)
+    fps = int(cap.get(cv2.CAP_PROP_FPS))
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    out = create_video_writer(Path(segment_path), fps, (width, height))
+
+    # Only used for drawing: detections and counts come from the analysis pass
+    analyzer = FrameAnalyzer(_worker_detector, width, height, enable_counting)
+    events_by_frame: Dict[int, List[str]] = defaultdict(list)
+    for frame_number, event, *_ in analysis.events:
+        events_by_frame[frame_number].append(event)
+
+    total_entry, total_exit = count_offset
+    cap.set(cv2.CAP_PROP_POS_FRAMES, chunk.start)
+    frames_written = 0
+
+    try:
+        for offset, (boxes, confidences, class_ids) in enumerate(analysis.detections):
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            for event in events_by_frame.get(chunk.start + offset + 1, ()):
+                if event == "entry":
+                    total_entry += 1
+                else:
+                    total_exit += 1
+
+            detection_result = DetectionResult(boxes, confidences, class_ids)
+            annotated_frame = analyzer.draw(frame, detection_result, (total_entry, total_exit, total_entry - total_exit))
+            out.write(annotated_frame)
+            frames_written += 1
+        out.release()
+    finally:
+        cap.release()
+        # A failed chunk stops its encoder before the parent deletes the segment
+        out.abort()
+    return frames_written
+
+
+def concat_segments(segment_paths: List[Path], output_path: Path):
+    # Segments share codec and parameters, so ffmpeg can join them without re-encoding
+    ffmpeg = find_ffmpeg()
+    if ffmpeg:
+        list_path = output_path.with_suffix(".concat.txt")
+        list_path.write_text("".join(f"file '{path.resolve()}'\n" for path in segment_paths))
+        try:
+            subprocess.run(
+                [ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                 "-i", str(list_path), "-c", "copy", "-movflags", "+faststart", str(output_path)],
+                check=True, capture_output=True
+            )
+            return
+        except subprocess.CalledProcessError as e:
+            logger.warning(f"ffmpeg concat failed, falling back to OpenCV: {e.stderr.decode(errors='ignore').strip()}")
+        finally:
+            list_path.unlink(missing_ok=True)
+
+    out = None
+    try:
+        for path in segment_paths:
+            cap = cv2.VideoCapture(str(path))
+            if out is None:
+                fps = int(cap.get(cv2.CAP_PROP_FPS))
+                size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+                out = create_video_writer(output_path, fps, size)
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                out.write(frame)
+            cap.release()
+        if out is not None:
+            out.release()
+    finally:
+        if out is not None:
+            out.abort()
+
+
+def _write_metadata(
+    metadata: OverlayMetadataWriter,
+    chunks: List[VideoChunk],
+    analyses: List[ChunkAnalysis],
+    count_offsets: List[Tuple[int, int]],
+    enable_counting: bool
+):
+    # Owned frames in order, with each chunk's track IDs prefixed like the rickshaw_id of its events
+    for chunk, analysis, (entry_offset, exit_offset) in zip(chunks, analyses, count_offsets):
+        tracks_by_frame = dict(analysis.tracks)
+        events = iter(analysis.events)
+        next_event = next(events, None)
+        entry_count, exit_count = entry_offset, exit_offset
+
+        for offset, (boxes, confidences, class_ids) in enumerate(analysis.detections):
+            frame_number = chunk.start + offset + 1
+            while next_event is not None and next_event[0] <= frame_number:
+                if next_event[1] == "entry":
+                    entry_count += 1
+                else:
+                    exit_count += 1
+                next_event = next(events, None)
+
+            tracked_objects = {
+                f"{chunk.index}-{track_id}": bbox for track_id, bbox in tracks_by_frame.get(frame_number, {}).items()
+            }
+            counts = (entry_count, exit_count) if enable_counting else None
+            metadata.add(frame_number, DetectionResult(boxes, confidences, class_ids), tracked_objects, counts)
+
+
+def process_video_chunked(
+    video_path: Path,
+    output_path: Path,
+    total_frames: int,
+    num_chunks: int,
+    enable_counting: bool = True,
+    camera_id: str = "default",
+    detector_factory: Optional[Callable] = None,
+    render: bool = True,
+    detection_store: Optional[DetectionStoreWriter] = None,
+    metadata: Optional[OverlayMetadataWriter] = None
+) -> dict:
+    chunks = plan_chunks(total_frames, num_chunks, settings.video_chunk_overlap)
+    logger.info(f"Chunked video processing: {len(chunks)} chunks of ~{math.ceil(total_frames / len(chunks))} frames, "
+                f"{settings.video_chunk_overlap} warm-up frames")
+
+    detector_kwargs = {
+        "model_path": str(settings.model_path),
+        "confidence": settings.yolo_confidence,
+        "iou": settings.yolo_iou,
+        "device": settings.yolo_device,
+        "backend": settings.inference_backend,
+        "imgsz": settings.yolo_imgsz
+    }
+    num_threads = max(1, (os.cpu_count() or 1) // len(chunks))
+    segment_paths = [output_path.with_name(f"{output_path.stem}_part{chunk.index}{output_path.suffix}") for chunk in chunks]
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=len(chunks),
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(detector_factory, detector_kwargs, num_threads)
+        ) as pool:
+            # Pass 1: detect, track and count every chunk in parallel
+            analyses = list(pool.map(
+                _analyze_chunk, [str(video_path)] * len(chunks), chunks, [enable_counting] * len(chunks),
+                [detection_store is not None or metadata is not None] * len(chunks)
+            ))
+
+            # Stitch: counts in each chunk start from the totals of the chunks before it
+            count_offsets = []
+            events = []
+            total_entry = total_exit = 0
+            for analysis in analyses:
+                count_offsets.append((total_entry, total_exit))
+                for frame_number, event, track_id, confidence, bbox in analysis.events:
+                    if event == "entry":
+                        total_entry += 1
+                    else:
+                        total_exit += 1
+                    log_rickshaw_event(
+                        event_type=event,
+                        confidence=confidence,
+                        camera_id=camera_id,
+                        rickshaw_id=f"{analysis.index}-{track_id}",  # Track IDs are only unique per chunk
+                        frame_number=frame_number,
+                        bounding_box=json.dumps(bbox),
+                        crossing_line="entry_line"
+                    )
+                    events.append({
+                        "frame_number": frame_number,
+                        "event_type": event,
+                        "rickshaw_id": f"{analysis.index}-{track_id}",
+                        "confidence": confidence
+                    })
+
+            if detection_store:
+                for chunk, analysis in zip(chunks, analyses):
+                    for offset, (boxes, confidences, class_ids) in enumerate(analysis.detections):
+                        detection_store.add(chunk.start + offset + 1, DetectionResult(boxes, confidences, class_ids))
+                    # Each chunk replays with its own line state; warm-up crossings are not counted
+                    detection_store.trajectories.segment_starts[chunk.index] = chunk.start + 1
+                    for frame_number, tracked_objects in analysis.tracks:
+                        detection_store.add_tracks(frame_number, tracked_objects, segment=chunk.index)
+
+            if metadata:
+                _write_metadata(metadata, chunks, analyses, count_offsets, enable_counting)
+
+            frames_processed = sum(len(analysis.detections) for analysis in analyses)
+            if render:
+                # Pass 2: draw and encode every segment in parallel with the stitched counts
+                frames_processed = sum(pool.map(
+                    _render_chunk,
+                    [str(video_path)] * len(chunks), chunks, analyses, count_offsets,
+                    [enable_counting] * len(chunks), [str(path) for path in segment_paths]
+                ))
+
+        if render:
+            concat_segments(segment_paths, output_path)
+    finally:
+        for path in segment_paths:
+            path.unlink(missing_ok=True)
+
+    return {
+        "rickshaw_count": max(analysis.max_rickshaw_count for analysis in analyses),
+        "total_entry": total_entry,
+        "total_exit": total_exit,
+        "frames_processed": frames_processed,
+        "frames_analyzed": frames_processed,
+        "events": events,
+        "chunks": len(chunks)
+    }
@@ -2,7 +2,7 @@ import threading
 import time
 import cv2
 import numpy as np
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from dataclasses import dataclass, field
 from datetime import datetime
 from app.core.config import logger
@@ -11,7 +11,7 @@ from app.core.config import logger
 @dataclass
 class VideoJobState:
     job_id: str
-    status: str  # "processing", "paused", "completed", "failed", "stopped"
+    status: str  # "queued", "processing", "paused", "completed", "failed", "stopped"
     progress: float  # 0.0 to 100.0
     total_frames: int
     processed_frames: int
@@ -30,6 +30,10 @@ class VideoJobState:
     total_entry: int = 0
     total_exit: int = 0
     net_count: int = 0
+    output: str = "video"  # "none" for counts-only jobs, "overlay" for client-drawn jobs
+    metadata_url: Optional[str] = None  # Per-frame detections/tracks (overlay jobs)
+    events: Optional[List[dict]] = None  # Crossing events (counts-only and overlay jobs)
+    render_time_saved_seconds: Optional[float] = None
     
     created_at: datetime = field(default_factory=datetime.now)
     completed_at: Optional[datetime] = None
@@ -46,8 +50,29 @@ class VideoJobManager:
         self._start_cleanup_thread()
         logger.info("VideoJobManager initialized")
     
+    def create_queued_job(self, job_id: str) -> VideoJobState:
+        with self._jobs_lock:
+            job_state = VideoJobState(
+                job_id=job_id,
+                status="queued",
+                progress=0.0,
+                total_frames=0,
+                processed_frames=0
+            )
+            self._jobs[job_id] = job_state
+            logger.info(f"Queued job: {job_id}")
+            return job_state
+    
     def create_job(self, job_id: str, total_frames: int) -> VideoJobState:
         with self._jobs_lock:
+            existing_job = self._jobs.get(job_id)
+            if existing_job and existing_job.status == "queued":
+                # Picked up by a queue worker: keep the same state object the API already hands out
+                existing_job.status = "processing"
+                existing_job.total_frames = total_frames
+                logger.info(f"Started queued job: {job_id} with {total_frames} frames")
+                return existing_job
+            
             job_state = VideoJobState(
                 job_id=job_id,
                 status="processing",
@@ -95,6 +120,10 @@ class VideoJobManager:
             job.total_entry = result.get("total_entry", 0)
             job.total_exit = result.get("total_exit", 0)
             job.net_count = result.get("net_count", 0)
+            job.output = result.get("output", "video")
+            job.metadata_url = result.get("metadata_url")
+            job.events = result.get("events")
+            job.render_time_saved_seconds = result.get("render_time_saved_seconds")
             logger.info(f"Job completed: {job_id}")
     
     def mark_failed(self, job_id: str, error_message: str):
@@ -125,7 +154,7 @@ class VideoJobManager:
     
     def stop_job(self, job_id: str) -> bool:
         job = self.get_job(job_id)
-        if job and job.status in ["processing", "paused"]:
+        if job and job.status in ["queued", "processing", "paused"]:
             job.should_stop = True
             job.status = "stopped"
             job.completed_at = datetime.now()
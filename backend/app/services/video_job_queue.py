@@ -0,0 +1,222 @@
+import json
+import threading
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Deque, Dict, List, Optional
+from app.db.database import insert_video_job, update_video_job, get_unfinished_video_jobs
+from app.services.video_job_manager import get_job_manager
+from app.core.config import settings, logger
+
+
+class QueueFullError(Exception):
+    pass
+
+
+@dataclass
+class QueuedVideoJob:
+    job_id: str
+    input_path: Path
+    output_filename: str
+    enable_counting: bool = True
+    camera_id: str = "default"
+    output: str = "video"
+
+
+class VideoJobQueue:
+    def __init__(self, num_workers: int = 1, max_queue_size: int = 10):
+        self.num_workers = max(1, num_workers)
+        self.max_queue_size = max_queue_size
+
+        self._pending: Deque[QueuedVideoJob] = deque()
+        self._condition = threading.Condition()
+        self._running = True
+        self._active: Dict[str, QueuedVideoJob] = {}
+
+        self._workers: List[threading.Thread] = []
+        for index in range(self.num_workers):
+            worker = threading.Thread(target=self._run, name=f"video-job-worker-{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+        logger.info(f"VideoJobQueue started: {self.num_workers} workers, max {self.max_queue_size} queued jobs")
+
+    def is_full(self) -> bool:
+        with self._condition:
+            return len(self._pending) >= self.max_queue_size
+
+    def submit(
+        self,
+        job_id: str,
+        input_path: Path,
+        output_filename: str,
+        enable_counting: bool = True,
+        camera_id: str = "default",
+        output: str = "video"
+    ) -> int:
+        job = QueuedVideoJob(job_id, Path(input_path), output_filename, enable_counting, camera_id, output)
+
+        with self._condition:
+            if len(self._pending) >= self.max_queue_size:
+                raise QueueFullError(f"Video job queue is full ({self.max_queue_size} jobs waiting)")
+
+            # Persist first so an accepted job survives a restart
+            insert_video_job(job_id, str(input_path), output_filename, enable_counting, camera_id, output)
+            get_job_manager().create_queued_job(job_id)
+            self._pending.append(job)
+            position = len(self._pending)
+            self._condition.notify()
+
+        logger.info(f"[Job {job_id}] Queued at position {position}")
+        return position
+
+    def get_position(self, job_id: str) -> Optional[int]:
+        # 1-based position among waiting jobs; None once a worker has picked it up
+        with self._condition:
+            for position, job in enumerate(self._pending, start=1):
+                if job.job_id == job_id:
+                    return position
+        return None
+
+    def cancel(self, job_id: str) -> bool:
+        # Remove a job that has not started yet
+        with self._condition:
+            job = next((job for job in self._pending if job.job_id == job_id), None)
+            if job is None:
+                return False
+            self._pending.remove(job)
+
+        update_video_job(job_id, "stopped")
+        if job.input_path.exists():
+            job.input_path.unlink()
+        logger.info(f"[Job {job_id}] Removed from queue")
+        return True
+
+    def restore(self):
+        # Re-enqueue work that was waiting or interrupted when the server last stopped
+        job_manager = get_job_manager()
+        restored = 0
+
+        for row in get_unfinished_video_jobs():
+            input_path = Path(row["input_path"])
+            if not input_path.exists():
+                update_video_job(row["job_id"], "failed", error_message="Input video missing after restart")
+                continue
+
+            job = QueuedVideoJob(
+                job_id=row["job_id"],
+                input_path=input_path,
+                output_filename=row["output_filename"],
+                enable_counting=bool(row["enable_counting"]),
+                camera_id=row["camera_id"],
+                output=row["output_mode"] or "video"
+            )
+            with self._condition:
+                # Restored jobs were already accepted, so they bypass the queue limit
+                update_video_job(job.job_id, "queued")
+                job_manager.create_queued_job(job.job_id)
+                self._pending.append(job)
+                self._condition.notify()
+            restored += 1
+
+        if restored:
+            logger.info(f"Restored {restored} unfinished video jobs from the database")
+
+    def _run(self):
+        from app.core.startup import get_detector
+        from app.services.video_service import VideoService
+
+        job_manager = get_job_manager()
+
+        while True:
+            with self._condition:
+                while self._running and not self._pending:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                job = self._pending.popleft()
+                self._active[job.job_id] = job
+
+            try:
+                state = job_manager.get_job(job.job_id)
+                if state and state.should_stop:
+                    # Stopped while waiting
+                    update_video_job(job.job_id, "stopped")
+                    if job.input_path.exists():
+                        job.input_path.unlink()
+                    continue
+
+                update_video_job(job.job_id, "processing")
+                video_service = VideoService(get_detector())
+                video_service.process_video_with_live_preview(
+                    job.job_id, job.input_path, job.output_filename, job.enable_counting, job.camera_id, job.output
+                )
+                self._record_outcome(job.job_id)
+
+            except Exception as e:
+                logger.error(f"[Job {job.job_id}] Queue worker error: {str(e)}", exc_info=True)
+                update_video_job(job.job_id, "failed", error_message=str(e))
+            finally:
+                with self._condition:
+                    self._active.pop(job.job_id, None)
+
+    def _record_outcome(self, job_id: str):
+        state = get_job_manager().get_job(job_id)
+        if state is None:
+            return
+
+        if state.status == "completed":
+            result = {
+                "file_name": state.output_filename,
+                "rickshaw_count": state.rickshaw_count,
+                "total_entry": state.total_entry,
+                "total_exit": state.total_exit,
+                "net_count": state.net_count,
+                "output_url": state.output_url,
+                "output": state.output
+            }
+            if state.output == "overlay":
+                result["metadata_url"] = state.metadata_url
+            if state.output != "video":
+                result["events"] = state.events
+                result["render_time_saved_seconds"] = state.render_time_saved_seconds
+            update_video_job(job_id, "completed", result=json.dumps(result))
+        elif state.status == "failed":
+            update_video_job(job_id, "failed", error_message=state.error_message)
+        else:
+            update_video_job(job_id, "stopped")
+
+    def get_stats(self) -> dict:
+        with self._condition:
+            return {
+                "workers": self.num_workers,
+                "queued": len(self._pending),
+                "processing": len(self._active),
+                "max_queue_size": self.max_queue_size
+            }
+
+    def shutdown(self):
+        # Jobs still queued or running stay 'queued'/'processing' in the database and resume on restart
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        logger.info("VideoJobQueue stopped")
+
+
+# Singleton instance
+_video_job_queue: Optional[VideoJobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_video_job_queue() -> VideoJobQueue:
+    global _video_job_queue
+
+    if _video_job_queue is None:
+        with _queue_lock:
+            if _video_job_queue is None:
+                _video_job_queue = VideoJobQueue(
+                    num_workers=settings.video_job_workers,
+                    max_queue_size=settings.video_job_queue_size
+                )
+
+    return _video_job_queue
@@ -0,0 +1,177 @@
+import queue
+import threading
+import time
+import cv2
+import numpy as np
+from typing import Callable, List, Optional, Tuple
+from app.model.detector import YOLODetector, DetectionResult
+from app.utils.frame_utils import detect_frames, RegionOfInterest
+from app.core.config import logger
+
+
+# A decoded batch: (first frame number, frames); None marks the end of the stream
+FrameBatch = Tuple[int, List[np.ndarray]]
+
+
+class PipelineStopped(Exception):
+    pass
+
+
+class VideoPipeline:
+    def __init__(
+        self,
+        detector: YOLODetector,
+        batch_size: int = 8,
+        scale_factor: float = 1.0,
+        roi: Optional[RegionOfInterest] = None,
+        queue_size: int = 4
+    ):
+        self.detector = detector
+        self.batch_size = max(1, batch_size)
+        self.scale_factor = scale_factor
+        self.roi = roi
+
+        # Bounded queues (in batches) keep memory flat when one stage is slower than the others
+        self._decoded: "queue.Queue[Optional[FrameBatch]]" = queue.Queue(maxsize=max(1, queue_size))
+        self._detected: "queue.Queue[Optional[Tuple[FrameBatch, List[DetectionResult]]]]" = queue.Queue(maxsize=max(1, queue_size))
+        self._abort = threading.Event()
+        self._error: Optional[BaseException] = None
+
+        # Time spent inside each stage, for the completion log
+        self.stage_seconds = {"decode": 0.0, "inference": 0.0, "write": 0.0}
+
+    @property
+    def aborted(self) -> bool:
+        # Lets a blocking before_batch hook (e.g. a paused job) notice that another stage failed
+        return self._abort.is_set()
+
+    def run(
+        self,
+        cap: cv2.VideoCapture,
+        on_frame: Callable[[np.ndarray, DetectionResult, int], None],
+        before_batch: Optional[Callable[[cv2.VideoCapture, int], Optional[int]]] = None,
+        start_frame: int = 0
+    ) -> int:
+        # decoder thread -> inference (calling thread) -> writer thread, frames stay in order.
+        # on_frame runs on the writer thread, one frame at a time, in frame order.
+        # before_batch runs on the decoder thread before each read; it may seek the capture and
+        # returns the next frame number, or None to stop.
+        decoder = threading.Thread(
+            target=self._decode, args=(cap, before_batch, start_frame), name="video-decode", daemon=True
+        )
+        writer = threading.Thread(target=self._write, args=(on_frame,), name="video-write", daemon=True)
+        decoder.start()
+        writer.start()
+
+        frames_processed = 0
+        started = time.perf_counter()
+        try:
+            while not self._abort.is_set():
+                batch = self._get(self._decoded)
+                if batch is None:
+                    break
+
+                start = time.perf_counter()
+                detection_results = detect_frames(self.detector, batch[1], self.scale_factor, roi=self.roi)
+                self.stage_seconds["inference"] += time.perf_counter() - start
+
+                self._put(self._detected, (batch, detection_results))
+                frames_processed += len(batch[1])
+        except PipelineStopped:
+            pass
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            # Always let the writer finish what it already has, then wind the decoder down
+            self._put(self._detected, None, force=True)
+            writer.join()
+            self._abort.set()
+            decoder.join()
+
+        if self._error is not None:
+            raise self._error
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"VideoPipeline: {frames_processed} frames in {elapsed:.2f}s "
+            f"({frames_processed / elapsed if elapsed > 0 else 0.0:.1f} fps; "
+            + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in self.stage_seconds.items()) + ")"
+        )
+        return frames_processed
+
+    def _decode(
+        self,
+        cap: cv2.VideoCapture,
+        before_batch: Optional[Callable[[cv2.VideoCapture, int], Optional[int]]],
+        frame_number: int
+    ):
+        try:
+            while not self._abort.is_set():
+                if before_batch is not None:
+                    frame_number = before_batch(cap, frame_number)
+                    if frame_number is None:
+                        break
+
+                start = time.perf_counter()
+                frames = []
+                while len(frames) < self.batch_size:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    frames.append(frame)
+                self.stage_seconds["decode"] += time.perf_counter() - start
+
+                if not frames:
+                    break
+                self._put(self._decoded, (frame_number + 1, frames))
+                frame_number += len(frames)
+
+            self._put(self._decoded, None)
+        except PipelineStopped:
+            pass
+        except BaseException as e:
+            self._fail(e)
+
+    def _write(self, on_frame: Callable[[np.ndarray, DetectionResult, int], None]):
+        try:
+            while True:
+                # The writer drains until the end marker so nothing inferred is lost
+                item = self._detected.get()
+                if item is None:
+                    return
+                if self._abort.is_set():
+                    continue
+
+                (first_frame, frames), detection_results = item
+                start = time.perf_counter()
+                for offset, (frame, detection_result) in enumerate(zip(frames, detection_results)):
+                    on_frame(frame, detection_result, first_frame + offset)
+                self.stage_seconds["write"] += time.perf_counter() - start
+        except BaseException as e:
+            self._fail(e)
+            # Keep draining so the inference stage never blocks on a full queue
+            while self._detected.get() is not None:
+                pass
+
+    def _get(self, source: queue.Queue):
+        while True:
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                if self._abort.is_set():
+                    raise PipelineStopped()
+
+    def _put(self, target: queue.Queue, item, force: bool = False):
+        # force: the writer's end marker must get through even after an abort (the writer keeps draining)
+        while True:
+            try:
+                target.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if self._abort.is_set() and not force:
+                    raise PipelineStopped()
+
+    def _fail(self, error: BaseException):
+        if self._error is None:
+            self._error = error
+        self._abort.set()
@@ -1,18 +1,270 @@
 import cv2
 import numpy as np
 import json
+import os
+import shutil
+import threading
+import time
 from pathlib import Path
+from typing import List, Dict, Optional, Tuple
 from fastapi import UploadFile
-from app.model.detector import YOLODetector
-from app.utils.draw_utils import (
-    draw_detections, draw_count_overlay, draw_entry_exit_line, 
-    draw_entry_exit_counts
-)
+from app.model.detector import YOLODetector, DetectionResult
+from app.utils.draw_utils import FrameAnnotator
 from app.utils.file_utils import generate_unique_filename, save_upload_file, get_output_url
-from app.utils.count_utils import LineCrossingDetector, SimpleTracker
+from app.utils.count_utils import LineCrossingDetector, SimpleTracker, AdaptiveStride, count_line_crossings
+from app.utils.frame_utils import detect_frames, build_roi, RegionOfInterest
+from app.utils.video_writer import create_video_writer
 from app.db.database import insert_detection, log_rickshaw_event
 from app.core.config import settings, logger
+from app.core.executor import run_in_inference_executor
 from app.services.video_job_manager import get_job_manager
+from app.services.video_pipeline import VideoPipeline
+from app.services.video_chunking import process_video_chunked
+from app.services.detection_store import DetectionStore, DetectionStoreWriter, open_detection_store, open_trajectories
+from app.services.overlay_metadata import OverlayMetadataWriter, overlay_metadata_path
+
+
+# "video" writes the annotated video, "none" only counts, "overlay" keeps the upload untouched and writes
+# per-frame detections/tracks for the client to draw
+OUTPUT_MODES = ("video", "none", "overlay")
+
+
+class FrameAnalyzer:
+    def __init__(
+        self,
+        detector: YOLODetector,
+        frame_width: int,
+        frame_height: int,
+        enable_counting: bool = True,
+        camera_id: str = "default",
+        track_objects: bool = False,
+        render: bool = True,
+        log_events: bool = True,
+        detection_store: Optional[DetectionStoreWriter] = None,
+        metadata: Optional[OverlayMetadataWriter] = None
+    ):
+        self.detector = detector
+        self.enable_counting = enable_counting
+        self.camera_id = camera_id
+        self.render = render
+        self.log_events = log_events  # Off when replaying stored detections (events were logged the first time)
+        self.detection_store = detection_store
+        self.metadata = metadata
+
+        self.line_detector = None
+        self.tracker = None
+        if enable_counting:
+            self.line_detector = LineCrossingDetector(
+                line_start=settings.entry_line_start,
+                line_end=settings.entry_line_end,
+                frame_width=frame_width,
+                frame_height=frame_height,
+                use_percentage=True
+            )
+        if enable_counting or track_objects or detection_store or metadata:
+            # Stored trajectories let the recount API try other lines later, even for uncounted runs
+            self.tracker = SimpleTracker()
+
+        # Draws into the decoded frames in place (the analyzer owns them). The line is fixed per video,
+        # so its overlay is rendered once, on the first drawn frame; counts-only runs never build it
+        self.annotator = FrameAnnotator(
+            detector,
+            line=self.line_detector.get_line_pixels() if self.line_detector else None,
+            line_label="Counting Line"
+        )
+
+        # Tracks from the last analysed frame: track_id -> (bbox, confidence, class_id)
+        self.last_tracks: Dict[int, Tuple[np.ndarray, float, int]] = {}
+
+        self.max_rickshaw_count = 0
+        self.total_entry = 0
+        self.total_exit = 0
+
+        # Crossing events in frame order, returned by counts-only runs
+        self.events: List[dict] = []
+        # Time spent drawing, to estimate what counts-only runs save
+        self.render_seconds = 0.0
+
+    def process(self, frame: np.ndarray, detection_result: DetectionResult, frame_number: int) -> np.ndarray:
+        # Returns the annotated frame, or the input frame untouched when rendering is off
+        frame_rickshaw_count = self.detector.count_rickshaws(detection_result)
+        self.max_rickshaw_count = max(self.max_rickshaw_count, frame_rickshaw_count)
+        if self.detection_store:
+            self.detection_store.add(frame_number, detection_result)
+
+        self.last_tracks = {}
+        tracked_objects = {}
+        if self.tracker and len(detection_result) > 0:
+            tracked_objects = self.tracker.update(detection_result.boxes)
+            self.last_tracks = self._attach_scores(tracked_objects, detection_result)
+            if self.detection_store:
+                self.detection_store.add_tracks(frame_number, tracked_objects)
+
+            if self.enable_counting and self.line_detector:
+                for track_id, bbox in tracked_objects.items():
+                    event = self.line_detector.update(
+                        object_id=str(track_id),
+                        bbox=bbox,
+                        frame_number=frame_number
+                    )
+                    if event:
+                        bbox_json = json.dumps(bbox.tolist())
+                        confidence = self.last_tracks[track_id][1]
+                        if self.log_events:
+                            log_rickshaw_event(
+                                event_type=event,
+                                confidence=confidence,
+                                camera_id=self.camera_id,
+                                rickshaw_id=str(track_id),
+                                frame_number=frame_number,
+                                bounding_box=bbox_json,
+                                crossing_line="entry_line"
+                            )
+                        self.events.append({
+                            "frame_number": frame_number,
+                            "event_type": event,
+                            "rickshaw_id": str(track_id),
+                            "confidence": confidence
+                        })
+
+        if self.enable_counting and self.line_detector:
+            self.total_entry, self.total_exit, _ = self.line_detector.get_counts()
+        if self.metadata:
+            counts = (self.total_entry, self.total_exit) if self.enable_counting and self.line_detector else None
+            self.metadata.add(frame_number, detection_result, tracked_objects, counts)
+
+        if not self.render:
+            return frame
+
+        start = time.perf_counter()
+        annotated_frame = self.annotator.render(frame, detection_result, self.get_counts(), frame_rickshaw_count, inplace=True)
+        self.render_seconds += time.perf_counter() - start
+        return annotated_frame
+
+    def render_interpolated(
+        self,
+        frame: np.ndarray,
+        previous_tracks: Dict[int, Tuple[np.ndarray, float, int]],
+        next_tracks: Dict[int, Tuple[np.ndarray, float, int]],
+        alpha: float,
+        counts: Optional[Tuple[int, int, int]] = None
+    ) -> np.ndarray:
+        # Frame between two analysed keyframes: boxes of tracks seen at both ends are linearly interpolated
+        track_ids = [track_id for track_id in next_tracks if track_id in previous_tracks]
+        if track_ids:
+            detection_result = DetectionResult(
+                np.array([(1 - alpha) * previous_tracks[t][0] + alpha * next_tracks[t][0] for t in track_ids],
+                         dtype=np.float32),
+                np.array([next_tracks[t][1] for t in track_ids], dtype=np.float32),
+                np.array([next_tracks[t][2] for t in track_ids], dtype=int)
+            )
+        else:
+            detection_result = DetectionResult.empty()
+
+        return self.draw(frame, detection_result, counts)
+
+    def draw(
+        self,
+        frame: np.ndarray,
+        detection_result: DetectionResult,
+        counts: Optional[Tuple[int, int, int]] = None
+    ) -> np.ndarray:
+        # Render without tracking or counting (counts supplied by the caller)
+        start = time.perf_counter()
+        annotated_frame = self.annotator.render(
+            frame, detection_result, counts or self.get_counts(), self.detector.count_rickshaws(detection_result),
+            inplace=True
+        )
+        self.render_seconds += time.perf_counter() - start
+        return annotated_frame
+
+    def get_counts(self) -> Optional[Tuple[int, int, int]]:
+        return self.line_detector.get_counts() if self.enable_counting and self.line_detector else None
+
+    def _attach_scores(
+        self,
+        tracked_objects: Dict[int, np.ndarray],
+        detection_result: DetectionResult
+    ) -> Dict[int, Tuple[np.ndarray, float, int]]:
+        # The tracker hands back the detection rows themselves, so an exact match finds each score
+        tracks = {}
+        for track_id, bbox in tracked_objects.items():
+            index = np.flatnonzero((detection_result.boxes == bbox).all(axis=1))[0]
+            tracks[track_id] = (bbox, float(detection_result.confidences[index]), int(detection_result.class_ids[index]))
+        return tracks
+
+
+class TimedVideoWriter:
+    # Video writer (ffmpeg or OpenCV, see video_writer setting) that keeps track of the time spent encoding
+    def __init__(self, path: Path, fps: int, frame_size: Tuple[int, int]):
+        self._writer = create_video_writer(path, fps, frame_size)
+        self.seconds = 0.0
+        self.frames_written = 0
+
+    def write(self, frame: np.ndarray):
+        start = time.perf_counter()
+        self._writer.write(frame)
+        self.seconds += time.perf_counter() - start
+        self.frames_written += 1
+
+    def release(self):
+        # ffmpeg finishes encoding (and moves the moov atom) on release, so this counts as encoding time
+        start = time.perf_counter()
+        self._writer.release()
+        self.seconds += time.perf_counter() - start
+
+    def abort(self):
+        # Stops the encoder and removes the partial file; a no-op once released
+        self._writer.abort()
+
+
+class RenderCostEstimator:
+    # Moving average of drawing + encoding time per megapixel of frame, fed by rendered runs. Until one
+    # has been timed, the calibrated render_cost_ms_per_megapixel setting stands in for it
+    def __init__(self, smoothing: float = 0.3):
+        self.smoothing = smoothing
+        self._seconds_per_megapixel: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, frames: int, width: int, height: int):
+        if frames <= 0 or width <= 0 or height <= 0:
+            return
+        sample = seconds / (frames * width * height / 1e6)
+        with self._lock:
+            if self._seconds_per_megapixel is None:
+                self._seconds_per_megapixel = sample
+            else:
+                self._seconds_per_megapixel += self.smoothing * (sample - self._seconds_per_megapixel)
+
+    def estimate(self, frames: int, width: int, height: int) -> float:
+        with self._lock:
+            seconds_per_megapixel = self._seconds_per_megapixel
+        if seconds_per_megapixel is None:
+            seconds_per_megapixel = settings.render_cost_ms_per_megapixel / 1000
+        return seconds_per_megapixel * frames * width * height / 1e6
+
+
+_render_cost = RenderCostEstimator()
+
+
+def read_frame_batch(cap: cv2.VideoCapture, batch_size: int) -> List[np.ndarray]:
+    frames = []
+    while len(frames) < batch_size:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    return frames
+
+
+def read_skipped_frames(cap: cv2.VideoCapture, count: int, retrieve: bool = True) -> List[Optional[np.ndarray]]:
+    # grab() demuxes and decodes without converting to BGR; retrieve() only when the pixels are needed
+    frames = []
+    for _ in range(count):
+        if not cap.grab():
+            break
+        frames.append(cap.retrieve()[1] if retrieve else None)
+    return frames
 
 
 class VideoService:
@@ -20,22 +272,57 @@ class VideoService:
         self.detector = detector
 
     async def process_video(
-        self, 
+        self,
         file: UploadFile,
         enable_counting: bool = True,
-        camera_id: str = "default"
+        camera_id: str = "default",
+        adaptive_skip: Optional[bool] = None,
+        chunked: Optional[bool] = None,
+        output: str = "video"
     ) -> dict:
-        logger.info(f"Starting video processing: {file.filename}, counting={enable_counting}")
+        if output not in OUTPUT_MODES:
+            raise ValueError(f"Invalid output mode: {output}. Allowed modes: {', '.join(OUTPUT_MODES)}")
+        if adaptive_skip is None:
+            adaptive_skip = settings.adaptive_frame_skip
+        if chunked is None:
+            chunked = settings.enable_chunked_video
+        logger.info(f"Starting video processing: {file.filename}, counting={enable_counting}, "
+                    f"adaptive_skip={adaptive_skip}, output={output}")
 
         output_filename = generate_unique_filename(file.filename)
         temp_input_path = settings.videos_output_dir / f"temp_input_{output_filename}"
-        output_path = settings.videos_output_dir / output_filename
 
         try:
             # Save uploaded file temporarily
             await save_upload_file(file, temp_input_path)
             logger.info(f"Video saved temporarily: {temp_input_path}")
+        except Exception:
+            if temp_input_path.exists():
+                temp_input_path.unlink()
+            raise
+
+        # The whole decode/inference/encode loop is CPU-bound: run it on the bounded executor
+        return await run_in_inference_executor(
+            self.process_video_file, temp_input_path, output_filename, enable_counting, camera_id, adaptive_skip, chunked,
+            output
+        )
+
+    def process_video_file(
+        self,
+        temp_input_path: Path,
+        output_filename: str,
+        enable_counting: bool = True,
+        camera_id: str = "default",
+        adaptive_skip: bool = False,
+        chunked: bool = False,
+        output: str = "video"
+    ) -> dict:
+        output_path = settings.videos_output_dir / output_filename
+        render = output == "video"
+        detection_store = None
+        metadata = None
 
+        try:
             # Open video file
             cap = cv2.VideoCapture(str(temp_input_path))
             if not cap.isOpened():
@@ -47,80 +334,40 @@ class VideoService:
             total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
             logger.info(f"Video properties: {width}x{height} @ {fps}fps, {total_frames} frames")
 
-            line_detector = SimpleTracker() if not enable_counting else LineCrossingDetector(
-                line_start=settings.entry_line_start,
-                line_end=settings.entry_line_end,
-                frame_width=width,
-                frame_height=height,
-                use_percentage=True
-            ) if enable_counting else None
-            tracker = SimpleTracker() if enable_counting else None
-
-            # Create video writer
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(str(output_path), fourcc, fps, (width, height))
-
-            max_rickshaw_count = 0
-            frame_count = 0
-            total_entry = 0
-            total_exit = 0
-
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-
-                frame_count += 1  # ✅ increment frame counter
-
-                # Run detection
-                detection_result = self.detector.detect(frame)
-                frame_rickshaw_count = self.detector.count_rickshaws(detection_result)
-                max_rickshaw_count = max(max_rickshaw_count, frame_rickshaw_count)
-
-                annotated_frame = draw_detections(frame, detection_result, self.detector)
-
-                if enable_counting and line_detector and tracker and len(detection_result) > 0:
-                    tracked_objects = tracker.update(detection_result.boxes)
-                    for track_id, bbox in tracked_objects.items():
-                        event = line_detector.update(
-                            object_id=str(track_id),
-                            bbox=bbox,
-                            frame_number=frame_count
-                        )
-                        if event:
-                            bbox_json = json.dumps(bbox.tolist())
-                            confidence = detection_result.confidences[0] if len(detection_result.confidences) > 0 else 0.0
-                            log_rickshaw_event(
-                                event_type=event,
-                                confidence=float(confidence),
-                                camera_id=camera_id,
-                                rickshaw_id=str(track_id),
-                                frame_number=frame_count,
-                                bounding_box=bbox_json,
-                                crossing_line="entry_line"
-                            )
-
-                # Always draw line and counts when counting is enabled
-                if enable_counting and line_detector:
-                    entry_count, exit_count, net_count = line_detector.get_counts()
-                    total_entry = entry_count
-                    total_exit = exit_count
-
-                    line_start, line_end = line_detector.get_line_pixels()
-                    annotated_frame = draw_entry_exit_line(annotated_frame, line_start, line_end, label="Counting Line")
-                    annotated_frame = draw_entry_exit_counts(annotated_frame, entry_count, exit_count, net_count)
-                else:
-                    annotated_frame = draw_count_overlay(annotated_frame, frame_rickshaw_count)
-
-                out.write(annotated_frame)
-
-            cap.release()
-            out.release()
+            # Long videos can be split across worker processes (adaptive skipping stays sequential)
+            num_chunks = self._chunk_count(total_frames) if chunked and not adaptive_skip else 1
+            # Adaptive runs only analyse keyframes: enough to recount, not to re-render every frame
+            detection_store = self._create_detection_store(output_filename, keep_detections=not adaptive_skip)
+            if output == "overlay":
+                metadata = self._create_overlay_metadata(output_filename, width, height, fps, enable_counting)
+            if num_chunks > 1:
+                cap.release()
+                summary = process_video_chunked(
+                    temp_input_path, output_path, total_frames, num_chunks, enable_counting, camera_id, render=render,
+                    detection_store=detection_store, metadata=metadata
+                )
+            else:
+                summary = self._process_frames(
+                    cap, output_path, fps, width, height, enable_counting, camera_id, adaptive_skip, render,
+                    detection_store, metadata
+                )
 
+            source_path = self._finish_overlay(metadata, temp_input_path, output_path, summary)
+            if detection_store:
+                # Moves the upload into the store instead of deleting it (overlay runs keep it as the output)
+                detection_store.close(
+                    source_path, width, height, fps, summary["frames_processed"], move_source=metadata is None
+                )
             if temp_input_path.exists():
                 temp_input_path.unlink()
 
-            logger.info(f"Video processing complete: {frame_count} frames processed")
+            max_rickshaw_count = summary["rickshaw_count"]
+            total_entry = summary["total_entry"]
+            total_exit = summary["total_exit"]
+            frame_count = summary["frames_processed"]
+            frames_analyzed = summary["frames_analyzed"]
+
+            logger.info(f"Video processing complete: {frame_count} frames processed, {frames_analyzed} analyzed")
             logger.info(f"Max rickshaw count: {max_rickshaw_count}, Entry: {total_entry}, Exit: {total_exit}")
 
             insert_detection(
@@ -129,36 +376,309 @@ class VideoService:
                 rickshaw_count=max_rickshaw_count
             )
 
-            output_url = get_output_url(output_filename, "video")
-
-            return {
+            result = {
                 "file_name": output_filename,
                 "rickshaw_count": max_rickshaw_count,
                 "total_entry": total_entry,
                 "total_exit": total_exit,
                 "net_count": total_entry - total_exit,
-                "output_url": output_url,
-                "frames_processed": frame_count
+                "output_url": get_output_url(output_filename, "video") if output != "none" else None,
+                "metadata_url": self._metadata_url(output_filename) if metadata else None,
+                "output": output,
+                "frames_processed": frame_count,
+                "frames_analyzed": frames_analyzed
             }
 
+            if not render:
+                # Counts-only: hand back the events, and what drawing and encoding would have cost
+                result["events"] = summary["events"]
+                result["render_time_saved_seconds"] = self._estimate_time_saved(frame_count, width, height)
+
+            return result
+
         except Exception as e:
             logger.error(f"Error processing video: {str(e)}", exc_info=True)
+            if detection_store:
+                detection_store.discard()
+            if metadata:
+                metadata.discard()
             if temp_input_path.exists():
                 temp_input_path.unlink()
             if output_path.exists():
                 output_path.unlink()
             raise e
 
+    async def rerender_video(self, file_name: str, enable_counting: bool = True) -> dict:
+        store = open_detection_store(file_name)
+        if store is None:
+            raise FileNotFoundError(f"No stored detections for {file_name}")
+        return await run_in_inference_executor(self.render_from_store, store, enable_counting)
+
+    def render_from_store(self, store: DetectionStore, enable_counting: bool = True) -> dict:
+        # No inference: detections come from the store; tracking and counting are replayed with the current settings
+        output_filename = generate_unique_filename(store.file_name)
+        output_path = settings.videos_output_dir / output_filename
+
+        cap = cv2.VideoCapture(str(store.source_path))
+        if not cap.isOpened():
+            raise ValueError("Failed to open stored source video")
+
+        analyzer = FrameAnalyzer(self.detector, store.width, store.height, enable_counting, log_events=False)
+        out = TimedVideoWriter(output_path, store.fps, (store.width, store.height))
+        frame_count = 0
+
+        try:
+            while frame_count < store.frames_processed:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frame_count += 1
+                out.write(analyzer.process(frame, store.frame(frame_count), frame_count))
+            out.release()
+        finally:
+            cap.release()
+            out.abort()
+
+        _render_cost.record(analyzer.render_seconds + out.seconds, out.frames_written, store.width, store.height)
+        logger.info(f"Re-rendered {store.file_name} from {len(store)} stored detections: "
+                    f"{frame_count} frames -> {output_filename}")
+
+        return {
+            "file_name": output_filename,
+            "rickshaw_count": analyzer.max_rickshaw_count,
+            "total_entry": analyzer.total_entry,
+            "total_exit": analyzer.total_exit,
+            "net_count": analyzer.total_entry - analyzer.total_exit,
+            "output_url": get_output_url(output_filename, "video"),
+            "output": "video",
+            "frames_processed": frame_count
+        }
+
+    def recount_video(
+        self,
+        file_name: str,
+        lines: List[Tuple[Tuple[float, float], Tuple[float, float]]],
+        use_percentage: bool = True
+    ) -> dict:
+        # Replays the stored track trajectories against each line; no decoding and no inference
+        trajectories = open_trajectories(file_name)
+        if trajectories is None:
+            raise FileNotFoundError(f"No stored trajectories for {file_name}")
+
+        start = time.perf_counter()
+        results = []
+        for line_start, line_end in lines:
+            pixel_start, pixel_end = line_start, line_end
+            if use_percentage:
+                # Same conversion as LineCrossingDetector
+                pixel_start = (line_start[0] * trajectories.width / 100, line_start[1] * trajectories.height / 100)
+                pixel_end = (line_end[0] * trajectories.width / 100, line_end[1] * trajectories.height / 100)
+
+            total_entry, total_exit = count_line_crossings(
+                trajectories.track_keys, trajectories.centers, pixel_start, pixel_end,
+                trajectories.frames, trajectories.counted_from
+            )
+            results.append({
+                "line_start": line_start,
+                "line_end": line_end,
+                "total_entry": total_entry,
+                "total_exit": total_exit,
+                "net_count": total_entry - total_exit
+            })
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        logger.info(f"Recounted {file_name} for {len(lines)} lines over {len(trajectories)} track points "
+                    f"in {elapsed_ms:.1f}ms")
+        return {
+            "file_name": file_name,
+            "tracks": trajectories.tracks,
+            "results": results,
+            "elapsed_ms": round(elapsed_ms, 3)
+        }
+
+    def _estimate_time_saved(self, frames: int, width: int, height: int) -> float:
+        saved = _render_cost.estimate(frames, width, height)
+        logger.info(f"Counts-only run skipped rendering {frames} frames, ~{saved:.2f}s saved")
+        return round(saved, 3)
+
+    def _create_detection_store(self, output_filename: str, keep_detections: bool = True) -> Optional[DetectionStoreWriter]:
+        return DetectionStoreWriter(output_filename, keep_detections) if settings.enable_detection_store else None
+
+    def _create_overlay_metadata(
+        self,
+        output_filename: str,
+        width: int,
+        height: int,
+        fps: int,
+        enable_counting: bool
+    ) -> OverlayMetadataWriter:
+        line = None
+        if enable_counting:
+            # Same pixel line as LineCrossingDetector, so the client draws it where crossings are counted
+            (start_x, start_y), (end_x, end_y) = settings.entry_line_start, settings.entry_line_end
+            line = (
+                (int(start_x * width / 100), int(start_y * height / 100)),
+                (int(end_x * width / 100), int(end_y * height / 100))
+            )
+        return OverlayMetadataWriter(output_filename, width, height, fps, line, getattr(self.detector, "class_names", None))
+
+    def _finish_overlay(
+        self,
+        metadata: Optional[OverlayMetadataWriter],
+        temp_input_path: Path,
+        output_path: Path,
+        summary: dict
+    ) -> Path:
+        # Overlay runs publish the upload itself as the output video (no decode/encode); returns where the source is
+        if metadata is None:
+            return temp_input_path
+        metadata.close(summary["frames_processed"], summary["total_entry"], summary["total_exit"])
+        shutil.move(str(temp_input_path), str(output_path))
+        return output_path
+
+    def _metadata_url(self, output_filename: str) -> str:
+        return get_output_url(overlay_metadata_path(output_filename).name, "video")
+
+    def _chunk_count(self, total_frames: int) -> int:
+        workers = settings.video_chunk_workers or os.cpu_count() or 1
+        return max(1, min(workers, total_frames // max(1, settings.video_chunk_min_frames)))
+
+    def _process_frames(
+        self,
+        cap: cv2.VideoCapture,
+        output_path: Path,
+        fps: int,
+        width: int,
+        height: int,
+        enable_counting: bool,
+        camera_id: str,
+        adaptive_skip: bool,
+        render: bool = True,
+        detection_store: Optional[DetectionStoreWriter] = None,
+        metadata: Optional[OverlayMetadataWriter] = None
+    ) -> dict:
+        analyzer = FrameAnalyzer(
+            self.detector, width, height, enable_counting, camera_id, track_objects=adaptive_skip, render=render,
+            detection_store=detection_store, metadata=metadata
+        )
+        roi = build_roi(width, height, settings.roi_mode, settings.roi_band_margin, settings.roi_polygon)
+
+        # Adaptive skipping: stride grows while the scene is empty and drops to 1 near the line
+        stride_controller = AdaptiveStride(
+            max_stride=settings.frame_skip,
+            line_detector=analyzer.line_detector,
+            near_line_margin=settings.adaptive_near_line_margin
+        ) if adaptive_skip else None
+
+        # Create video writer (counts-only runs write nothing)
+        out = TimedVideoWriter(output_path, fps, (width, height)) if render else None
+
+        try:
+            def emit(annotated_frame: np.ndarray):
+                if out:
+                    out.write(annotated_frame)
+
+            frame_count = 0
+            frames_analyzed = 0
+
+            if stride_controller is None and settings.enable_video_pipeline:
+                def write_frame(frame: np.ndarray, detection_result: DetectionResult, frame_number: int):
+                    emit(analyzer.process(frame, detection_result, frame_number))
+
+                # Decode, inference and annotate/encode overlap on separate threads
+                frame_count = frames_analyzed = self._create_pipeline(roi).run(cap, write_frame)
+            else:
+                while True:
+                    stride = stride_controller.stride if stride_controller else 1
+
+                    if stride > 1:
+                        # Skipped frames are only converted to BGR when the annotated output needs them
+                        skipped_frames = read_skipped_frames(cap, stride - 1, retrieve=render)
+                        ret, keyframe = cap.read()
+                        previous_tracks = analyzer.last_tracks
+                        counts = analyzer.get_counts()
+
+                        if not ret:
+                            # Video ended inside the window: hold the last analysed boxes
+                            if out:
+                                for frame in skipped_frames:
+                                    out.write(analyzer.render_interpolated(frame, previous_tracks, previous_tracks, 0.0, counts))
+                            frame_count += len(skipped_frames)
+                            break
+
+                        detection_result = detect_frames(self.detector, [keyframe], settings.detection_scale_factor, roi=roi)[0]
+                        keyframe_number = frame_count + len(skipped_frames) + 1
+                        annotated_keyframe = analyzer.process(keyframe, detection_result, keyframe_number)
+
+                        if out:
+                            for offset, frame in enumerate(skipped_frames, start=1):
+                                alpha = offset / (len(skipped_frames) + 1)
+                                out.write(analyzer.render_interpolated(frame, previous_tracks, analyzer.last_tracks, alpha, counts))
+                        emit(annotated_keyframe)
+
+                        frame_count = keyframe_number
+                        frames_analyzed += 1
+                        stride_controller.update(detection_result.boxes)
+                        continue
+
+                    frames = read_frame_batch(cap, settings.inference_batch_size)
+                    if not frames:
+                        break
+
+                    # Run detection on the whole batch in one forward pass (downscaled, boxes mapped back)
+                    detection_results = detect_frames(self.detector, frames, settings.detection_scale_factor, roi=roi)
+
+                    for frame, detection_result in zip(frames, detection_results):
+                        frame_count += 1  # ✅ increment frame counter
+                        emit(analyzer.process(frame, detection_result, frame_count))
+
+                    frames_analyzed += len(frames)
+                    if stride_controller:
+                        stride_controller.update(detection_results[-1].boxes)
+
+            if out:
+                out.release()
+        finally:
+            cap.release()
+            if out:
+                # Only still running when the loop raised; must be stopped before the output is deleted
+                out.abort()
+
+        if out:
+            _render_cost.record(analyzer.render_seconds + out.seconds, out.frames_written, width, height)
+
+        return {
+            "rickshaw_count": analyzer.max_rickshaw_count,
+            "total_entry": analyzer.total_entry,
+            "total_exit": analyzer.total_exit,
+            "frames_processed": frame_count,
+            "frames_analyzed": frames_analyzed,
+            "events": analyzer.events
+        }
+
+    def _create_pipeline(self, roi: Optional[RegionOfInterest]) -> VideoPipeline:
+        return VideoPipeline(
+            self.detector,
+            batch_size=settings.inference_batch_size,
+            scale_factor=settings.detection_scale_factor,
+            roi=roi,
+            queue_size=settings.video_pipeline_queue_size
+        )
+
     def process_video_with_live_preview(
         self,
         job_id: str,
         temp_input_path: Path,
         output_filename: str,
         enable_counting: bool = True,
-        camera_id: str = "default"
+        camera_id: str = "default",
+        output: str = "video"
     ):
         job_manager = get_job_manager()
         output_path = settings.videos_output_dir / output_filename
+        render = output == "video"
+        detection_store = None
+        metadata = None
 
         try:
             logger.info(f"[Job {job_id}] Starting background video processing")
@@ -175,105 +695,58 @@ class VideoService:
 
             job_manager.create_job(job_id, total_frames)
 
-            line_detector = None
-            tracker = None
-            if enable_counting:
-                line_detector = LineCrossingDetector(
-                    line_start=settings.entry_line_start,
-                    line_end=settings.entry_line_end,
-                    frame_width=width,
-                    frame_height=height,
-                    use_percentage=True
-                )
-                tracker = SimpleTracker()
+            detection_store = self._create_detection_store(output_filename)
+            if output == "overlay":
+                metadata = self._create_overlay_metadata(output_filename, width, height, fps, enable_counting)
+            analyzer = FrameAnalyzer(
+                self.detector, width, height, enable_counting, camera_id, render=render, detection_store=detection_store,
+                metadata=metadata
+            )
+            roi = build_roi(width, height, settings.roi_mode, settings.roi_band_margin, settings.roi_polygon)
 
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(str(output_path), fourcc, fps, (width, height))
+            out = TimedVideoWriter(output_path, fps, (width, height)) if render else None
 
-            max_rickshaw_count = 0
             frame_count = 0
-            total_entry = 0
-            total_exit = 0
-
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
 
-                # Check for stop signal
+            def apply_controls(capture: cv2.VideoCapture, position: int) -> Optional[int]:
+                # Stop / seek / pause are honoured between batches; returns the frame position or None to stop
                 job = job_manager.get_job(job_id)
                 if job and job.should_stop:
                     logger.info(f"[Job {job_id}] Stop signal received. Terminating processing.")
-                    break
-                
+                    return None
+
                 # Check for skip/seek command
-                if job and job.target_frame is not None and job.target_frame != frame_count:
+                if job and job.target_frame is not None and job.target_frame != position:
                     target = job.target_frame
-                    logger.info(f"[Job {job_id}] Seeking from frame {frame_count} to frame {target}")
-                    
+                    logger.info(f"[Job {job_id}] Seeking from frame {position} to frame {target}")
+
                     # Seek to target frame
-                    cap.set(cv2.CAP_PROP_POS_FRAMES, target)
-                    frame_count = target
-                    
+                    capture.set(cv2.CAP_PROP_POS_FRAMES, target)
+                    position = target
+
                     # Clear the skip command
                     job_manager.clear_skip(job_id)
-                    
-                    # Read the new frame
-                    ret, frame = cap.read()
-                    if not ret:
-                        break
-                
+
                 # Check for pause signal
-                while job and job.paused:
-                    import time
+                while job and job.paused and not (pipeline and pipeline.aborted):
                     time.sleep(0.5)  # Wait while paused
                     job = job_manager.get_job(job_id)
                     if job and job.should_stop:
                         logger.info(f"[Job {job_id}] Stop signal received while paused.")
                         break
+                if job and job.should_stop:
+                    return None
 
-                frame_count += 1  # ✅ increment frame counter
-
-                detection_result = self.detector.detect(frame)
-                frame_rickshaw_count = self.detector.count_rickshaws(detection_result)
-                max_rickshaw_count = max(max_rickshaw_count, frame_rickshaw_count)
-
-                annotated_frame = draw_detections(frame, detection_result, self.detector)
-
-                if enable_counting and line_detector and tracker and len(detection_result) > 0:
-                    tracked_objects = tracker.update(detection_result.boxes)
-                    for track_id, bbox in tracked_objects.items():
-                        event = line_detector.update(
-                            object_id=str(track_id),
-                            bbox=bbox,
-                            frame_number=frame_count
-                        )
-                        if event:
-                            bbox_json = json.dumps(bbox.tolist())
-                            confidence = detection_result.confidences[0] if len(detection_result.confidences) > 0 else 0.0
-                            log_rickshaw_event(
-                                event_type=event,
-                                confidence=float(confidence),
-                                camera_id=camera_id,
-                                rickshaw_id=str(track_id),
-                                frame_number=frame_count,
-                                bounding_box=bbox_json,
-                                crossing_line="entry_line"
-                            )
-
-                # Always draw line and counts when counting is enabled
-                if enable_counting and line_detector:
-                    entry_count, exit_count, net_count = line_detector.get_counts()
-                    total_entry = entry_count
-                    total_exit = exit_count
+                return position
 
-                    line_start, line_end = line_detector.get_line_pixels()
-                    annotated_frame = draw_entry_exit_line(annotated_frame, line_start, line_end, label="Counting Line")
-                    annotated_frame = draw_entry_exit_counts(annotated_frame, entry_count, exit_count, net_count)
-                else:
-                    annotated_frame = draw_count_overlay(annotated_frame, frame_rickshaw_count)
+            def write_frame(frame: np.ndarray, detection_result: DetectionResult, frame_number: int):
+                nonlocal frame_count
+                frame_count = frame_number
 
-                out.write(annotated_frame)
+                # Counts-only jobs preview the raw frames
+                annotated_frame = analyzer.process(frame, detection_result, frame_count)
+                if out:
+                    out.write(annotated_frame)
 
                 # Update progress and frame to JobManager
                 if frame_count % 10 == 0 or frame_count == total_frames:
@@ -284,41 +757,96 @@ class VideoService:
                 # Optional live preview throttling - update_frame also updates progress
                 # Always update first frame to start stream immediately
                 if settings.preview_update_interval and (frame_count == 1 or frame_count % settings.preview_update_interval == 0):
-                    job_manager.update_frame(job_id, annotated_frame, frame_count, total_entry, total_exit)
+                    job_manager.update_frame(job_id, annotated_frame, frame_count, analyzer.total_entry, analyzer.total_exit)
 
-            cap.release()
-            out.release()
+            pipeline = self._create_pipeline(roi) if settings.enable_video_pipeline else None
+            try:
+                if pipeline:
+                    # Decode, inference and annotate/encode overlap on separate threads
+                    pipeline.run(cap, write_frame, apply_controls)
+                else:
+                    while True:
+                        position = apply_controls(cap, frame_count)
+                        if position is None:
+                            break
+                        frame_count = position
 
-            if temp_input_path.exists():
-                temp_input_path.unlink()
+                        # Controls are honoured between batches, so keep batches small enough to stay responsive
+                        frames = read_frame_batch(cap, settings.inference_batch_size)
+                        if not frames:
+                            break
+
+                        detection_results = detect_frames(self.detector, frames, settings.detection_scale_factor, roi=roi)
+
+                        for offset, (frame, detection_result) in enumerate(zip(frames, detection_results), start=1):
+                            write_frame(frame, detection_result, position + offset)
+
+                if out:
+                    out.release()
+            finally:
+                cap.release()
+                if out:
+                    # Only still running when processing raised; must be stopped before the output is deleted
+                    out.abort()
+
+            if out:
+                _render_cost.record(analyzer.render_seconds + out.seconds, out.frames_written, width, height)
 
             # Check if stopped early
             job = job_manager.get_job(job_id)
-            if job and job.should_stop:
+            stopped = job and job.should_stop
+            source_path = temp_input_path
+            if metadata:
+                if stopped:
+                    metadata.discard()
+                else:
+                    source_path = self._finish_overlay(metadata, temp_input_path, output_path, {
+                        "frames_processed": frame_count,
+                        "total_entry": analyzer.total_entry,
+                        "total_exit": analyzer.total_exit
+                    })
+            if detection_store:
+                if stopped:
+                    detection_store.discard()
+                else:
+                    detection_store.close(source_path, width, height, fps, frame_count, move_source=metadata is None)
+
+            if temp_input_path.exists():
+                temp_input_path.unlink()
+
+            if stopped:
                 logger.info(f"[Job {job_id}] Processing stopped by user")
                 # Clean up output file if stopped
                 if output_path.exists():
                     output_path.unlink()
                 return
 
+            max_rickshaw_count = analyzer.max_rickshaw_count
+            total_entry = analyzer.total_entry
+            total_exit = analyzer.total_exit
+
             insert_detection(
                 file_type="video",
                 file_name=output_filename,
                 rickshaw_count=max_rickshaw_count
             )
 
-            output_url = get_output_url(output_filename, "video")
-
             result = {
                 "file_name": output_filename,
                 "rickshaw_count": max_rickshaw_count,
                 "total_entry": total_entry,
                 "total_exit": total_exit,
                 "net_count": total_entry - total_exit,
-                "output_url": output_url,
+                "output_url": get_output_url(output_filename, "video") if output != "none" else None,
+                "metadata_url": self._metadata_url(output_filename) if metadata else None,
+                "output": output,
                 "frames_processed": frame_count
             }
 
+            if not render:
+                result["events"] = analyzer.events
+                result["render_time_saved_seconds"] = self._estimate_time_saved(frame_count, width, height)
+
             job_manager.mark_completed(job_id, result)
             logger.info(f"[Job {job_id}] Marked as completed")
 
@@ -327,6 +855,10 @@ class VideoService:
             logger.error(f"[Job {job_id}] {error_msg}", exc_info=True)
             job_manager.mark_failed(job_id, error_msg)
 
+            if detection_store:
+                detection_store.discard()
+            if metadata:
+                metadata.discard()
             if temp_input_path.exists():
                 temp_input_path.unlink()
             if output_path.exists():
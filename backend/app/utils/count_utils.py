@@ -3,6 +3,11 @@ from typing import Tuple, Dict, List, Optional
 from collections import defaultdict
 from app.core.config import settings, logger
 
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # scipy comes with ultralytics; without it the tracker matches greedily
+    linear_sum_assignment = None
+
 
 class Point:
     def __init__(self, x: float, y: float):
@@ -148,81 +153,209 @@ class LineCrossingDetector:
         logger.info("Line crossing counts reset")
 
 
+def count_line_crossings(
+    track_keys: np.ndarray,
+    centers: np.ndarray,
+    line_start: Tuple[float, float],
+    line_end: Tuple[float, float],
+    frames: Optional[np.ndarray] = None,
+    counted_from: Optional[np.ndarray] = None
+) -> Tuple[int, int]:
+    # Replays LineCrossingDetector over whole trajectories at once. Rows must be grouped by track and in
+    # update order within a track; line points are in pixels. A row only counts when its frame is at or
+    # after counted_from (per row), mirroring chunk warm-up where the crossing is consumed but not counted.
+    if len(centers) < 2:
+        return 0, 0
+
+    previous, current = centers[:-1], centers[1:]
+    same_track = track_keys[1:] == track_keys[:-1]
+    sx, sy = line_start
+    ex, ey = line_end
+
+    def ccw(ax, ay, bx, by, cx, cy):
+        return (cy - ay) * (bx - ax) - (by - ay) * (cx - ax)
+
+    px, py = previous[:, 0], previous[:, 1]
+    qx, qy = current[:, 0], current[:, 1]
+    # Same comparisons as LineCrossingDetector._intersects, on the raw ccw values
+    intersects = (
+        (ccw(px, py, sx, sy, ex, ey) != ccw(qx, qy, sx, sy, ex, ey))
+        & (ccw(px, py, qx, qy, sx, sy) != ccw(px, py, qx, qy, ex, ey))
+    )
+
+    def side(x, y):
+        value = (ex - sx) * (y - sy) - (ey - sy) * (x - sx)
+        return (value > settings.crossing_threshold).astype(np.int8) - (value < -settings.crossing_threshold).astype(np.int8)
+
+    previous_side = side(px, py)
+    current_side = side(qx, qy)
+    crossings = np.flatnonzero(same_track & intersects & (previous_side != current_side))
+    if len(crossings) == 0:
+        return 0, 0
+
+    # Each track is counted once: only its first crossing matters
+    _, first = np.unique(track_keys[crossings + 1], return_index=True)
+    crossings = crossings[first]
+    if counted_from is not None and frames is not None:
+        crossings = crossings[frames[crossings + 1] >= counted_from[crossings + 1]]
+
+    entries = int((previous_side[crossings] < current_side[crossings]).sum())
+    return entries, len(crossings) - entries
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    # Pairwise IoU of (N, 4) and (M, 4) x1y1x2y2 boxes, as an (N, M) matrix
+    boxes_a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    # Width and height as separate 2-D arrays: much faster than reducing an (N, M, 2) array
+    width = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2]) - np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    height = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3]) - np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    intersection = np.maximum(width, 0, out=width) * np.maximum(height, 0, out=height)
+
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+def _greedy_assignment(rows: np.ndarray, cols: np.ndarray, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Highest IoU first; each row and column is used at most once (ties go to the earlier detection/track)
+    order = np.argsort(-scores, kind="stable")
+    used_rows, used_cols = set(), set()
+    matched_rows, matched_cols = [], []
+    for row, col in zip(rows[order].tolist(), cols[order].tolist()):
+        if row in used_rows or col in used_cols:
+            continue
+        used_rows.add(row)
+        used_cols.add(col)
+        matched_rows.append(row)
+        matched_cols.append(col)
+    return np.array(matched_rows, dtype=int), np.array(matched_cols, dtype=int)
+
+
+def match_boxes(iou: np.ndarray, iou_threshold: float, use_hungarian: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    # One-to-one matching of detections (rows) to tracks (columns) on an IoU matrix.
+    # Returns matched (row, column) index arrays; pairs below the threshold never match.
+    rows, cols = np.nonzero((iou >= iou_threshold) & (iou > 0))
+    row_candidates = np.bincount(rows, minlength=iou.shape[0])
+    col_candidates = np.bincount(cols, minlength=iou.shape[1])
+
+    # A detection and a track that only see each other need no solver; in practice that is most of a frame
+    unique = (row_candidates[rows] == 1) & (col_candidates[cols] == 1)
+    if unique.all():
+        return rows, cols
+    contested_rows, contested_cols = rows[~unique], cols[~unique]
+    scores = iou[contested_rows, contested_cols]
+
+    if use_hungarian and linear_sum_assignment is not None:
+        # Maximise total IoU over the contested rows/columns; zero-score pairs are only padding
+        row_index, sub_rows = np.unique(contested_rows, return_inverse=True)
+        col_index, sub_cols = np.unique(contested_cols, return_inverse=True)
+        dense = np.zeros((len(row_index), len(col_index)))
+        dense[sub_rows, sub_cols] = scores
+        solved_rows, solved_cols = linear_sum_assignment(dense, maximize=True)
+        keep = dense[solved_rows, solved_cols] > 0
+        matched_rows, matched_cols = row_index[solved_rows[keep]], col_index[solved_cols[keep]]
+    else:
+        matched_rows, matched_cols = _greedy_assignment(contested_rows, contested_cols, scores)
+
+    return (
+        np.concatenate((rows[unique], matched_rows)),
+        np.concatenate((cols[unique], matched_cols))
+    )
+
+
 class SimpleTracker:
-    def __init__(self, iou_threshold: float = 0.3, max_frames_to_skip: int = 10):
+    # IoU tracker: one IoU matrix per frame, optimal (Hungarian, with scipy) or greedy one-to-one assignment
+    def __init__(self, iou_threshold: float = 0.3, max_frames_to_skip: int = 10, use_hungarian: bool = True):
         self.iou_threshold = iou_threshold
         self.max_frames_to_skip = max_frames_to_skip
+        self.use_hungarian = use_hungarian
         self.next_id = 0
-        self.tracks: Dict[int, Dict] = {}  # track_id -> {bbox, frames_skipped}
-    
-    def _calculate_iou(self, box1: np.ndarray, box2: np.ndarray) -> float:
-        x1_1, y1_1, x2_1, y2_1 = box1
-        x1_2, y1_2, x2_2, y2_2 = box2
-        
-        # Calculate intersection area
-        x1_i = max(x1_1, x1_2)
-        y1_i = max(y1_1, y1_2)
-        x2_i = min(x2_1, x2_2)
-        y2_i = min(y2_1, y2_2)
-        
-        if x2_i < x1_i or y2_i < y1_i:
-            return 0.0
-        
-        intersection = (x2_i - x1_i) * (y2_i - y1_i)
-        
-        # Calculate union area
-        area1 = (x2_1 - x1_1) * (y2_1 - y1_1)
-        area2 = (x2_2 - x1_2) * (y2_2 - y1_2)
-        union = area1 + area2 - intersection
-        
-        return intersection / union if union > 0 else 0.0
-    
+        # Parallel arrays, one row per live track
+        self.track_ids = np.empty(0, dtype=int)
+        self.track_boxes = np.empty((0, 4), dtype=np.float64)
+        self.frames_skipped = np.empty(0, dtype=int)
+
     def update(self, detections: np.ndarray) -> Dict[int, np.ndarray]:
-        # Mark all tracks as not updated
-        for track_id in self.tracks:
-            self.tracks[track_id]['frames_skipped'] += 1
-        
-        # Match detections to existing tracks
-        matched_tracks = {}
-        unmatched_detections = []
-        
-        for detection in detections:
-            best_iou = 0
-            best_track_id = None
-            
-            # Find best matching track
-            for track_id, track_info in self.tracks.items():
-                iou = self._calculate_iou(detection, track_info['bbox'])
-                if iou > best_iou and iou >= self.iou_threshold:
-                    best_iou = iou
-                    best_track_id = track_id
-            
-            if best_track_id is not None:
-                # Update existing track
-                self.tracks[best_track_id]['bbox'] = detection
-                self.tracks[best_track_id]['frames_skipped'] = 0
-                matched_tracks[best_track_id] = detection
-            else:
-                # New detection
-                unmatched_detections.append(detection)
-        
-        # Create new tracks for unmatched detections
-        for detection in unmatched_detections:
-            track_id = self.next_id
-            self.next_id += 1
-            self.tracks[track_id] = {
-                'bbox': detection,
-                'frames_skipped': 0
-            }
-            matched_tracks[track_id] = detection
-        
+        # Returns track_id -> detection row (the rows themselves, not copies)
+        detections = np.asarray(detections)
+        num_detections = len(detections)
+        self.frames_skipped += 1
+
+        detection_rows, track_columns = match_boxes(
+            iou_matrix(detections, self.track_boxes), self.iou_threshold, self.use_hungarian
+        )
+        self.track_boxes[track_columns] = detections[detection_rows]
+        self.frames_skipped[track_columns] = 0
+
+        # Matched detections keep detection order, then new tracks for the rest
+        rows = list(detections)
+        assigned = np.full(num_detections, -1, dtype=int)
+        assigned[detection_rows] = self.track_ids[track_columns]
+        matched = np.flatnonzero(assigned >= 0)
+        matched_tracks = {track_id: rows[i] for track_id, i in zip(assigned[matched].tolist(), matched.tolist())}
+
+        unmatched = np.flatnonzero(assigned < 0)
+        if len(unmatched):
+            new_ids = np.arange(self.next_id, self.next_id + len(unmatched))
+            self.next_id += len(unmatched)
+            self.track_ids = np.concatenate((self.track_ids, new_ids))
+            self.track_boxes = np.concatenate((self.track_boxes, detections[unmatched].reshape(-1, 4)))
+            self.frames_skipped = np.concatenate((self.frames_skipped, np.zeros(len(unmatched), dtype=int)))
+            for track_id, i in zip(new_ids.tolist(), unmatched.tolist()):
+                matched_tracks[track_id] = rows[i]
+
         # Remove tracks that have been missing for too long
-        tracks_to_remove = [
-            track_id for track_id, track_info in self.tracks.items()
-            if track_info['frames_skipped'] > self.max_frames_to_skip
-        ]
+        alive = self.frames_skipped <= self.max_frames_to_skip
+        if not alive.all():
+            self.track_ids = self.track_ids[alive]
+            self.track_boxes = self.track_boxes[alive]
+            self.frames_skipped = self.frames_skipped[alive]
+
+        return matched_tracks
+
+
+class AdaptiveStride:
+    def __init__(
+        self,
+        max_stride: int,
+        line_detector: Optional[LineCrossingDetector] = None,
+        near_line_margin: float = 20.0,
+        busy_stride: int = 2
+    ):
+        self.max_stride = max(1, max_stride)
+        self.busy_stride = max(1, min(busy_stride, self.max_stride))
+        self.line_detector = line_detector
+        self.stride = 1
         
-        for track_id in tracks_to_remove:
-            del self.tracks[track_id]
+        # Margin is a percentage of the larger frame dimension, like the line coordinates
+        self.near_line_margin = 0.0
+        if line_detector:
+            self.near_line_margin = near_line_margin * max(line_detector.frame_width, line_detector.frame_height) / 100
+    
+    def _near_line(self, boxes: np.ndarray) -> bool:
+        if self.line_detector is None or len(boxes) == 0:
+            return False
         
-        return matched_tracks
+        # Distance from every box center to the line segment, in one pass
+        centers = np.column_stack(((boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2))
+        start = np.array([self.line_detector.line_start.x, self.line_detector.line_start.y])
+        end = np.array([self.line_detector.line_end.x, self.line_detector.line_end.y])
+        segment = end - start
+        length_sq = float(segment @ segment)
+        t = np.clip((centers - start) @ segment / length_sq, 0.0, 1.0) if length_sq > 0 else np.zeros(len(centers))
+        distances = np.linalg.norm(centers - (start + t[:, np.newaxis] * segment), axis=1)
+        return bool((distances < self.near_line_margin).any())
+    
+    def update(self, boxes: np.ndarray) -> int:
+        if self._near_line(boxes):
+            # Analyse every frame around the line so crossings are seen by the same track
+            self.stride = 1
+        elif len(boxes) > 0:
+            # Keep steps small enough for IoU matching to hold the track IDs
+            self.stride = self.busy_stride
+        else:
+            # Empty scene: back off exponentially
+            self.stride = min(self.stride * 2, self.max_stride)
+        return self.stride
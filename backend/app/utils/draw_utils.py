@@ -1,6 +1,7 @@
 import cv2
 import numpy as np
-from typing import Tuple
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
 from app.model.detector import DetectionResult, YOLODetector
 
 
@@ -19,21 +20,160 @@ LINE_COLOR_ENTRY = (0, 255, 0)   # Green for entry line
 LINE_COLOR_EXIT = (0, 0, 255)     # Red for exit line
 LINE_COLOR_DEFAULT = (255, 255, 0) # Yellow for default line
 
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+@lru_cache(maxsize=4096)
+def get_text_size(text: str, font_scale: float, thickness: int) -> Tuple[Tuple[int, int], int]:
+    # Labels repeat every frame ("rickshaw: 0.87", "Entry: 12"), so their metrics are measured once
+    return cv2.getTextSize(text, FONT, font_scale, thickness)
+
+
+@lru_cache(maxsize=512)  # Count panels grow with the counts; bounded at a few tens of MB
+def _text_sprite(
+    text: str,
+    font_scale: float,
+    thickness: int,
+    color: Tuple[int, int, int],
+    background: Tuple[int, int, int],
+    box: Tuple[int, int, int, int]
+) -> Tuple[np.ndarray, np.ndarray, int, int]:
+    # Background box + text rendered once into a small patch, with a mask of the pixels they cover.
+    # box is relative to the text origin; the patch is placed at origin + (offset_x, offset_y).
+    (text_width, text_height), baseline = get_text_size(text, font_scale, thickness)
+    margin = thickness + 2  # Glyph strokes reach a little past the measured text box
+    offset_x = min(box[0], -margin)
+    offset_y = min(box[1], -text_height - margin)
+    right = max(box[2], text_width + margin)
+    bottom = max(box[3], baseline + margin)
+
+    pixels = np.zeros((bottom - offset_y + 1, right - offset_x + 1, 3), dtype=np.uint8)
+    mask = np.zeros(pixels.shape[:2], dtype=np.uint8)
+    for canvas, fill, ink in ((pixels, background, color), (mask, 255, 255)):
+        cv2.rectangle(canvas, (box[0] - offset_x, box[1] - offset_y), (box[2] - offset_x, box[3] - offset_y), fill, -1)
+        cv2.putText(canvas, text, (-offset_x, -offset_y), FONT, font_scale, ink, thickness)
+
+    pixels.setflags(write=False)
+    mask.setflags(write=False)
+    return pixels, mask, offset_x, offset_y
+
+
+def _blit(image: np.ndarray, sprite: Tuple[np.ndarray, np.ndarray, int, int], x: int, y: int):
+    # Masked copy of a sprite with its text origin at (x, y), clipped to the image like cv2 drawing is
+    pixels, mask, offset_x, offset_y = sprite
+    left, top = x + offset_x, y + offset_y
+    x0, y0 = max(left, 0), max(top, 0)
+    x1 = min(left + pixels.shape[1], image.shape[1])
+    y1 = min(top + pixels.shape[0], image.shape[0])
+    if x0 >= x1 or y0 >= y1:
+        return
+    # cv2.copyTo writes through the slice view; much cheaper than re-rasterising the glyphs
+    cv2.copyTo(
+        pixels[y0 - top:y1 - top, x0 - left:x1 - left],
+        mask[y0 - top:y1 - top, x0 - left:x1 - left],
+        image[y0:y1, x0:x1]
+    )
+
+
+# Per-call overhead of a masked copy expressed in copied pixels (~5 us vs ~0.05 ns per pixel),
+# used to decide how finely an overlay is split into tiles
+_TILE_COST_PIXELS = 110_000
+
+
+class OverlayLayer:
+    # Pre-rendered drawing kept as a few (x, y, pixels, mask) tiles; applying it is one masked copy per tile
+    def __init__(self, tiles: List[Tuple[int, int, np.ndarray, np.ndarray]]):
+        self.tiles = tiles
+
+    @classmethod
+    def from_drawing(cls, draw: Callable[[np.ndarray], None], width: int, height: int) -> "OverlayLayer":
+        # Drawn once on black and once on white: a pixel belongs to the layer if either canvas changed
+        dark = np.zeros((height, width, 3), dtype=np.uint8)
+        light = np.full((height, width, 3), 255, dtype=np.uint8)
+        draw(dark)
+        draw(light)
+        mask = ((dark != 0) | (light != 255)).any(axis=2)
+        return cls(_split_tiles(dark, mask))
+
+    @classmethod
+    def from_sprites(cls, placed: List[Tuple[Tuple[np.ndarray, np.ndarray, int, int], int, int]]) -> "OverlayLayer":
+        # Several text sprites (each at its text origin) merged into one tile, later sprites on top
+        if not placed:
+            return cls([])
+        left = min(x + sprite[2] for sprite, x, _ in placed)
+        top = min(y + sprite[3] for sprite, _, y in placed)
+        right = max(x + sprite[2] + sprite[0].shape[1] for sprite, x, _ in placed)
+        bottom = max(y + sprite[3] + sprite[0].shape[0] for sprite, _, y in placed)
+
+        pixels = np.zeros((bottom - top, right - left, 3), dtype=np.uint8)
+        mask = np.zeros(pixels.shape[:2], dtype=np.uint8)
+        for (sprite_pixels, sprite_mask, offset_x, offset_y), x, y in placed:
+            _blit(pixels, (sprite_pixels, sprite_mask, offset_x, offset_y), x - left, y - top)
+            _blit(mask, (sprite_mask, sprite_mask, offset_x, offset_y), x - left, y - top)
+        return cls([(left, top, pixels, mask)])
+
+    def apply(self, image: np.ndarray):
+        for x, y, pixels, mask in self.tiles:
+            _blit(image, (pixels, mask, 0, 0), x, y)
+
+
+def _split_tiles(pixels: np.ndarray, mask: np.ndarray) -> List[Tuple[int, int, np.ndarray, np.ndarray]]:
+    # Crop the layer to horizontal bands so a diagonal line does not copy its whole bounding box;
+    # the band height with the lowest estimated copy cost wins (one band for a horizontal line)
+    rows = np.flatnonzero(mask.any(axis=1))
+    if len(rows) == 0:
+        return []
+
+    best_bounds, best_cost = [], None
+    for band_height in (32, 64, 128, 256, 512, len(mask)):
+        bounds = []
+        for band_top in range(rows[0], rows[-1] + 1, band_height):
+            band = mask[band_top:band_top + band_height]
+            band_rows = np.flatnonzero(band.any(axis=1))
+            if len(band_rows) == 0:
+                continue
+            band_cols = np.flatnonzero(band.any(axis=0))
+            bounds.append((band_top + band_rows[0], band_top + band_rows[-1] + 1, band_cols[0], band_cols[-1] + 1))
+        cost = sum((y1 - y0) * (x1 - x0) + _TILE_COST_PIXELS for y0, y1, x0, x1 in bounds)
+        if best_cost is None or cost < best_cost:
+            best_bounds, best_cost = bounds, cost
+
+    return [
+        (int(x0), int(y0), pixels[y0:y1, x0:x1].copy(), mask[y0:y1, x0:x1].astype(np.uint8))
+        for y0, y1, x0, x1 in best_bounds
+    ]
+
+
+def draw_text_box(
+    image: np.ndarray,
+    text: str,
+    origin: Tuple[int, int],
+    box: Tuple[int, int, int, int],
+    color: Tuple[int, int, int],
+    background: Tuple[int, int, int] = (0, 0, 0),
+    font_scale: float = 0.6,
+    thickness: int = 2
+):
+    # Filled box + text in place; box is (left, top, right, bottom) relative to the text origin
+    _blit(image, _text_sprite(text, font_scale, thickness, color, background, box), int(origin[0]), int(origin[1]))
+
 
 def draw_detections(
     image: np.ndarray,
     detection_result: DetectionResult,
     detector: YOLODetector,
     thickness: int = 2,
-    font_scale: float = 0.6
+    font_scale: float = 0.6,
+    inplace: bool = False
 ) -> np.ndarray:
-    # Create a copy to avoid modifying original
-    output_image = image.copy()
+    # Copy unless the caller owns the frame and allows drawing on it
+    output_image = image if inplace else image.copy()
+    boxes = detection_result.boxes.astype(int)
     
     # Draw each detection
     for i in range(len(detection_result)):
         # Get box coordinates
-        x1, y1, x2, y2 = detection_result.boxes[i].astype(int)
+        x1, y1, x2, y2 = (int(value) for value in boxes[i])
         
         # Get confidence and class ID
         confidence = detection_result.confidences[i]
@@ -50,27 +190,17 @@ def draw_detections(
         label = f"{class_name}: {confidence:.2f}"
         
         # Calculate label size
-        (label_width, label_height), baseline = cv2.getTextSize(
-            label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness
-        )
+        (label_width, label_height), baseline = get_text_size(label, font_scale, thickness)
         
-        # Draw label background
-        cv2.rectangle(
-            output_image,
-            (x1, y1 - label_height - baseline - 10),
-            (x1 + label_width, y1),
-            color,
-            -1  # Filled rectangle
-        )
-        
-        # Draw label text
-        cv2.putText(
+        # White label text on a filled box sitting on top of the bounding box
+        draw_text_box(
             output_image,
             label,
             (x1, y1 - baseline - 5),
-            cv2.FONT_HERSHEY_SIMPLEX,
+            (0, -label_height - 5, label_width, baseline + 5),
+            (255, 255, 255),
+            color,
             font_scale,
-            (255, 255, 255),  # White text
             thickness
         )
     
@@ -82,36 +212,27 @@ def draw_count_overlay(
     count: int,
     position: tuple = (10, 40),
     font_scale: float = 1.2,
-    thickness: int = 3
+    thickness: int = 3,
+    inplace: bool = False
 ) -> np.ndarray:
-    output_image = image.copy()
+    output_image = image if inplace else image.copy()
     
     # Create text
     text = f"Rickshaws: {count}"
     
     # Calculate text size
-    (text_width, text_height), baseline = cv2.getTextSize(
-        text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness
-    )
+    (text_width, text_height), baseline = get_text_size(text, font_scale, thickness)
     
-    # Draw background rectangle
+    # Green text on a black background
     padding = 10
-    cv2.rectangle(
-        output_image,
-        (position[0] - padding, position[1] - text_height - padding),
-        (position[0] + text_width + padding, position[1] + baseline + padding),
-        (0, 0, 0),  # Black background
-        -1
-    )
-    
-    # Draw text
-    cv2.putText(
+    draw_text_box(
         output_image,
         text,
         position,
-        cv2.FONT_HERSHEY_SIMPLEX,
+        (-padding, -text_height - padding, text_width + padding, baseline + padding),
+        (0, 255, 0),
+        (0, 0, 0),
         font_scale,
-        (0, 255, 0),  # Green text
         thickness
     )
     
@@ -124,9 +245,10 @@ def draw_entry_exit_line(
     line_end: Tuple[int, int],
     color: Tuple[int, int, int] = LINE_COLOR_DEFAULT,
     thickness: int = 8,
-    label: str = "Counting Line"
+    label: str = "Counting Line",
+    inplace: bool = False
 ) -> np.ndarray:
-    output_image = image.copy()
+    output_image = image if inplace else image.copy()
     
     # Draw the main line
     cv2.line(output_image, line_start, line_end, color, thickness)
@@ -142,45 +264,23 @@ def draw_entry_exit_line(
     )
     
     # Calculate label size for background
-    (label_width, label_height), baseline = cv2.getTextSize(
-        label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2
-    )
-    
-    # Draw label background
-    cv2.rectangle(
-        output_image,
-        (label_pos[0] - 5, label_pos[1] - label_height - 5),
-        (label_pos[0] + label_width + 5, label_pos[1] + 5),
-        (0, 0, 0),
-        -1
-    )
+    (label_width, label_height), baseline = get_text_size(label, 0.6, 2)
     
-    # Draw label text
-    cv2.putText(
-        output_image,
-        label,
-        label_pos,
-        cv2.FONT_HERSHEY_SIMPLEX,
-        0.6,
-        color,
-        2
-    )
+    # Label in the line color on a black background
+    draw_text_box(output_image, label, label_pos, (-5, -label_height - 5, label_width + 5, 5), color)
     
     return output_image
 
 
-def draw_entry_exit_counts(
-    image: np.ndarray,
+def _count_panel_sprites(
     entry_count: int,
     exit_count: int,
     net_count: int,
     position: Tuple[int, int] = (10, 40),
     font_scale: float = 1.5,
     thickness: int = 3
-) -> np.ndarray:
-    output_image = image.copy()
-    
-    # Create text lines
+) -> List[Tuple[Tuple[np.ndarray, np.ndarray, int, int], int, int]]:
+    # Entry/exit/net rows as (sprite, x, y) at their text origins
     texts = [
         f"Entry: {entry_count}",
         f"Exit: {exit_count}",
@@ -193,37 +293,37 @@ def draw_entry_exit_counts(
         (255, 255, 255)  # White for net
     ]
     
-    # Draw each line
+    placed = []
     y_offset = position[1]
+    padding = 8
     for text, color in zip(texts, colors):
-        # Calculate text size
-        (text_width, text_height), baseline = cv2.getTextSize(
-            text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness
-        )
+        (text_width, text_height), baseline = get_text_size(text, font_scale, thickness)
         
-        # Draw background
-        padding = 8
-        cv2.rectangle(
-            output_image,
-            (position[0] - padding, y_offset - text_height - padding),
-            (position[0] + text_width + padding, y_offset + baseline + padding),
-            (0, 0, 0),
-            -1
-        )
-        
-        # Draw text
-        cv2.putText(
-            output_image,
-            text,
-            (position[0], y_offset),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            font_scale,
-            color,
-            thickness
-        )
+        # Text on a black background
+        box = (-padding, -text_height - padding, text_width + padding, baseline + padding)
+        placed.append((_text_sprite(text, font_scale, thickness, color, (0, 0, 0), box), int(position[0]), int(y_offset)))
         
         y_offset += text_height + baseline + padding + 5
     
+    return placed
+
+
+def draw_entry_exit_counts(
+    image: np.ndarray,
+    entry_count: int,
+    exit_count: int,
+    net_count: int,
+    position: Tuple[int, int] = (10, 40),
+    font_scale: float = 1.5,
+    thickness: int = 3,
+    inplace: bool = False
+) -> np.ndarray:
+    output_image = image if inplace else image.copy()
+    
+    # Draw each line
+    for sprite, x, y in _count_panel_sprites(entry_count, exit_count, net_count, position, font_scale, thickness):
+        _blit(output_image, sprite, x, y)
+    
     return output_image
 
 
@@ -231,9 +331,10 @@ def draw_tracked_objects(
     image: np.ndarray,
     tracked_objects: dict,
     color: Tuple[int, int, int] = (255, 0, 255),
-    thickness: int = 2
+    thickness: int = 2,
+    inplace: bool = False
 ) -> np.ndarray:
-    output_image = image.copy()
+    output_image = image if inplace else image.copy()
     
     for track_id, bbox in tracked_objects.items():
         x1, y1, x2, y2 = bbox.astype(int)
@@ -254,3 +355,75 @@ def draw_tracked_objects(
         )
     
     return output_image
+
+
+class FrameAnnotator:
+    # Single-pass renderer for a stream of same-sized frames: boxes, labels, counting line and counts are
+    # drawn straight into the frame (inplace=True) or into one reused output buffer, never a copy per step.
+    # The line and its label are pre-rendered on the first drawn frame of each size (counts-only runs never
+    # build it); the count panel only when counts change.
+    def __init__(
+        self,
+        detector: YOLODetector,
+        line: Optional[Tuple[Tuple[int, int], Tuple[int, int]]] = None,
+        line_label: str = "Counting Line"
+    ):
+        self.detector = detector
+        self.line = line
+        self.line_label = line_label
+        self._buffer: Optional[np.ndarray] = None
+
+        self._line_layer: Optional[OverlayLayer] = None
+        self._line_layer_size: Optional[Tuple[int, int]] = None
+
+        self._panel: Optional[OverlayLayer] = None
+        self._panel_counts: Optional[Tuple[int, int, int]] = None
+
+    def _draw_line_directly(self, image: np.ndarray):
+        draw_entry_exit_line(image, self.line[0], self.line[1], label=self.line_label, inplace=True)
+
+    def draw_line(self, image: np.ndarray):
+        if not self.line:
+            return
+        height, width = image.shape[:2]
+        if self._line_layer_size != (width, height):
+            self._line_layer = OverlayLayer.from_drawing(self._draw_line_directly, width, height)
+            self._line_layer_size = (width, height)
+        self._line_layer.apply(image)
+
+    def draw_counts(self, image: np.ndarray, counts: Tuple[int, int, int]):
+        counts = tuple(int(count) for count in counts)
+        if counts != self._panel_counts:
+            self._panel = OverlayLayer.from_sprites(_count_panel_sprites(*counts))
+            self._panel_counts = counts
+        self._panel.apply(image)
+
+    def render(
+        self,
+        frame: np.ndarray,
+        detection_result: DetectionResult,
+        counts: Optional[Tuple[int, int, int]] = None,
+        rickshaw_count: Optional[int] = None,
+        inplace: bool = False
+    ) -> np.ndarray:
+        # Without inplace the result lives in the annotator's buffer and is overwritten by the next call
+        if inplace:
+            output_image = frame
+        else:
+            if self._buffer is None or self._buffer.shape != frame.shape:
+                self._buffer = np.empty_like(frame)
+            np.copyto(self._buffer, frame)
+            output_image = self._buffer
+
+        draw_detections(output_image, detection_result, self.detector, inplace=True)
+
+        # Line and entry/exit counts when counting, otherwise the per-frame rickshaw count
+        if self.line and counts is not None:
+            self.draw_line(output_image)
+            self.draw_counts(output_image, counts)
+        else:
+            if rickshaw_count is None:
+                rickshaw_count = self.detector.count_rickshaws(detection_result)
+            draw_count_overlay(output_image, rickshaw_count, inplace=True)
+
+        return output_image
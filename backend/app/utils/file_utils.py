@@ -1,5 +1,8 @@
+import io
 import uuid
+import zipfile
 from pathlib import Path
+from typing import List, Tuple
 from fastapi import UploadFile, HTTPException
 from app.core.config import settings
 
@@ -71,3 +74,28 @@ async def save_upload_file(file: UploadFile, destination_path: Path) -> None:
 
 def get_output_url(filename: str, file_type: str) -> str:
     return f"/outputs/{file_type}s/{filename}"
+
+
+def is_zip_file(filename: str) -> bool:
+    return Path(filename).suffix.lower() == ".zip"
+
+
+def extract_zip_entries(content: bytes, max_total_size: int) -> List[Tuple[str, bytes]]:
+    # Returns (name, bytes) for every regular file; directories and macOS metadata are skipped
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(content))
+    except zipfile.BadZipFile:
+        raise ValueError("Invalid zip archive")
+
+    with archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+        ]
+
+        # Guard against zip bombs before decompressing anything
+        total_size = sum(info.file_size for info in members)
+        if total_size > max_total_size:
+            raise ValueError(f"Zip archive expands to {total_size} bytes, limit is {max_total_size}")
+
+        return [(Path(info.filename).name, archive.read(info)) for info in members]
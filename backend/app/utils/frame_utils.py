@@ -0,0 +1,134 @@
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+from app.model.detector import DetectionResult, YOLODetector
+from app.core.config import settings, logger
+
+
+# YOLO input sizes must be a multiple of the model stride
+MODEL_STRIDE = 32
+
+# Region-of-interest modes
+ROI_FULL = "full"
+ROI_BAND = "band"
+ROI_POLYGON = "polygon"
+ROI_MODES = (ROI_FULL, ROI_BAND, ROI_POLYGON)
+
+
+class RegionOfInterest:
+    def __init__(self, x1: int, y1: int, x2: int, y2: int, polygon: Optional[np.ndarray] = None):
+        self.x1 = x1
+        self.y1 = y1
+        self.x2 = x2
+        self.y2 = y2
+        self.polygon = polygon  # Pixel vertices (N, 2); None for a plain rectangle
+
+    @property
+    def width(self) -> int:
+        return self.x2 - self.x1
+
+    @property
+    def height(self) -> int:
+        return self.y2 - self.y1
+
+    def crop(self, frame: np.ndarray) -> np.ndarray:
+        return frame[self.y1:self.y2, self.x1:self.x2]
+
+    def contains_centers(self, boxes: np.ndarray) -> np.ndarray:
+        if self.polygon is None or len(boxes) == 0:
+            return np.ones(len(boxes), dtype=bool)
+
+        # Vectorized even-odd ray casting of box centers against every polygon edge
+        center_x = ((boxes[:, 0] + boxes[:, 2]) / 2)[:, np.newaxis]
+        center_y = ((boxes[:, 1] + boxes[:, 3]) / 2)[:, np.newaxis]
+        x_a, y_a = self.polygon[:, 0], self.polygon[:, 1]
+        x_b, y_b = np.roll(x_a, -1), np.roll(y_a, -1)
+
+        straddles = (y_a > center_y) != (y_b > center_y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossing_x = x_a + (center_y - y_a) * (x_b - x_a) / (y_b - y_a)
+        crossings = straddles & (center_x < crossing_x)
+        return np.count_nonzero(crossings, axis=1) % 2 == 1
+
+
+def build_roi(
+    frame_width: int,
+    frame_height: int,
+    mode: str = ROI_FULL,
+    band_margin: float = 15.0,
+    polygon: Optional[Sequence[Tuple[float, float]]] = None,
+    line_start: Optional[Tuple[float, float]] = None,
+    line_end: Optional[Tuple[float, float]] = None
+) -> Optional[RegionOfInterest]:
+    # All coordinates are percentages of the frame, like entry_line_start/entry_line_end
+    if mode not in ROI_MODES:
+        raise ValueError(f"Invalid ROI mode: {mode}. Allowed modes: {', '.join(ROI_MODES)}")
+
+    if mode == ROI_FULL:
+        return None
+
+    if mode == ROI_BAND:
+        line_start = line_start or settings.entry_line_start
+        line_end = line_end or settings.entry_line_end
+        xs = (line_start[0], line_end[0])
+        ys = (line_start[1], line_end[1])
+        x1 = (min(xs) - band_margin) * frame_width / 100
+        x2 = (max(xs) + band_margin) * frame_width / 100
+        y1 = (min(ys) - band_margin) * frame_height / 100
+        y2 = (max(ys) + band_margin) * frame_height / 100
+        polygon_pixels = None
+    else:
+        if not polygon or len(polygon) < 3:
+            raise ValueError("ROI polygon needs at least 3 points")
+        polygon_pixels = np.array(
+            [(x * frame_width / 100, y * frame_height / 100) for x, y in polygon],
+            dtype=np.float32
+        )
+        x1, y1 = polygon_pixels.min(axis=0)
+        x2, y2 = polygon_pixels.max(axis=0)
+
+    x1 = int(np.clip(x1, 0, frame_width - 1))
+    y1 = int(np.clip(y1, 0, frame_height - 1))
+    x2 = int(np.clip(np.ceil(x2), x1 + 1, frame_width))
+    y2 = int(np.clip(np.ceil(y2), y1 + 1, frame_height))
+
+    roi = RegionOfInterest(x1, y1, x2, y2, polygon_pixels)
+    logger.info(f"ROI ({mode}): ({x1}, {y1}) -> ({x2}, {y2}), "
+                f"{frame_width * frame_height / (roi.width * roi.height):.1f}x fewer pixels per inference")
+    return roi
+
+
+def scaled_input_size(imgsz: int, scale_factor: float) -> int:
+    # Downscaling is done by the model's own letterbox: shrinking its input size is the only resize needed
+    if scale_factor <= 0 or scale_factor >= 1.0:
+        return imgsz
+    return max(MODEL_STRIDE, int(round(imgsz * scale_factor / MODEL_STRIDE)) * MODEL_STRIDE)
+
+
+def detect_frames(
+    detector: YOLODetector,
+    frames: List[np.ndarray],
+    scale_factor: float = 1.0,
+    imgsz: Optional[int] = None,
+    roi: Optional[RegionOfInterest] = None
+) -> List[DetectionResult]:
+    if not frames:
+        return []
+
+    # Crop to the ROI before inference, then shift boxes back so tracking and drawing use frame coordinates.
+    # Frames are not resized here: the model letterboxes them straight to its input size (and returns boxes
+    # in input coordinates), so a pre-resize would only add a second resize per frame
+    offset_x, offset_y = (roi.x1, roi.y1) if roi else (0, 0)
+    if roi:
+        frames = [np.ascontiguousarray(roi.crop(frame)) for frame in frames]
+
+    # An explicit imgsz (per camera) wins; otherwise the model input follows the scale factor
+    model_imgsz = imgsz or scaled_input_size(settings.yolo_imgsz, scale_factor)
+    detection_results = detector.detect_batch(frames, model_imgsz)
+
+    results = [result.rescaled(offset_x=offset_x, offset_y=offset_y) for result in detection_results]
+
+    if roi and roi.polygon is not None:
+        # Drop detections whose center falls outside the polygon but inside its bounding box
+        results = [result.filtered(roi.contains_centers(result.boxes)) for result in results]
+
+    return results
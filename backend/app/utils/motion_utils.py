@@ -0,0 +1,73 @@
+import cv2
+import numpy as np
+from typing import Optional
+
+
+class MotionGate:
+    def __init__(
+        self,
+        threshold: float = 0.002,
+        pixel_threshold: int = 25,
+        hold_frames: int = 15,
+        learning_rate: float = 0.05,
+        analysis_width: int = 160
+    ):
+        self.threshold = threshold  # Fraction of changed pixels that counts as motion
+        self.pixel_threshold = pixel_threshold  # Per-pixel grey-level difference that counts as changed
+        self.hold_frames = hold_frames  # Keep detecting this many frames after motion stops
+        self.learning_rate = learning_rate  # Background adaptation speed (lighting, shadows)
+        self.analysis_width = analysis_width
+
+        self.background: Optional[np.ndarray] = None
+        self.hold_remaining = 0
+        self.last_motion_ratio = 0.0
+
+        # Statistics
+        self.frames_checked = 0
+        self.frames_skipped = 0
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        # A tiny blurred grey frame is plenty to notice movement and costs well under a millisecond
+        height, width = frame.shape[:2]
+        if width > self.analysis_width:
+            new_height = max(1, int(height * self.analysis_width / width))
+            frame = cv2.resize(frame, (self.analysis_width, new_height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def should_detect(self, frame: np.ndarray) -> bool:
+        self.frames_checked += 1
+        gray = self._prepare(frame)
+
+        if self.background is None or self.background.shape != gray.shape:
+            # First frame (or resolution change after reconnect): no reference yet, so detect
+            self.background = gray.astype(np.float32)
+            self.hold_remaining = self.hold_frames
+            return True
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+        self.last_motion_ratio = float(np.count_nonzero(diff > self.pixel_threshold) / diff.size)
+        cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+
+        if self.last_motion_ratio >= self.threshold:
+            self.hold_remaining = self.hold_frames
+            return True
+
+        if self.hold_remaining > 0:
+            self.hold_remaining -= 1
+            return True
+
+        self.frames_skipped += 1
+        return False
+
+    def reset(self):
+        self.background = None
+        self.hold_remaining = 0
+
+    def get_stats(self) -> dict:
+        return {
+            "frames_checked": self.frames_checked,
+            "frames_skipped": self.frames_skipped,
+            "hit_rate": round(self.frames_skipped / self.frames_checked, 4) if self.frames_checked else 0.0,
+            "last_motion_ratio": round(self.last_motion_ratio, 5)
+        }
@@ -0,0 +1,136 @@
+import shutil
+import subprocess
+import tempfile
+import cv2
+import numpy as np
+from pathlib import Path
+from typing import Optional, Tuple
+from app.core.config import settings, logger
+
+
+VIDEO_WRITERS = ("auto", "ffmpeg", "opencv")
+
+
+def find_ffmpeg() -> Optional[str]:
+    return shutil.which(settings.ffmpeg_path)
+
+
+class OpenCVVideoWriter:
+    # mp4v through cv2.VideoWriter: always available, but large files that browsers cannot stream
+    def __init__(self, path: Path, fps: float, frame_size: Tuple[int, int]):
+        self.path = Path(path)
+        self._writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), fps, frame_size)
+        self._finished = False
+
+    def write(self, frame: np.ndarray):
+        self._writer.write(frame)
+
+    def release(self):
+        self._finished = True
+        self._writer.release()
+
+    def abort(self):
+        # Drop a partial video; a no-op after release(), so callers can always abort in a finally block
+        if not self._finished:
+            self._finished = True
+            self._writer.release()
+            self.path.unlink(missing_ok=True)
+
+
+class FFmpegVideoWriter:
+    # Raw BGR frames piped into an ffmpeg process encoding H.264 with the moov atom up front
+    def __init__(
+        self,
+        path: Path,
+        fps: float,
+        frame_size: Tuple[int, int],
+        ffmpeg: str = "ffmpeg",
+        preset: str = "veryfast",
+        crf: int = 23
+    ):
+        self.path = Path(path)
+        self.frame_size = frame_size
+        width, height = frame_size
+
+        command = [
+            ffmpeg, "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}",
+            "-r", str(fps if fps > 0 else 30), "-i", "-",
+            "-an",
+            # yuv420p needs even dimensions; pad odd sizes by one pixel
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            "-c:v", "libx264", "-preset", preset, "-crf", str(crf), "-pix_fmt", "yuv420p",
+            # moov atom first, so browsers can start playback while downloading
+            "-movflags", "+faststart",
+            str(path)
+        ]
+
+        # ffmpeg's stderr goes to a file so a chatty encoder can never block on a full pipe
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=self._stderr)
+        self._finished = False
+
+    def write(self, frame: np.ndarray):
+        if (frame.shape[1], frame.shape[0]) != self.frame_size:
+            frame = cv2.resize(frame, self.frame_size)
+        try:
+            self._process.stdin.write(np.ascontiguousarray(frame).tobytes())
+        except (BrokenPipeError, OSError):
+            self._process.wait()
+            raise RuntimeError(f"ffmpeg exited while writing {self.path.name}: {self._read_stderr()}")
+
+    def release(self):
+        if self._finished:
+            return
+        self._finished = True
+        self._close_stdin()
+        return_code = self._process.wait()
+        error_output = self._read_stderr()
+        self._stderr.close()
+        if return_code != 0:
+            self.path.unlink(missing_ok=True)
+            raise RuntimeError(f"ffmpeg failed for {self.path.name} (exit {return_code}): {error_output}")
+
+    def abort(self):
+        # Kill the encoder and wait for it, so it cannot finish (or rewrite, with +faststart) the file
+        # after the caller deleted it. A no-op after release()
+        if not self._finished:
+            self._finished = True
+            self._process.kill()
+            self._close_stdin()
+            self._process.wait()
+            self._stderr.close()
+            self.path.unlink(missing_ok=True)
+
+    def _close_stdin(self):
+        if self._process.stdin and not self._process.stdin.closed:
+            try:
+                self._process.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+
+    def _read_stderr(self) -> str:
+        self._stderr.seek(0)
+        return self._stderr.read().decode(errors="ignore").strip()
+
+
+def create_video_writer(
+    path: Path,
+    fps: float,
+    frame_size: Tuple[int, int],
+    backend: Optional[str] = None
+):
+    backend = backend or settings.video_writer
+    if backend not in VIDEO_WRITERS:
+        raise ValueError(f"Invalid video writer: {backend}. Allowed writers: {', '.join(VIDEO_WRITERS)}")
+
+    if backend in ("auto", "ffmpeg"):
+        ffmpeg = find_ffmpeg()
+        if ffmpeg:
+            # use_fast_codec trades file size for encoding speed
+            preset = "ultrafast" if settings.use_fast_codec else settings.ffmpeg_preset
+            return FFmpegVideoWriter(path, fps, frame_size, ffmpeg, preset, settings.ffmpeg_crf)
+        if backend == "ffmpeg":
+            logger.warning(f"ffmpeg not found ({settings.ffmpeg_path}); falling back to OpenCV mp4v writer")
+
+    return OpenCVVideoWriter(path, fps, frame_size)
@@ -0,0 +1,130 @@
+import argparse
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from typing import Callable, List
+from app.model.detector import DetectionResult
+from app.utils import draw_utils
+from app.utils.draw_utils import FrameAnnotator
+
+
+class StubDetector:
+    # Annotation only needs class names and counts, not a model
+    def get_class_name(self, class_id: int) -> str:
+        return "rickshaw"
+
+    def count_rickshaws(self, detection_result: DetectionResult) -> int:
+        return len(detection_result)
+
+
+def make_detections(num_frames: int, num_objects: int, width: int, height: int) -> List[DetectionResult]:
+    # Boxes drift a little between frames so confidences (and label text) vary like real output
+    rng = np.random.default_rng(0)
+    results = []
+    for _ in range(num_frames):
+        x1 = rng.uniform(0, width - 120, num_objects)
+        y1 = rng.uniform(40, height - 100, num_objects)
+        boxes = np.column_stack((x1, y1, x1 + rng.uniform(60, 120, num_objects), y1 + rng.uniform(50, 100, num_objects)))
+        results.append(DetectionResult(
+            boxes.astype(np.float32),
+            rng.uniform(0.3, 1.0, num_objects).astype(np.float32),
+            np.zeros(num_objects, dtype=int)
+        ))
+    return results
+
+
+def legacy_render(detector, line, frame, detection_result, counts):
+    # The renderer before FrameAnnotator: a full-frame copy per step, cv2.getTextSize + rectangle + putText per label
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    annotated = frame.copy()
+    for box, confidence in zip(detection_result.boxes.astype(int), detection_result.confidences):
+        x1, y1, x2, y2 = (int(value) for value in box)
+        label = f"{detector.get_class_name(0)}: {confidence:.2f}"
+        cv2.rectangle(annotated, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        (label_width, label_height), baseline = cv2.getTextSize(label, font, 0.6, 2)
+        cv2.rectangle(annotated, (x1, y1 - label_height - baseline - 10), (x1 + label_width, y1), (0, 255, 0), -1)
+        cv2.putText(annotated, label, (x1, y1 - baseline - 5), font, 0.6, (255, 255, 255), 2)
+
+    annotated = annotated.copy()
+    cv2.line(annotated, line[0], line[1], (255, 255, 0), 8)
+    cv2.circle(annotated, line[0], 5, (255, 255, 0), -1)
+    cv2.circle(annotated, line[1], 5, (255, 255, 0), -1)
+    (label_width, label_height), _ = cv2.getTextSize("Counting Line", font, 0.6, 2)
+    label_x, label_y = (line[0][0] + line[1][0]) // 2, (line[0][1] + line[1][1]) // 2 - 10
+    cv2.rectangle(annotated, (label_x - 5, label_y - label_height - 5), (label_x + label_width + 5, label_y + 5), (0, 0, 0), -1)
+    cv2.putText(annotated, "Counting Line", (label_x, label_y), font, 0.6, (255, 255, 0), 2)
+
+    annotated = annotated.copy()
+    y_offset = 40
+    for text, color in zip((f"Entry: {counts[0]}", f"Exit: {counts[1]}", f"Net: {counts[2]}"),
+                           ((0, 255, 0), (0, 0, 255), (255, 255, 255))):
+        (text_width, text_height), baseline = cv2.getTextSize(text, font, 1.5, 3)
+        cv2.rectangle(annotated, (2, y_offset - text_height - 8), (18 + text_width, y_offset + baseline + 8), (0, 0, 0), -1)
+        cv2.putText(annotated, text, (10, y_offset), font, 1.5, color, 3)
+        y_offset += text_height + baseline + 13
+    return annotated
+
+
+def run(name: str, render: Callable, source: np.ndarray, detections: List[DetectionResult]) -> dict:
+    # Every frame is "decoded" into a fresh buffer first (untimed), as cap.read() would hand it over
+    frame = source.copy()
+    render(frame, detections[0], (0, 0, 0))  # Warm up: sprite and text-size caches fill on first use
+
+    elapsed = 0.0
+    peak = 0
+    for index, detection_result in enumerate(detections):
+        np.copyto(frame, source)
+        counts = (index // 30, index // 45, index // 30 - index // 45)
+        tracemalloc.start()
+        start = time.perf_counter()
+        render(frame, detection_result, counts)
+        elapsed += time.perf_counter() - start
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {"name": name, "ms_per_frame": elapsed / len(detections) * 1000, "peak_mb": peak / 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-frame annotation cost (legacy copies vs single-pass renderer)")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--objects", type=int, nargs="+", default=[5, 20, 50])
+    args = parser.parse_args()
+
+    detector = StubDetector()
+    line = ((0, args.height // 2), (args.width, args.height // 2))
+    rng = np.random.default_rng(1)
+    source = rng.integers(0, 255, (args.height, args.width, 3), dtype=np.uint8)
+    print(f"{args.frames} frames at {args.width}x{args.height}\n")
+
+    # Peak MB is the largest allocation made while rendering one frame
+    print(f"{'objects':>8} {'renderer':<28} {'ms/frame':>9} {'speedup':>8} {'peak MB':>8}")
+    for num_objects in args.objects:
+        detections = make_detections(args.frames, num_objects, args.width, args.height)
+        annotator = FrameAnnotator(detector, line)
+
+        results = [
+            run("legacy (copy per step)",
+                lambda frame, result, counts: legacy_render(detector, line, frame, result, counts),
+                source, detections),
+            run("annotator (reused buffer)",
+                lambda frame, result, counts: annotator.render(frame, result, counts),
+                source, detections),
+            run("annotator (in place)",
+                lambda frame, result, counts: annotator.render(frame, result, counts, inplace=True),
+                source, detections),
+        ]
+        baseline = results[0]["ms_per_frame"]
+        for result in results:
+            print(f"{num_objects:>8} {result['name']:<28} {result['ms_per_frame']:>9.2f} "
+                  f"{baseline / result['ms_per_frame']:>7.2f}x {result['peak_mb']:>8.1f}")
+
+    info = draw_utils._text_sprite.cache_info()
+    print(f"\nsprite cache: {info.currsize} sprites, {info.hits} hits, {info.misses} misses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import time
+import cv2
+import numpy as np
+from typing import List
+from app.core.config import settings
+from app.model.detector import YOLODetector
+from app.utils.frame_utils import detect_frames
+
+
+def load_frames(source: str, num_frames: int, width: int, height: int) -> List[np.ndarray]:
+    if not source:
+        # Synthetic 1080p-style frames when no sample footage is given
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(num_frames)]
+
+    cap = cv2.VideoCapture(source)
+    frames = []
+    while len(frames) < num_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+
+    if not frames:
+        raise ValueError(f"Could not read frames from {source}")
+    return frames
+
+
+def benchmark(detector: YOLODetector, frames: List[np.ndarray], scale_factor: float, imgsz: int) -> dict:
+    # Warm up so model/session initialization is excluded
+    detect_frames(detector, frames[:1], scale_factor, imgsz)
+
+    detections = 0
+    start_time = time.perf_counter()
+    for frame in frames:
+        detections += len(detect_frames(detector, [frame], scale_factor, imgsz)[0])
+    elapsed = time.perf_counter() - start_time
+
+    return {
+        "scale_factor": scale_factor,
+        "imgsz": imgsz,
+        "fps": len(frames) / elapsed,
+        "ms_per_frame": elapsed / len(frames) * 1000,
+        "detections": detections
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark downscaled inference (detection_scale_factor / imgsz)")
+    parser.add_argument("--source", default="", help="Video file to sample frames from (default: synthetic frames)")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--scales", type=float, nargs="+", default=[1.0, 0.75, 0.5])
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[0, 640, 480, 320],
+                        help="Model input sizes to try (0 = follow the scale factor, as the pipelines do)")
+    parser.add_argument("--backend", default=settings.inference_backend)
+    args = parser.parse_args()
+
+    detector = YOLODetector(
+        model_path=str(settings.model_path),
+        confidence=settings.yolo_confidence,
+        iou=settings.yolo_iou,
+        device=settings.yolo_device,
+        backend=args.backend,
+        imgsz=settings.yolo_imgsz
+    )
+    frames = load_frames(args.source, args.frames, args.width, args.height)
+    height, width = frames[0].shape[:2]
+    print(f"{len(frames)} frames at {width}x{height}, backend={args.backend}\n")
+
+    results = [
+        benchmark(detector, frames, scale_factor, imgsz)
+        for imgsz in args.imgsz
+        for scale_factor in args.scales
+    ]
+    baseline_fps = results[0]["fps"]
+
+    print(f"{'scale':>6} {'imgsz':>6} {'fps':>8} {'ms/frame':>9} {'speedup':>8} {'detections':>11}")
+    for result in results:
+        imgsz_label = result["imgsz"] or "auto"
+        print(f"{result['scale_factor']:>6.2f} {imgsz_label:>6} {result['fps']:>8.2f} "
+              f"{result['ms_per_frame']:>9.2f} {result['fps'] / baseline_fps:>7.2f}x {result['detections']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import argparse
+import time
+import numpy as np
+from typing import Dict, List
+from app.utils import count_utils
+from app.utils.count_utils import SimpleTracker
+
+
+class LegacyTracker:
+    # The tracker before the IoU matrix: a Python IoU call per detection-track pair, best track per detection
+    def __init__(self, iou_threshold: float = 0.3, max_frames_to_skip: int = 10):
+        self.iou_threshold = iou_threshold
+        self.max_frames_to_skip = max_frames_to_skip
+        self.next_id = 0
+        self.tracks: Dict[int, Dict] = {}
+
+    def _calculate_iou(self, box1: np.ndarray, box2: np.ndarray) -> float:
+        x1_1, y1_1, x2_1, y2_1 = box1
+        x1_2, y1_2, x2_2, y2_2 = box2
+        x1_i, y1_i, x2_i, y2_i = max(x1_1, x1_2), max(y1_1, y1_2), min(x2_1, x2_2), min(y2_1, y2_2)
+        if x2_i < x1_i or y2_i < y1_i:
+            return 0.0
+        intersection = (x2_i - x1_i) * (y2_i - y1_i)
+        union = (x2_1 - x1_1) * (y2_1 - y1_1) + (x2_2 - x1_2) * (y2_2 - y1_2) - intersection
+        return intersection / union if union > 0 else 0.0
+
+    def update(self, detections: np.ndarray) -> Dict[int, np.ndarray]:
+        for track_id in self.tracks:
+            self.tracks[track_id]['frames_skipped'] += 1
+
+        matched_tracks = {}
+        unmatched_detections = []
+        for detection in detections:
+            best_iou = 0
+            best_track_id = None
+            for track_id, track_info in self.tracks.items():
+                iou = self._calculate_iou(detection, track_info['bbox'])
+                if iou > best_iou and iou >= self.iou_threshold:
+                    best_iou = iou
+                    best_track_id = track_id
+            if best_track_id is not None:
+                self.tracks[best_track_id]['bbox'] = detection
+                self.tracks[best_track_id]['frames_skipped'] = 0
+                matched_tracks[best_track_id] = detection
+            else:
+                unmatched_detections.append(detection)
+
+        for detection in unmatched_detections:
+            self.tracks[self.next_id] = {'bbox': detection, 'frames_skipped': 0}
+            matched_tracks[self.next_id] = detection
+            self.next_id += 1
+
+        for track_id in [t for t, info in self.tracks.items() if info['frames_skipped'] > self.max_frames_to_skip]:
+            del self.tracks[track_id]
+        return matched_tracks
+
+
+def make_frames(num_frames: int, num_objects: int, width: int, height: int) -> List[np.ndarray]:
+    # Objects drift with jitter; about 5% of detections drop out per frame, like missed detections
+    rng = np.random.default_rng(0)
+    position = rng.uniform((0, 0), (width - 100, height - 100), (num_objects, 2))
+    size = rng.uniform(40, 100, (num_objects, 2))
+    velocity = rng.normal(0, 4, (num_objects, 2))
+    frames = []
+    for _ in range(num_frames):
+        position += velocity + rng.normal(0, 1, (num_objects, 2))
+        boxes = np.hstack((position, position + size)).astype(np.float32)
+        frames.append(boxes[rng.random(num_objects) > 0.05])
+    return frames
+
+
+def run(name: str, tracker, frames: List[np.ndarray]) -> dict:
+    elapsed = 0.0
+    dropped = 0
+    for detections in frames:
+        start = time.perf_counter()
+        tracked = tracker.update(detections)
+        elapsed += time.perf_counter() - start
+        # Detections that share a track with another one never reach the line detector
+        dropped += len(detections) - len(tracked)
+    return {"name": name, "ms_per_frame": elapsed / len(frames) * 1000, "dropped": dropped}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SimpleTracker.update (Python IoU loop vs IoU matrix)")
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--objects", type=int, nargs="+", default=[10, 100, 500])
+    args = parser.parse_args()
+
+    hungarian = count_utils.linear_sum_assignment is not None
+    print(f"{args.frames} frames at {args.width}x{args.height}, scipy {'available' if hungarian else 'missing (greedy only)'}\n")
+
+    # Dropped = detections returned without a track of their own (double assignment)
+    print(f"{'objects':>8} {'tracker':<24} {'ms/frame':>9} {'speedup':>8} {'dropped':>8}")
+    for num_objects in args.objects:
+        frames = make_frames(args.frames, num_objects, args.width, args.height)
+        results = [
+            run("legacy (python loop)", LegacyTracker(), frames),
+            run("iou matrix + greedy", SimpleTracker(use_hungarian=False), frames),
+        ]
+        if hungarian:
+            results.append(run("iou matrix + hungarian", SimpleTracker(), frames))
+
+        baseline = results[0]["ms_per_frame"]
+        for result in results:
+            print(f"{num_objects:>8} {result['name']:<24} {result['ms_per_frame']:>9.3f} "
+                  f"{baseline / result['ms_per_frame']:>7.1f}x {result['dropped']:>8}")
+
+
+if __name__ == "__main__":
+    main()
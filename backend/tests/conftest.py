@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Run from any directory: the tests import the backend's app package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Importing app.core.config opens its log file at import time; keep test logs out of the checkout
+os.environ.setdefault("LOGS_DIR", tempfile.mkdtemp(prefix="rickshaw-tests-logs-"))
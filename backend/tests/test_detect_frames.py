@@ -0,0 +1,40 @@
+import numpy as np
+from app.core.config import settings
+from app.model.detector import DetectionResult
+from app.utils.frame_utils import RegionOfInterest, detect_frames
+
+
+class RecordingDetector:
+    # Reports one box at the input's top-left corner and remembers what it was given
+    def __init__(self):
+        self.shapes = []
+        self.imgsz = None
+
+    def detect_batch(self, images, imgsz=None):
+        self.shapes = [image.shape for image in images]
+        self.imgsz = imgsz
+        boxes = np.array([[10, 20, 30, 40]], dtype=np.float32)
+        return [DetectionResult(boxes, np.array([0.9], dtype=np.float32), np.array([0])) for _ in images]
+
+
+def test_scale_factor_shrinks_model_input_without_resizing_frames(monkeypatch):
+    monkeypatch.setattr(settings, "yolo_imgsz", 640)
+    detector = RecordingDetector()
+    frames = [np.zeros((360, 640, 3), dtype=np.uint8)] * 2
+
+    results = detect_frames(detector, frames, scale_factor=0.75)
+
+    assert detector.shapes == [(360, 640, 3)] * 2  # Only the model's letterbox resizes
+    assert detector.imgsz == 480
+    assert results[0].boxes.tolist() == [[10, 20, 30, 40]]
+
+
+def test_explicit_imgsz_and_roi_offset():
+    detector = RecordingDetector()
+    frame = np.zeros((360, 640, 3), dtype=np.uint8)
+
+    result = detect_frames(detector, [frame], scale_factor=0.5, imgsz=320, roi=RegionOfInterest(100, 50, 300, 250))[0]
+
+    assert detector.shapes == [(200, 200, 3)]
+    assert detector.imgsz == 320
+    assert result.boxes.tolist() == [[110, 70, 130, 90]]
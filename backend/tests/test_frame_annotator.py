@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from app.utils.draw_utils import FrameAnnotator, draw_entry_exit_line
+
+
+@pytest.mark.parametrize("line", [
+    ((0, 120), (320, 120)),    # Default horizontal line
+    ((150, 0), (170, 240)),    # Near-vertical line spanning every band
+    ((20, 10), (300, 230)),    # Diagonal
+])
+def test_line_layer_matches_direct_drawing(line):
+    annotator = FrameAnnotator(detector=None, line=line)
+    frame = np.random.default_rng(0).integers(0, 256, (240, 320, 3), dtype=np.uint8)
+    expected = frame.copy()
+
+    annotator.draw_line(frame)
+    draw_entry_exit_line(expected, line[0], line[1], label="Counting Line", inplace=True)
+
+    assert np.array_equal(frame, expected)
+
+
+def test_line_layer_is_built_on_first_drawn_frame_only():
+    annotator = FrameAnnotator(detector=None, line=((0, 50), (160, 50)))
+    assert annotator._line_layer is None  # Counts-only analyzers never pay for it
+
+    annotator.draw_line(np.zeros((100, 160, 3), dtype=np.uint8))
+    layer = annotator._line_layer
+    annotator.draw_line(np.zeros((100, 160, 3), dtype=np.uint8))
+    assert annotator._line_layer is layer
+
+    annotator.draw_line(np.zeros((200, 320, 3), dtype=np.uint8))
+    assert annotator._line_layer is not layer and annotator._line_layer_size == (320, 200)
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+from app.core.config import settings
+from app.services.detection_store import TrajectoryWriter, open_trajectories
+from app.utils.count_utils import LineCrossingDetector, count_line_crossings
+
+
+WIDTH, HEIGHT = 640, 480
+LINES = [
+    ((0.0, 240.0), (640.0, 240.0)),  # Horizontal, full width
+    ((100.0, 50.0), (500.0, 430.0)),  # Diagonal, ends inside the frame
+    ((320.0, 0.0), (320.0, 300.0))  # Vertical, partial height
+]
+
+
+@pytest.fixture(autouse=True)
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "detection_store_dir", tmp_path)
+
+
+def _near_line(rng: np.random.Generator, line_start, line_end) -> np.ndarray:
+    # A point inside the crossing_threshold band, where the side test gives 0
+    start, end = np.array(line_start), np.array(line_end)
+    direction = end - start
+    length = np.linalg.norm(direction)
+    normal = np.array([-direction[1], direction[0]]) / length
+    value = rng.uniform(-settings.crossing_threshold, settings.crossing_threshold)
+    return start + rng.uniform(0, 1) * direction + normal * value / length
+
+
+def _random_segment(rng: np.random.Generator, first_frame: int, last_frame: int, num_tracks: int, line):
+    # frame -> {track_id: bbox}; tracks wander across the line, skip frames and sometimes sit in the zero band
+    frames = {}
+    for track_id in range(num_tracks):
+        start = rng.integers(first_frame, last_frame)
+        length = rng.integers(2, 40)
+        center = rng.uniform((0, 0), (WIDTH, HEIGHT))
+        for frame_number in range(start, min(start + length, last_frame + 1)):
+            if rng.random() < 0.2:
+                continue  # Missed detection
+            if rng.random() < 0.15:
+                center = _near_line(rng, *line)
+            else:
+                center = np.clip(center + rng.normal(0, 60, 2), 0, (WIDTH, HEIGHT))
+            size = rng.uniform(20, 80, 2)
+            bbox = np.array([*(center - size / 2), *(center + size / 2)], dtype=np.float32)
+            frames.setdefault(int(frame_number), {})[track_id] = bbox
+    return frames
+
+
+def _detector_counts(segments, line):
+    # Reference: what LineCrossingDetector counted during processing, one detector per segment
+    # (chunks track independently and only count crossings from their first owned frame)
+    total_entry = total_exit = 0
+    for counted_from, frames in segments:
+        detector = LineCrossingDetector(*line, WIDTH, HEIGHT, use_percentage=False)
+        for frame_number in sorted(frames):
+            for track_id, bbox in frames[frame_number].items():
+                event = detector.update(str(track_id), bbox, frame_number)
+                if event and frame_number >= counted_from:
+                    total_entry += event == "entry"
+                    total_exit += event == "exit"
+    return total_entry, total_exit
+
+
+def _replayed_counts(segments, line):
+    writer = TrajectoryWriter("recount.mp4")
+    for segment, (counted_from, frames) in enumerate(segments):
+        writer.segment_starts[segment] = counted_from
+        for frame_number in sorted(frames):
+            writer.add(frame_number, frames[frame_number], segment)
+    writer.close(WIDTH, HEIGHT)
+
+    trajectories = open_trajectories("recount.mp4")
+    return count_line_crossings(
+        trajectories.track_keys, trajectories.centers, *line, trajectories.frames, trajectories.counted_from
+    )
+
+
+@pytest.mark.parametrize("line", LINES)
+@pytest.mark.parametrize("seed", range(5))
+def test_replay_matches_detector(seed, line):
+    rng = np.random.default_rng(seed)
+    segments = [(1, _random_segment(rng, 1, 300, 60, line))]
+
+    expected = _detector_counts(segments, line)
+    assert expected[0] + expected[1] > 0
+    assert _replayed_counts(segments, line) == expected
+
+
+@pytest.mark.parametrize("line", LINES)
+@pytest.mark.parametrize("seed", range(5))
+def test_replay_matches_detector_per_segment(seed, line):
+    # Chunked run: segments reuse track IDs and start tracking 30 frames before their first counted frame
+    rng = np.random.default_rng(100 + seed)
+    segments = [
+        (1, _random_segment(rng, 1, 200, 40, line)),
+        (201, _random_segment(rng, 171, 400, 40, line)),
+        (401, _random_segment(rng, 371, 600, 40, line))
+    ]
+
+    expected = _detector_counts(segments, line)
+    assert _replayed_counts(segments, line) == expected
+
+
+def _bbox(x: float, y: float) -> np.ndarray:
+    return np.array([x - 10, y - 10, x + 10, y + 10], dtype=np.float32)
+
+
+def test_only_first_crossing_per_track_counts():
+    line = LINES[0]
+    frames = {1: {0: _bbox(100, 100)}, 2: {0: _bbox(100, 300)}, 3: {0: _bbox(100, 100)}, 4: {0: _bbox(100, 300)}}
+    assert _detector_counts([(1, frames)], line) == (1, 0)
+    assert _replayed_counts([(1, frames)], line) == (1, 0)
+
+
+def test_zero_side_crossing_is_not_consumed():
+    # Both ends inside the threshold band: the segments intersect but the sides are equal, so a later
+    # real crossing of the same track still counts
+    line = LINES[0]
+    frames = {1: {0: _bbox(100, 239.995)}, 2: {0: _bbox(100, 240.005)}, 3: {0: _bbox(100, 100)}}
+    assert _detector_counts([(1, frames)], line) == (0, 1)
+    assert _replayed_counts([(1, frames)], line) == (0, 1)
+
+
+def test_warm_up_crossing_is_consumed_but_not_counted():
+    line = LINES[0]
+    frames = {5: {0: _bbox(100, 100)}, 6: {0: _bbox(100, 300)}, 11: {0: _bbox(100, 100)}}
+    assert _detector_counts([(10, frames)], line) == (0, 0)
+    assert _replayed_counts([(10, frames)], line) == (0, 0)
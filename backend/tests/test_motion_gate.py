@@ -0,0 +1,73 @@
+import cv2
+import numpy as np
+import pytest
+from app.core.config import settings
+from app.db.database import init_database
+from app.model.detector import DetectionResult
+from app.services.cctv_service import CCTVStreamProcessor
+from app.utils.count_utils import LineCrossingDetector, SimpleTracker
+from app.utils.motion_utils import MotionGate
+
+
+WIDTH, HEIGHT = 160, 100  # The counting line is the default horizontal line at y = 50
+
+
+class ScriptedDetector:
+    # Reports the one object wherever the test last put it, and counts how often it is asked
+    def __init__(self):
+        self.box = None
+        self.calls = 0
+
+    def detect_batch(self, frames, imgsz=None):
+        self.calls += len(frames)
+        boxes = np.array([self.box], dtype=np.float32)
+        return [DetectionResult(boxes, np.array([0.9], dtype=np.float32), np.array([0])) for _ in frames]
+
+    def get_class_name(self, class_id):
+        return "rickshaw"
+
+    def count_rickshaws(self, detection_result):
+        return len(detection_result)
+
+
+@pytest.fixture
+def processor(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "database_path", tmp_path / "detections.db")
+    init_database()
+
+    detector = ScriptedDetector()
+    processor = CCTVStreamProcessor(detector, "test-camera", "rtsp://unused", scale_factor=1.0, motion_gate=True)
+    # What connect() sets up, without a stream; the fast-adapting gate lets a still scene gate within a few frames
+    processor.motion_gate = MotionGate(hold_frames=0, learning_rate=0.5)
+    processor.line_detector = LineCrossingDetector(
+        settings.entry_line_start, settings.entry_line_end, WIDTH, HEIGHT, use_percentage=True
+    )
+    processor.tracker = SimpleTracker(max_frames_to_skip=10)
+    return processor
+
+
+def _show(processor: CCTVStreamProcessor, center_y: float):
+    box = [60, center_y - 20, 100, center_y + 20]
+    processor.detector.box = box
+    frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    cv2.rectangle(frame, (int(box[0]), int(box[1])), (int(box[2]), int(box[3])), (255, 255, 255), -1)
+    assert processor.process_frame(frame) is not None
+
+
+def test_stationary_object_keeps_its_track_across_gated_frames(processor):
+    for center_y in (30, 35, 40):
+        _show(processor, center_y)
+    (track_id,) = processor.tracker.track_ids.tolist()
+
+    # Waits just above the line for far longer than max_frames_to_skip
+    for _ in range(40):
+        _show(processor, 40)
+    assert processor.motion_gate.frames_skipped > processor.tracker.max_frames_to_skip
+    assert processor.tracker.track_ids.tolist() == [track_id]
+
+    # Moves on across the line: same track, so the crossing is counted
+    calls = processor.detector.calls
+    _show(processor, 60)
+    assert processor.detector.calls == calls + 1
+    assert processor.tracker.track_ids.tolist() == [track_id]
+    assert processor.entry_count + processor.exit_count == 1
@@ -0,0 +1,20 @@
+import pytest
+from app.core.config import settings
+from app.services.video_service import RenderCostEstimator
+
+
+def test_estimate_uses_calibrated_default_before_any_rendered_run(monkeypatch):
+    monkeypatch.setattr(settings, "render_cost_ms_per_megapixel", 20.0)
+    estimator = RenderCostEstimator()
+
+    # 500 frames of 640x360: 0.2304 MP each at 20 ms/MP
+    assert estimator.estimate(500, 640, 360) == pytest.approx(2.304)
+
+
+def test_estimate_follows_rendered_runs():
+    estimator = RenderCostEstimator(smoothing=0.5)
+    estimator.record(seconds=1.0, frames=100, width=1000, height=1000)  # 10 ms/MP
+    assert estimator.estimate(10, 1000, 1000) == pytest.approx(0.1)
+
+    estimator.record(seconds=3.0, frames=100, width=1000, height=1000)  # 30 ms/MP, averaged to 20
+    assert estimator.estimate(10, 1000, 1000) == pytest.approx(0.2)
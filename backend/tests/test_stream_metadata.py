@@ -0,0 +1,52 @@
+import json
+import threading
+import time
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.db.database import init_database, insert_video_job
+from app.model.detector import DetectionResult
+from app.routes import stream_video
+from app.services.overlay_metadata import OverlayMetadataWriter
+from app.services.video_job_manager import get_job_manager
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "database_path", tmp_path / "detections.db")
+    monkeypatch.setattr(settings, "videos_output_dir", tmp_path / "videos")
+    init_database()
+
+    app = FastAPI()
+    app.include_router(stream_video.router, prefix=settings.api_prefix)
+    return TestClient(app)
+
+
+def _run_overlay_job(job_id: str, output_filename: str, delay: float):
+    # What the video job queue does once the job leaves the queue: start processing, then write the track
+    time.sleep(delay)
+    get_job_manager().create_job(job_id, 1)
+    writer = OverlayMetadataWriter(output_filename, 64, 48, 10)
+    writer.add(1, DetectionResult(np.array([[1, 2, 3, 4]], dtype=np.float32), np.array([0.9]), np.array([0])))
+    writer.close(1, 0, 0)
+
+
+def test_metadata_stream_waits_for_queued_overlay_job(client):
+    job_id = "queued-overlay-job"
+    insert_video_job(job_id, "input.mp4", "queued.mp4", output_mode="overlay")
+    get_job_manager().create_queued_job(job_id)
+
+    worker = threading.Thread(target=_run_overlay_job, args=(job_id, "queued.mp4", 1.0))
+    worker.start()
+    try:
+        with client.stream("GET", f"/api/stream/metadata/{job_id}") as response:
+            assert response.status_code == 200
+            records = [json.loads(line) for line in response.iter_lines() if line]
+    finally:
+        worker.join()
+        get_job_manager().delete_job(job_id)
+
+    assert [record.get("type") for record in records] == ["header", None, "end"]
+    assert records[1]["objects"][0][:4] == [1.0, 2.0, 3.0, 4.0]
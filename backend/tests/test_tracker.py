@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+from app.utils import count_utils
+from app.utils.count_utils import SimpleTracker, iou_matrix, match_boxes
+
+
+MATCHERS = [
+    # Without scipy use_hungarian falls back to greedy, so the Hungarian path would go untested
+    pytest.param(True, id="hungarian", marks=pytest.mark.skipif(
+        count_utils.linear_sum_assignment is None, reason="scipy not installed"
+    )),
+    pytest.param(False, id="greedy")
+]
+
+
+def _boxes(*rows) -> np.ndarray:
+    return np.array(rows, dtype=np.float32).reshape(-1, 4)
+
+
+@pytest.mark.parametrize("use_hungarian", MATCHERS)
+def test_competing_detections_get_distinct_ids(use_hungarian):
+    tracker = SimpleTracker(use_hungarian=use_hungarian)
+    first = tracker.update(_boxes([0, 0, 10, 10]))
+    (track_id,) = first
+
+    # Both detections overlap the one track well above the threshold; only one may inherit it
+    tracked = tracker.update(_boxes([0, 0, 10, 10], [1, 0, 11, 10]))
+    assert len(tracked) == 2
+    assert track_id in tracked
+    np.testing.assert_array_equal(tracked[track_id], [0, 0, 10, 10])
+
+
+@pytest.mark.parametrize("use_hungarian", MATCHERS)
+@pytest.mark.parametrize("seed", range(20))
+def test_match_boxes_is_one_to_one(seed, use_hungarian):
+    rng = np.random.default_rng(seed)
+    # Clustered boxes, so many detections overlap several tracks
+    centers = rng.uniform(0, 100, (8, 2))
+    tracks = np.concatenate([centers + rng.normal(0, 3, (8, 2)), centers + 20], axis=1)
+    detections = np.concatenate([
+        np.concatenate([centers + rng.normal(0, 3, (8, 2)), centers + 20], axis=1),
+        np.concatenate([centers[:4] + rng.normal(0, 3, (4, 2)), centers[:4] + 20], axis=1)
+    ])
+    iou = iou_matrix(detections, tracks)
+
+    rows, cols = match_boxes(iou, 0.3, use_hungarian)
+    assert len(set(rows.tolist())) == len(rows)
+    assert len(set(cols.tolist())) == len(cols)
+    assert (iou[rows, cols] >= 0.3).all()
+
+
+@pytest.mark.parametrize("use_hungarian", MATCHERS)
+def test_match_boxes_never_pairs_below_threshold(use_hungarian):
+    # Maximising total IoU pairs detection 0 with track 0 and pads detection 1 with track 1 (IoU 0.18):
+    # that padding must not become a match
+    tracks = _boxes([0, 0, 10, 10], [4, 0, 14, 10])
+    detections = _boxes([0, 0, 10, 10], [-3, 0, 7, 10])
+
+    rows, cols = match_boxes(iou_matrix(detections, tracks), 0.3, use_hungarian)
+    assert rows.tolist() == [0]
+    assert cols.tolist() == [0]
+
+
+@pytest.mark.parametrize("use_hungarian", MATCHERS)
+def test_tracker_never_double_assigns(use_hungarian):
+    rng = np.random.default_rng(0)
+    tracker = SimpleTracker(use_hungarian=use_hungarian)
+    positions = rng.uniform(0, 200, (15, 2))
+    for _ in range(50):
+        positions += rng.normal(0, 2, positions.shape)
+        # Duplicate detections of a few objects, and a few missed ones
+        visible = positions[rng.random(len(positions)) > 0.1]
+        visible = np.concatenate([visible, visible[:3] + 1])
+        detections = np.concatenate([visible, visible + 30], axis=1).astype(np.float32)
+
+        tracked = tracker.update(detections)
+        assert len(tracked) == len(detections)
+        matched_rows = [np.flatnonzero((detections == bbox).all(axis=1)) for bbox in tracked.values()]
+        assert sorted(int(rows[0]) for rows in matched_rows) == list(range(len(detections)))
+
+
+def test_tracks_expire_after_max_frames_to_skip():
+    tracker = SimpleTracker(max_frames_to_skip=3)
+    (track_id,) = tracker.update(_boxes([0, 0, 10, 10]))
+
+    # Missing for max_frames_to_skip frames: the track is still there to be matched
+    for _ in range(3):
+        tracker.update(_boxes([100, 100, 110, 110]))
+    assert track_id in tracker.update(_boxes([0, 0, 10, 10], [100, 100, 110, 110]))
+
+    # Missing for one frame more: a new track is started
+    for _ in range(4):
+        tracker.update(_boxes([100, 100, 110, 110]))
+    assert track_id not in tracker.track_ids
+    assert track_id not in tracker.update(_boxes([0, 0, 10, 10]))
+
+
+def test_returns_the_detection_rows_themselves():
+    # FrameAnalyzer._attach_scores and the overlay metadata find each track's detection by exact row match
+    tracker = SimpleTracker()
+    tracker.update(_boxes([0, 0, 10, 10], [50, 50, 60, 60]))
+    detections = _boxes([1, 0, 11, 10], [200, 200, 210, 210], [51, 50, 61, 60])
+
+    tracked = tracker.update(detections)
+    assert isinstance(tracked, dict)
+    assert len(tracked) == len(detections)
+    for track_id, bbox in tracked.items():
+        assert isinstance(track_id, int)
+        assert bbox.shape == (4,) and bbox.dtype == detections.dtype
+        assert np.shares_memory(bbox, detections)
+        assert (detections == bbox).all(axis=1).sum() == 1
+
+
+def test_empty_detections_only_age_tracks():
+    tracker = SimpleTracker()
+    tracker.update(_boxes([0, 0, 10, 10], [50, 50, 60, 60]))
+    track_ids = tracker.track_ids.copy()
+    track_boxes = tracker.track_boxes.copy()
+
+    assert tracker.update(np.empty((0, 4), dtype=np.float32)) == {}
+    np.testing.assert_array_equal(tracker.track_ids, track_ids)
+    np.testing.assert_array_equal(tracker.track_boxes, track_boxes)
+    np.testing.assert_array_equal(tracker.frames_skipped, [1, 1])
+    assert tracker.next_id == 2